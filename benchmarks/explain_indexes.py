@@ -0,0 +1,176 @@
+"""
+EXPLAIN check that every query data/service.py sends for a user can use an index on matched_bets.
+
+    python -m benchmarks.explain_indexes                  # against the DB_* database (see setup.bash)
+    python -m benchmarks.explain_indexes --user-id 7      # sample a particular user's bets
+    python -m benchmarks.explain_indexes --verbose        # show the scans in each plan
+
+Each call in service_calls() runs with get_db() swapped for a recording
+wrapper. Reads (SELECT and WITH) go through to the database so callers get real rows.
+Writes and streams are only recorded. Every recorded statement is then
+EXPLAINed with enable_seqscan off. Postgres still picks a sequential scan
+when no index can serve a query, so a Seq Scan on matched_bets (or one of
+its partitions) means a missing index, whatever the table's size. Exits with
+status 1 when any query has one or fails to EXPLAIN.
+"""
+import argparse
+import json
+import sys
+from contextlib import contextmanager
+from functools import partial
+
+TABLE = "matched_bets"
+
+
+class RecordingDB:
+    """Stand-in for PostgresDB that records statements; only reads reach the database."""
+
+    def __init__(self, db, statements: list):
+        self.db = db
+        self.statements = statements
+
+    def __enter__(self):
+        self.db.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self.db.__exit__(exc_type, exc_value, traceback)
+
+    def execute(self, query, params=None, name=None):
+        name = name or sys._getframe(1).f_code.co_name
+        self.statements.append((name, query, params))
+        if query.strip().lower().startswith(("select", "with")):
+            return self.db.execute(query, params, name=name)
+        return []
+
+    def stream(self, query, params=None, itersize=2000, name="arbify_stream"):
+        self.statements.append((sys._getframe(1).f_code.co_name, query, params))
+        return iter(())
+
+    def copy_expert(self, query, file):
+        # COPY has no plan to check
+        return 0
+
+    @contextmanager
+    def transaction(self):
+        yield self
+
+
+def service_calls(user_id, bet_id, bet_date) -> dict:
+    """The service calls to check, by label, for a user and one of their bets."""
+    from data import service
+
+    bet = {
+        "bookmaker": "Bet365", "event": "EXPLAIN check", "bet_type": "Qualifying Bet", "back_stake": 10,
+        "back_odds": 3.0, "exchange": "Smarkets", "lay_odds": 3.1, "lay_stake": 9.74, "user_id": user_id,
+    }
+    return {
+        "get_profit_over_time": partial(service.get_profit_over_time, user_id),
+        "get_profit_curve": partial(service.get_profit_curve, user_id),
+        "get_all_bets": partial(service.get_all_bets, user_id),
+        "get_bets_page": partial(service.get_bets_page, user_id),
+        "get_bets_page(after)": partial(service.get_bets_page, user_id, after=(bet_date, bet_id)),
+        "get_bets_page(result)": partial(service.get_bets_page, user_id, result="back"),
+        "get_bet_totals": partial(service.get_bet_totals, user_id),
+        "get_open_bets": partial(service.get_open_bets, user_id),
+        "get_open_exposure": partial(service.get_open_exposure, user_id),
+        "get_analytics": partial(service.get_analytics, user_id),
+        "iter_bets": lambda: list(service.iter_bets(user_id)),
+        "iter_bets_changed_since": lambda: list(service.iter_bets_changed_since(user_id, bet_date)),
+        "count_bets": partial(service.count_bets, user_id),
+        "get_history_marker": partial(service.get_history_marker, user_id),
+        "get_bet_ids": partial(service.get_bet_ids, user_id),
+        "insert_bet": partial(service.insert_bet, bet),
+        "update_bet_result": partial(service.update_bet_result, bet_id, "unsettled"),
+        "update_bet_results": partial(service.update_bet_results, {bet_id: "unsettled"}),
+        "delete_bet": partial(service.delete_bet, bet_id),
+    }
+
+
+def record_statements(calls: dict) -> list:
+    """Run each call against RecordingDB; returns [(label, query, params), ...]."""
+    from data import service
+    from data.cache import query_cache
+
+    original_get_db = service.get_db
+    recorded = []
+    try:
+        for label, call in calls.items():
+            statements = []
+            service.get_db = lambda: RecordingDB(original_get_db(), statements)
+            query_cache.invalidate()
+            call()
+            recorded.extend((label, query, params) for _, query, params in statements)
+    finally:
+        service.get_db = original_get_db
+        query_cache.invalidate()
+    return recorded
+
+
+def plan_scans(plan: dict) -> list:
+    """(node type, relation, index) for every scan node in an EXPLAIN (FORMAT JSON) plan."""
+    scans = []
+    if "Relation Name" in plan:
+        scans.append((plan["Node Type"], plan["Relation Name"], plan.get("Index Name")))
+    for child in plan.get("Plans", ()):
+        scans.extend(plan_scans(child))
+    return scans
+
+
+def explain(query, params) -> list:
+    from data.db import get_db
+
+    with get_db() as db, db.transaction():
+        db.cursor.execute("SET LOCAL enable_seqscan = off;")
+        db.cursor.execute(f"EXPLAIN (FORMAT JSON) {query}", params)
+        plan = db.cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan_scans(plan[0]["Plan"])
+
+
+def sample_bet(user_id=None):
+    """(user_id, bet id, bet_date) of the newest bet, optionally of one user; None when there are none."""
+    from data.db import get_db
+
+    with get_db() as db:
+        rows = db.execute(
+            f"SELECT user_id, id, bet_date FROM {TABLE} "
+            "WHERE user_id IS NOT NULL AND (%(user_id)s IS NULL OR user_id = %(user_id)s) "
+            "ORDER BY bet_date DESC, id DESC LIMIT 1;",
+            {"user_id": user_id}
+        )
+    return rows[0] if rows else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", type=int, help="User whose bets the queries use (default: owner of the newest bet)")
+    parser.add_argument("--verbose", action="store_true", help="List every scan in each plan")
+    args = parser.parse_args(argv)
+
+    sample = sample_bet(args.user_id)
+    if sample is None:
+        print(f"No bets in {TABLE} to check against; add some first.")
+        return 1
+
+    failures = 0
+    for label, query, params in record_statements(service_calls(*sample)):
+        try:
+            scans = explain(query, params)
+        except Exception as e:
+            print(f"{label:<28} {'ERROR':>12}   {str(e).strip().splitlines()[0]}")
+            failures += 1
+            continue
+        seq_scans = sorted({rel for node, rel, _ in scans if node == "Seq Scan" and rel.startswith(TABLE)})
+        status = "ok" if not seq_scans else f"SEQ SCAN on {', '.join(seq_scans[:3])}{' ...' if len(seq_scans) > 3 else ''}"
+        failures += bool(seq_scans)
+        print(f"{label:<28} {status}")
+        if args.verbose:
+            for node, rel, index in sorted(set(scans), key=lambda s: (s[1], s[0])):
+                print(f"    {node} on {rel}" + (f" using {index}" if index else ""))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+import datetime
+import io
+import random
+from contextlib import contextmanager
+
+
+def make_history_rows(n: int, seed: int = 0) -> list:
+    """Synthetic matched_bets rows in data.service.HISTORY_COLUMNS order."""
+    rng = random.Random(seed)
+    start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    bet_types = ("Qualifying Bet", "Free Bet", "Money Back if Bet Loses")
+    results = ("unsettled", "back", "lay", "void")
+    rows = []
+    for i in range(n):
+        back_odds = round(rng.uniform(1.2, 10.0), 2)
+        lay_odds = round(back_odds + rng.uniform(0.0, 0.5), 2)
+        stake = float(rng.choice((5, 10, 20, 25, 50)))
+        lay_stake = round(back_odds * stake / (lay_odds - 0.02), 2)
+        rows.append((
+            n - i,
+            start + datetime.timedelta(minutes=n - i),
+            rng.choice(("Bet365", "William Hill", "Paddy Power", "Sky Bet")),
+            f"Event {i}",
+            rng.choice(bet_types),
+            stake,
+            back_odds,
+            rng.choice(("Smarkets", "Betfair", "Betdaq")),
+            lay_odds,
+            lay_stake,
+            round(lay_stake * (lay_odds - 1), 2),
+            None,
+            None,
+            None,
+            rng.choice(results),
+            "",
+            0.02,
+            False,
+        ))
+    return rows
+
+
+class FakePostgresDB:
+    """
+    In-process stand-in for PostgresDB used by the service benchmarks.
+
+    It answers every SELECT from an in-memory list of history rows and
+    accepts writes without storing them, so a benchmark measures the
+    service layer's own overhead (parameter building, validation, CSV
+    encoding, caching) without a database round trip.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def execute(self, query, params=None, name=None):
+        self.statements += 1
+        lowered = query.strip().lower()
+        if "returning" in lowered:
+            # (id, user_id) - enough for every RETURNING clause in data/service.py
+            return [(1, None)]
+        if lowered.startswith("select"):
+            if "limit" in lowered:
+                return self.rows[:params[-1]]
+            return self.rows
+        return None
+
+    @contextmanager
+    def transaction(self):
+        yield self
+
+    def copy_expert(self, query, file):
+        self.statements += 1
+        data = file.read() if isinstance(file, io.IOBase) else ""
+        return data.count("\n")
+
+    def stream(self, query, params=None, itersize=2000, name="arbify_stream"):
+        self.statements += 1
+        yield from self.rows
@@ -0,0 +1,99 @@
+"""
+Import-time budget check for the Streamlit app.
+
+    python -m benchmarks.import_budget                # check every module against its budget
+    python -m benchmarks.import_budget --verbose      # also list the slowest modules each one pulls in
+    python -m benchmarks.import_budget --scale 2      # loosen every budget on a slow machine
+
+Each module is imported in a fresh interpreter under `python -X importtime`
+after streamlit itself is loaded (the server always has it), so the figure is
+the extra cost of that module: what run_arbify_service.py pays at startup for
+the modules it imports on every run, and on first navigation for each page
+route (pages are loaded lazily). Exits with status 1 when any module is over
+budget, and 2 when any fails to import (its cost can't be measured then).
+
+pages.Login and pages.Register are not checked: they import the auth
+package, which is deployed separately and is not part of this tree.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+PRELOAD = ("streamlit",)
+
+# Median cold import time in milliseconds, on top of PRELOAD
+BUDGETS_MS = {
+    # Imported on the first logged-in run (start_background_services())
+    "data.metrics": 50,
+    "data.feeds": 25,
+    "data.profiling": 10,
+    # Protected routes, loaded on first navigation
+    "pages.Home": 600,
+    "pages.Game_History": 800,
+    "pages.Scanner": 600,
+}
+
+_MARK = "--arbify-import-budget--"
+
+
+def measure_import(module: str) -> tuple[float, list]:
+    """
+    Import module in a fresh interpreter; returns (total ms, [(cumulative ms, name), ...])
+    where the list holds the modules imported directly by module (or by the
+    packages it lives in), slowest first.
+    """
+    code = f"import {', '.join(PRELOAD)}, sys; sys.stderr.write({_MARK!r} + '\\n'); import {module}"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise ImportError(proc.stderr.strip().splitlines()[-1])
+
+    lines = proc.stderr.split(_MARK, 1)[1].splitlines()
+    total, children = 0.0, []
+    for line in lines:
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        # importtime indents nested imports by two spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            total += int(cumulative) / 1000
+        elif depth == 1:
+            children.append((int(cumulative) / 1000, name.strip()))
+    return total, sorted(children, reverse=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", help="Modules to check (default: every module in BUDGETS_MS)")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per module; the median is used")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every budget by this factor")
+    parser.add_argument("--verbose", action="store_true", help="Show the five slowest imports under each module")
+    args = parser.parse_args(argv)
+
+    failures, broken = 0, []
+    for module in args.modules or BUDGETS_MS:
+        budget = BUDGETS_MS.get(module, float("inf")) * args.scale
+        try:
+            samples = [measure_import(module) for _ in range(args.repeat)]
+        except ImportError as e:
+            broken.append((module, e))
+            continue
+        median = statistics.median(ms for ms, _ in samples)
+        status = "ok" if median <= budget else "OVER BUDGET"
+        failures += status != "ok"
+        print(f"{module:<22} {median:>8.1f} ms / {budget:.0f} ms   {status}")
+        if args.verbose:
+            for ms, name in samples[0][1][:5]:
+                print(f"    {ms:>8.1f} ms  {name}")
+    for module, error in broken:
+        print(f"error: {module} failed to import, so its budget was not checked: {error}", file=sys.stderr)
+    if broken:
+        return 2
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""
+Benchmarks for the engine, the history page's DataFrame path and the service layer.
+
+    python -m benchmarks.run_benchmarks                      # writes benchmarks/results/<commit>.json
+    python -m benchmarks.run_benchmarks --quick              # small sizes only
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/<commit>.json
+    python -m benchmarks.run_benchmarks --db postgres        # service benchmarks against the DB_* database
+
+Service benchmarks use FakePostgresDB (benchmarks/fake_db.py) unless --db postgres
+is given. Against Postgres, benchmark rows are written with user_id -1 and
+deleted again afterwards.
+
+Results are JSON keyed by benchmark name. --compare exits with status 1 when any
+benchmark's median is slower than the reference by more than --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fake_db import FakePostgresDB, make_history_rows
+from data.engine import MatchedBetCalculator, calculate_batch
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+BENCH_USER_ID = -1
+
+
+def measure(fn, repeat: int, number: int = 1) -> dict:
+    """Call fn number times per sample, repeat samples; times are per call, in seconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+def record(results: dict, name: str, fn, rows: int = 1, repeat: int = 5, number: int = 1):
+    stats = measure(fn, repeat, number)
+    stats["rows"] = rows
+    stats["rows_per_s"] = rows / stats["median_s"] if stats["median_s"] else None
+    results[name] = stats
+    print(f"{name:<45} {stats['median_s'] * 1e3:>12.3f} ms   {stats['rows_per_s'] or 0:>14,.0f} rows/s", file=sys.stderr)
+
+
+def bench_engine(results: dict, sizes: list):
+    def scalar_breakdown():
+        MatchedBetCalculator(10.0, 3.5, 0.0, 3.6, 0.02, False).get_bookie_exchange_breakdown()
+
+    def scalar_summary():
+        MatchedBetCalculator(10.0, 3.5, 0.0, 3.6, 0.02, False).detailed_summary()
+
+    record(results, "engine.scalar.breakdown", scalar_breakdown, number=10_000)
+    record(results, "engine.scalar.detailed_summary", scalar_summary, number=10_000)
+
+    rng = np.random.default_rng(0)
+    for n in sizes:
+        back_odds = rng.uniform(1.2, 10.0, n)
+        lay_odds = back_odds + rng.uniform(0.0, 0.5, n)
+        stake = rng.choice([5.0, 10.0, 20.0], n)
+        free_bet = rng.random(n) < 0.3
+        result = rng.choice(np.array(["back", "lay", "void", "unsettled"], dtype=object), n)
+        record(
+            results, f"engine.batch.{n}",
+            lambda: calculate_batch(np.where(free_bet, 0.0, stake), back_odds, lay_odds, 0.02,
+                                    free_bet, False, np.where(free_bet, stake, 0.0), result),
+            rows=n
+        )
+
+    calc = MatchedBetCalculator(10.0, 3.5, 0.0, 3.6, 0.02, False)
+    axis = np.linspace(1.5, 10.0, 100)
+    record(results, "engine.sensitivity.100x100x3", lambda: calc.sensitivity_surface(axis, axis, [0.0, 0.02, 0.05]), rows=30_000)
+
+
+def compute_row_profit(row):
+    """The history page's former row-by-row profit, kept as the baseline for compute_profits()."""
+    try:
+        back_stake = float(row.get("Back Stake", 0.0))
+        back_odds = float(row.get("Back Odds", 0.0))
+        lay_odds = float(row.get("Lay Odds", 0.0))
+        lay_cms = float(row.get("Lay Commission", 0.02))
+        free_sr = bool(row.get("Free SR", False))
+        bet_type = row.get("Bet Type", "Qualifying Bet")
+    except (ValueError, TypeError):
+        return 0.0
+
+    is_free_bet = "Free Bet" in bet_type
+
+    calculator = MatchedBetCalculator(
+        back_stake=back_stake if not is_free_bet else 0.0,
+        back_odds=back_odds,
+        back_cms=0.0,
+        lay_odds=lay_odds,
+        lay_cms=lay_cms,
+        free_sr=free_sr,
+        free_bet=is_free_bet,
+        free_bet_val=back_stake if is_free_bet else 0.0
+    )
+
+    result = row["Result"]
+    profits = calculator.get_bookie_exchange_breakdown()
+
+    if result == "back":
+        return profits['back_wins']['total']
+    elif result == "lay":
+        return profits['lay_wins']['total']
+    elif result == "void":
+        return 0.0
+    else:
+        return 0.0
+
+
+def compute_profits(df: pd.DataFrame) -> pd.Series:
+    """Vectorised compute_row_profit() over a whole history frame."""
+    back_stake = pd.to_numeric(df["Back Stake"], errors="coerce").to_numpy(dtype=float)
+    back_odds = pd.to_numeric(df["Back Odds"], errors="coerce").to_numpy(dtype=float)
+    lay_odds = pd.to_numeric(df["Lay Odds"], errors="coerce").to_numpy(dtype=float)
+    is_free_bet = df["Bet Type"].astype(str).str.contains("Free Bet", regex=False).to_numpy()
+    lay_cms = pd.to_numeric(df.get("Lay Commission", 0.02), errors="coerce")
+    free_sr = df.get("Free SR", False)
+
+    profits = calculate_batch(
+        back_stake=np.where(is_free_bet, 0.0, back_stake),
+        back_odds=back_odds,
+        lay_odds=lay_odds,
+        lay_cms=np.asarray(lay_cms, dtype=float),
+        free_sr=np.asarray(free_sr, dtype=bool),
+        free_bet=is_free_bet,
+        free_bet_val=np.where(is_free_bet, back_stake, 0.0),
+        result=df["Result"].to_numpy()
+    )["settled_profit"]
+
+    # Rows that compute_row_profit() could not parse count as 0.0
+    return pd.Series(np.where(np.isfinite(profits), profits, 0.0), index=df.index)
+
+
+def bench_history(results: dict, sizes: list, apply_limit: int):
+    from pages.Game_History import history_frame
+
+    for n in sizes:
+        rows = make_history_rows(n)
+        repeat = 5 if n <= 100_000 else 1
+        record(results, f"history.build_frame.{n}", lambda: history_frame(rows), rows=n, repeat=repeat)
+        df = history_frame(rows)
+        record(results, f"history.compute_profits.{n}", lambda: compute_profits(df), rows=n, repeat=repeat)
+        if n <= apply_limit:
+            record(results, f"history.apply_row_profit.{n}", lambda: df.apply(compute_row_profit, axis=1),
+                   rows=n, repeat=3 if n <= 100_000 else 1)
+
+
+def bench_service(results: dict, db: str):
+    from data import service
+    from data.cache import query_cache
+
+    prefix = f"service.{db}"
+    bets = [
+        {
+            "bookmaker": row[2], "event": row[3], "bet_type": row[4], "back_stake": row[5],
+            "back_odds": row[6], "exchange": row[7], "lay_odds": row[8], "lay_stake": row[9],
+            "lay_liability": row[10], "notes": "benchmark", "user_id": BENCH_USER_ID,
+        }
+        for row in make_history_rows(10_000)
+    ]
+
+    original_get_db = service.get_db
+    if db == "fake":
+        fake = FakePostgresDB(make_history_rows(10_000))
+        service.get_db = lambda: fake
+    else:
+        # Make sure the reads below have something to return
+        service.insert_bets(bets)
+
+    def uncached(fn):
+        def call():
+            query_cache.invalidate()
+            return fn()
+        return call
+
+    try:
+        record(results, f"{prefix}.get_all_bets", uncached(lambda: service.get_all_bets(BENCH_USER_ID)), rows=10_000)
+        record(results, f"{prefix}.get_all_bets.cached", lambda: service.get_all_bets(BENCH_USER_ID), number=1_000)
+        record(results, f"{prefix}.get_bets_page", uncached(lambda: service.get_bets_page(BENCH_USER_ID, page_size=50)),
+               rows=50, number=20)
+        record(results, f"{prefix}.get_profit_over_time", uncached(lambda: service.get_profit_over_time(BENCH_USER_ID)),
+               number=20)
+        record(results, f"{prefix}.insert_bet", lambda: service.insert_bet(bets[0]), number=20)
+        record(results, f"{prefix}.insert_bets.10000", lambda: service.insert_bets(bets), rows=len(bets), repeat=3)
+        ids = [row[0] for row in (service.get_bets_page(BENCH_USER_ID, page_size=50)[0] or [])]
+        record(results, f"{prefix}.update_bet_results.50",
+               lambda: service.update_bet_results({bet_id: "void" for bet_id in ids}), rows=len(ids), number=10)
+    finally:
+        service.get_db = original_get_db
+        if db == "postgres":
+            with service.get_db() as conn:
+                conn.execute("DELETE FROM matched_bets WHERE user_id = %s RETURNING id;", (BENCH_USER_ID,))
+        query_cache.invalidate()
+
+
+def git_revision() -> str:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip()
+        return f"{rev}-dirty" if dirty else rev
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: dict, reference_path: str, threshold: float) -> int:
+    with open(reference_path, encoding="utf-8") as f:
+        reference = json.load(f)
+    regressions = 0
+    print(f"\nCompared with {reference.get('commit', reference_path)}:", file=sys.stderr)
+    for name, stats in results.items():
+        old = reference["results"].get(name)
+        if not old:
+            continue
+        ratio = stats["median_s"] / old["median_s"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  <-- REGRESSION"
+            regressions += 1
+        print(f"{name:<45} {ratio:>7.2f}x{flag}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="Only run 1k/10k sizes")
+    parser.add_argument("--full", action="store_true", help="Also time the row-wise apply at 1M rows")
+    parser.add_argument("--only", choices=["engine", "history", "service"], action="append", help="Run only these groups")
+    parser.add_argument("--db", choices=["fake", "postgres"], default="fake", help="Service benchmark backend")
+    parser.add_argument("-o", "--output", help="Results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Reference results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before flagging (default: 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    groups = args.only or ["engine", "history", "service"]
+    sizes = [1_000, 10_000] if args.quick else [1_000, 100_000, 1_000_000]
+    apply_limit = 1_000_000 if args.full else 100_000
+
+    results = {}
+    if "engine" in groups:
+        bench_engine(results, sizes)
+    if "history" in groups:
+        bench_history(results, sizes, apply_limit)
+    if "service" in groups:
+        bench_service(results, args.db)
+
+    commit = git_revision()
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"\nWrote {output}", file=sys.stderr)
+
+    if args.compare:
+        return compare(results, args.compare, args.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
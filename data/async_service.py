@@ -0,0 +1,90 @@
+"""
+Async variant of the data/service.py API.
+
+Every call runs the matching service function on a thread pool sized to the
+connection pool (DB_POOL_MAX), so each query gets its own pooled connection
+and several can be in flight at once. Caching, cache invalidation and metrics
+are unchanged because the sync functions do the work.
+
+From async code:
+
+    rows, totals = await asyncio.gather(
+        async_service.get_bets_page(user_id),
+        async_service.get_bet_totals(user_id),
+    )
+
+From Streamlit (sync) code, fetch_parallel() runs the calls concurrently and
+waits for all of them, so the page waits for the slowest query rather than
+the sum of them:
+
+    data = fetch_parallel(
+        profit=partial(service.get_profit_over_time, user_id),
+        totals=partial(service.get_bet_totals, user_id),
+    )
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from data import service
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """The process-wide executor for database calls, created on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=int(os.getenv("DB_POOL_MAX", "10")),
+                    thread_name_prefix="arbify-db"
+                )
+    return _executor
+
+
+def _to_async(fn):
+    """Wrap a blocking service function as a coroutine function that runs it on the executor."""
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_executor(), functools.partial(fn, *args, **kwargs))
+    return wrapper
+
+
+get_profit_over_time = _to_async(service.get_profit_over_time)
+get_profit_curve = _to_async(service.get_profit_curve)
+rebuild_profit_rollup = _to_async(service.rebuild_profit_rollup)
+rebuild_open_exposure = _to_async(service.rebuild_open_exposure)
+insert_bet = _to_async(service.insert_bet)
+insert_bets = _to_async(service.insert_bets)
+insert_keyed_bets = _to_async(service.insert_keyed_bets)
+import_bets_file = _to_async(service.import_bets_file)
+delete_bet = _to_async(service.delete_bet)
+get_all_bets = _to_async(service.get_all_bets)
+get_bets_page = _to_async(service.get_bets_page)
+get_bet_totals = _to_async(service.get_bet_totals)
+get_analytics = _to_async(service.get_analytics)
+get_open_exposure = _to_async(service.get_open_exposure)
+update_bet_result = _to_async(service.update_bet_result)
+update_bet_results = _to_async(service.update_bet_results)
+
+
+def fetch_parallel(**calls) -> dict:
+    """
+    Run several blocking calls at once and return their results by name.
+
+    Each keyword maps a name to a zero-argument callable (use functools.partial
+    or a lambda to bind arguments). Blocks until every call has finished, then
+    raises the first exception if any call failed. Calls run in a copy of the
+    caller's context, so their queries show up in a profiled page run.
+    """
+    executor = get_executor()
+    futures = {name: executor.submit(contextvars.copy_context().run, call) for name, call in calls.items()}
+    wait(futures.values())
+    return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,99 @@
+import functools
+import inspect
+import os
+import threading
+from cachetools import TTLCache
+
+
+class QueryCache:
+    """
+    Process-wide TTL/LRU cache for read queries in data/service.py.
+
+    Entries are keyed by function name, user_id and the remaining call
+    arguments, so every Streamlit session in the process shares them. Writes
+    invalidate the entries of the users they touched (plus any un-scoped
+    entries); the TTL only bounds staleness from writes made by other processes.
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: float = 30.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {}
+
+    def _count(self, name: str, counter: str):
+        stats = self._stats.setdefault(name, {'hits': 0, 'misses': 0, 'invalidations': 0})
+        stats[counter] += 1
+
+    def cached(self, fn):
+        """Decorator caching fn's result per (user_id, arguments). fn must take a user_id parameter."""
+        signature = inspect.signature(fn)
+        name = fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            user_id = arguments.pop('user_id', None)
+            for param, value in list(arguments.items()):
+                if signature.parameters[param].kind is inspect.Parameter.VAR_KEYWORD:
+                    arguments[param] = tuple(sorted(value.items()))
+            key = (name, None if user_id is None else str(user_id), tuple(sorted(arguments.items())))
+
+            with self._lock:
+                try:
+                    value = self._cache[key]
+                    self._count(name, 'hits')
+                    return value
+                except KeyError:
+                    self._count(name, 'misses')
+
+            self._local.skip = False
+            value = fn(*args, **kwargs)
+            if not self._local.skip:
+                with self._lock:
+                    self._cache[key] = value
+            return value
+
+        return wrapper
+
+    def skip(self):
+        """Called from inside a cached function (e.g. on error) to keep its return value out of the cache."""
+        self._local.skip = True
+
+    def invalidate(self, user_ids=None):
+        """
+        Drop cached entries for the given user ids, and every un-scoped (user_id=None) entry.
+        With no user ids, drop everything.
+        """
+        with self._lock:
+            if user_ids is None:
+                for key in list(self._cache.keys()):
+                    self._count(key[0], 'invalidations')
+                self._cache.clear()
+                return
+            users = {None} | {str(u) for u in user_ids if u is not None}
+            for key in list(self._cache.keys()):
+                if key[1] in users:
+                    self._count(key[0], 'invalidations')
+                    self._cache.pop(key, None)
+
+    def stats(self) -> dict:
+        """Hit/miss/invalidation counters per function, plus current size and limits."""
+        with self._lock:
+            per_function = {name: dict(counts) for name, counts in self._stats.items()}
+            return {
+                'functions': per_function,
+                'hits': sum(c['hits'] for c in per_function.values()),
+                'misses': sum(c['misses'] for c in per_function.values()),
+                'size': len(self._cache),
+                'maxsize': self._cache.maxsize,
+                'ttl': self._cache.ttl,
+            }
+
+
+query_cache = QueryCache(
+    maxsize=int(os.getenv("ARBIFY_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("ARBIFY_CACHE_TTL", "30"))
+)
@@ -0,0 +1,25 @@
+import os
+from data.pg_connector import PostgresDB
+
+
+def get_db() -> PostgresDB:
+    """
+    Return a PostgresDB for the database configured in the environment (see setup.bash).
+
+    Every PostgresDB with the same settings shares one process-wide connection
+    pool, so this is cheap to call once per query.
+    """
+    return PostgresDB(
+        dbname=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        host=os.getenv("DB_HOST"),
+        port=os.getenv("DB_PORT", "5432"),
+        minconn=int(os.getenv("DB_POOL_MIN", "1")),
+        maxconn=int(os.getenv("DB_POOL_MAX", "10"))
+    )
+
+
+def get_pool_stats() -> dict:
+    """Return connection pool stats for this process."""
+    return PostgresDB.pool_stats()
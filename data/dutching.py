@@ -0,0 +1,231 @@
+"""
+Stake allocation for N-outcome dutching and arbitrage across several venues.
+
+A market has N mutually exclusive outcomes, exactly one of which happens, and
+N legs. Each leg is a back bet at a bookmaker or a lay bet at an exchange on
+one outcome, with its own commission (charged on net winnings). By default leg
+i is on outcome i (a dutch across every outcome), but legs may share an
+outcome: a back and a lay of the same selection is the 2-outcome market
+(selection, everything else) of a classic matched bet. Stakes are chosen so
+the profit is the same whichever outcome happens: positive for an arbitrage,
+the cost of covering every outcome otherwise.
+
+For leg i on outcome o_i with stake x_i (the backer's stake for a lay), the
+profit if outcome j happens is P_j = sum_i A[j, i] * x_i, with
+
+    back:  A[o_i, i] = (odds_i - 1) * (1 - cms_i)    A[j, i] = -1          (j != o_i)
+    lay:   A[o_i, i] = -(odds_i - 1)                 A[j, i] = 1 - cms_i   (j != o_i)
+
+so equal-profit stakes solve A x = P * 1. They are scaled to the requested
+outlay (back stakes plus lay liabilities). They are then scaled down so no
+leg exceeds its max stake, and finally rounded.
+
+solve_dutch() handles one market; solve_dutch_batch() solves thousands at once
+with one batched np.linalg.solve, padding markets with fewer outcomes.
+solve_dutch_frame() takes long-format legs (one row per market outcome), as
+produced by price feeds and the scanner.
+"""
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+# Systems worse conditioned than this are treated as singular: their stakes would be noise
+MAX_CONDITION = 1e10
+
+
+class DutchingResult(NamedTuple):
+    """
+    Solution for one market. Per-leg arrays are in the order the legs were given.
+
+    feasible is False when no set of non-negative stakes gives every outcome
+    the same profit (e.g. inconsistent lay prices); every figure is then NaN.
+    """
+    stakes: np.ndarray
+    liabilities: np.ndarray
+    profits: np.ndarray
+    worst_profit: float
+    outlay: float
+    roi: float
+    is_arb: bool
+    feasible: bool
+
+
+def _payoff_matrix(odds: np.ndarray, lay: np.ndarray, cms: np.ndarray, outcome: np.ndarray) -> np.ndarray:
+    """A[..., j, i]: profit on outcome j per unit stake on leg i (see module docstring)."""
+    n = odds.shape[-1]
+    on_outcome = np.arange(n)[:, None] == outcome[..., None, :]
+    win = np.where(lay, -(odds - 1), (odds - 1) * (1 - cms))
+    lose = np.where(lay, 1 - cms, -1.0)
+    # Leg i is column i: broadcast the per-leg values along the outcome axis
+    return np.where(on_outcome, win[..., None, :], lose[..., None, :])
+
+
+def solve_dutch_batch(
+    odds,
+    lay=False,
+    cms=0.0,
+    outlay=100.0,
+    max_stake=np.inf,
+    round_to=None,
+    active=None,
+    outcome=None
+) -> dict:
+    """
+    Solve many markets at once.
+
+    Parameters (arrays of shape (markets, legs); scalars broadcast):
+    - odds: decimal odds of each leg
+    - lay: True for lay legs, False for back legs
+    - cms: commission on each leg's net winnings (as decimal)
+    - outlay: per market, total of back stakes plus lay liabilities to commit
+    - max_stake: per leg, the largest stake (backer's stake for lays) allowed
+    - round_to: round stakes to a multiple of this (e.g. 0.01, 0.5); None leaves them unrounded
+    - active: False for padding legs in markets with fewer outcomes; they must come last
+    - outcome: outcome index (0 .. active legs - 1) each leg is on; default: its own position
+
+    Returns a dict of arrays: stakes, liabilities and profits (markets, legs),
+    worst_profit, outlay, roi, is_arb and feasible (markets,). Profits are
+    recomputed after capping and rounding, so they show the small
+    differences rounding introduces. Padding legs get stake 0 and profit NaN.
+    """
+    odds = np.atleast_2d(np.asarray(odds, dtype=float))
+    shape = odds.shape
+    lay = np.broadcast_to(np.asarray(lay, dtype=bool), shape)
+    cms = np.broadcast_to(np.asarray(cms, dtype=float), shape)
+    max_stake = np.broadcast_to(np.asarray(max_stake, dtype=float), shape)
+    active = np.ones(shape, dtype=bool) if active is None else np.broadcast_to(np.asarray(active, dtype=bool), shape)
+    outlay = np.broadcast_to(np.asarray(outlay, dtype=float), shape[:1])
+    positions = np.broadcast_to(np.arange(shape[1]), shape)
+    outcome = positions if outcome is None else np.where(active, np.asarray(outcome, dtype=int), positions)
+
+    # Padding legs become identity rows/columns with a zero right-hand side, so they solve to 0
+    safe_odds = np.where(active, odds, 2.0)
+    A = _payoff_matrix(safe_odds, lay, cms, outcome)
+    padding = ~active
+    A = np.where(padding[:, None, :] | padding[:, :, None], 0.0, A)
+    A = A + np.eye(shape[1]) * padding[:, None, :]
+    rhs = active.astype(float)
+
+    # Singular systems (e.g. a book summing to exactly 100%) have no equal-profit solution.
+    # The determinant scales with the odds and the number of legs, so judge by the condition number
+    with np.errstate(divide="ignore", invalid="ignore"):
+        singular = ~(np.linalg.cond(A) < MAX_CONDITION)
+    A[singular] = np.eye(shape[1])
+    unit = np.linalg.solve(A, rhs[..., None])[..., 0]
+
+    # Equal profit of +1 per unit solution; flip when the stakes come out negative (a dutching cost)
+    sign = np.where(np.all((unit >= 0) | padding, axis=1), 1.0, -1.0)
+    unit = unit * sign[:, None]
+    feasible = ~singular & np.all((unit >= 0) | padding, axis=1) & np.all((odds > 1) | padding, axis=1)
+
+    liability_per_stake = np.where(lay, odds - 1, 1.0)
+    unit_outlay = np.sum(np.where(active, unit * liability_per_stake, 0.0), axis=1)
+    # Infeasible markets carry NaN/inf through the arithmetic below and are masked at the end
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = outlay / unit_outlay
+        # Scale down together, so profits stay equal, until every leg is within its limit
+        cap = np.min(np.where(active & (unit > 0), max_stake / (unit * scale[:, None]), np.inf), axis=1)
+        scale = scale * np.minimum(cap, 1.0)
+        stakes = unit * scale[:, None]
+        if round_to:
+            stakes = np.round(stakes / round_to) * round_to
+        stakes = np.where(active, stakes, 0.0)
+
+        profits = np.einsum("mji,mi->mj", _payoff_matrix(safe_odds, lay, cms, outcome), stakes)
+        liabilities = np.where(lay, stakes * (odds - 1), 0.0)
+        total_outlay = np.sum(np.where(lay, liabilities, stakes), axis=1)
+        worst = np.min(np.where(active, profits, np.inf), axis=1)
+        roi = worst / total_outlay
+    profits = np.where(active, profits, np.nan)
+
+    invalid = ~feasible
+    return {
+        "stakes": np.where(invalid[:, None], np.nan, stakes),
+        "liabilities": np.where(invalid[:, None], np.nan, liabilities),
+        "profits": np.where(invalid[:, None], np.nan, profits),
+        "worst_profit": np.where(invalid, np.nan, worst),
+        "outlay": np.where(invalid, np.nan, total_outlay),
+        "roi": np.where(invalid, np.nan, roi),
+        "is_arb": feasible & (worst > 0),
+        "feasible": feasible,
+    }
+
+
+def solve_dutch(odds, lay=False, cms=0.0, outlay=100.0, max_stake=np.inf, round_to=0.01, outcome=None) -> DutchingResult:
+    """
+    Solve one market. odds, lay, cms, max_stake and outcome are per-leg
+    sequences (or scalars for every leg); see solve_dutch_batch() for their meaning.
+    """
+    odds = np.asarray(odds, dtype=float)
+    n = len(odds)
+    out = solve_dutch_batch(
+        odds[None, :],
+        lay=np.broadcast_to(np.asarray(lay, dtype=bool), (n,))[None, :],
+        cms=np.broadcast_to(np.asarray(cms, dtype=float), (n,))[None, :],
+        outlay=outlay,
+        max_stake=np.broadcast_to(np.asarray(max_stake, dtype=float), (n,))[None, :],
+        round_to=round_to,
+        outcome=None if outcome is None else np.broadcast_to(np.asarray(outcome, dtype=int), (n,))[None, :]
+    )
+    return DutchingResult(
+        stakes=out["stakes"][0],
+        liabilities=out["liabilities"][0],
+        profits=out["profits"][0],
+        worst_profit=float(out["worst_profit"][0]),
+        outlay=float(out["outlay"][0]),
+        roi=float(out["roi"][0]),
+        is_arb=bool(out["is_arb"][0]),
+        feasible=bool(out["feasible"][0]),
+    )
+
+
+def solve_dutch_frame(
+    legs: pd.DataFrame,
+    outlay: float = 100.0,
+    round_to=None,
+    market_col: str = "market",
+    outcome_col: str = "selection"
+) -> pd.DataFrame:
+    """
+    Solve every market in a long-format frame with one row per leg.
+
+    Needs columns market_col, odds and side ('back'/'lay'). Optional columns
+    are outcome_col (legs with the same value are on the same outcome;
+    default: every leg on its own outcome), commission (default 0) and
+    max_stake (default unlimited). Returns the
+    legs with stake, liability and profit (if that outcome happens) added, plus
+    the market's worst_profit, roi and is_arb on every row.
+    """
+    legs = legs.reset_index(drop=True)
+    markets, market_index = np.unique(legs[market_col].to_numpy(), return_inverse=True)
+    position = legs.groupby(market_index).cumcount().to_numpy()
+    width = int(position.max()) + 1 if len(legs) else 1
+
+    def padded(values, fill, dtype):
+        grid = np.full((len(markets), width), fill, dtype=dtype)
+        grid[market_index, position] = values
+        return grid
+
+    active = padded(True, False, bool)
+    outcome = None
+    if outcome_col in legs:
+        # Number each market's distinct outcomes 0, 1, ...
+        ranks = legs[outcome_col].astype(str).groupby(market_index).rank(method="dense")
+        outcome = padded(ranks.to_numpy(dtype=int) - 1, 0, int)
+    out = solve_dutch_batch(
+        padded(legs["odds"].to_numpy(dtype=float), 2.0, float),
+        lay=padded(legs["side"].str.lower().eq("lay").to_numpy(), False, bool),
+        cms=padded(legs["commission"].to_numpy(dtype=float) if "commission" in legs else 0.0, 0.0, float),
+        outlay=outlay,
+        max_stake=padded(legs["max_stake"].to_numpy(dtype=float) if "max_stake" in legs else np.inf, np.inf, float),
+        round_to=round_to,
+        active=active,
+        outcome=outcome
+    )
+    solved = legs.copy()
+    for col, per_leg in (("stake", "stakes"), ("liability", "liabilities"), ("profit", "profits")):
+        solved[col] = out[per_leg][market_index, position]
+    for col in ("worst_profit", "roi", "is_arb"):
+        solved[col] = out[col][market_index]
+    return solved
@@ -1,4 +1,78 @@
-import streamlit as st
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+
+
+class MatchedBetResult(NamedTuple):
+    """
+    Every figure for one matched bet, produced in a single pass by compute_matched_bet().
+
+    A NamedTuple (no per-instance __dict__) so it is immutable, compact and
+    cheap enough to build by the million. P&L components are unrounded;
+    MatchedBetCalculator.get_bookie_exchange_breakdown() rounds them for display.
+    """
+    lay_stake: float
+    liability: float
+    back_wins: float
+    lay_wins: float
+    back_wins_bookie_pl: float
+    back_wins_exchange_pl: float
+    lay_wins_bookie_pl: float
+    lay_wins_exchange_pl: float
+    final_profit: float
+
+
+def compute_matched_bet(
+    back_stake: float,
+    back_odds: float,
+    lay_odds: float,
+    lay_cms: float,
+    free_sr: bool,
+    free_bet: bool = False,
+    free_bet_val: float = 0.0
+) -> MatchedBetResult:
+    """
+    Compute every MatchedBetCalculator figure once and return them as a MatchedBetResult.
+    Arguments are as for MatchedBetCalculator.
+    """
+    lay_divisor = lay_odds - lay_cms
+    if free_bet:
+        if free_sr:
+            # Free bet - stake returned (SR)
+            lay_stake = (back_odds * free_bet_val) / lay_divisor
+            back_wins = free_bet_val * back_odds - lay_stake * (lay_odds - 1)
+            lay_wins = (1 - lay_cms) * lay_stake
+            back_wins_bookie_pl = free_bet_val * back_odds - free_bet_val
+        else:
+            # Free bet - stake NOT returned (SNR)
+            lay_stake = (back_odds - 1) / lay_divisor * free_bet_val
+            back_wins = (back_odds - 1) * free_bet_val - (lay_odds - 1) * lay_stake
+            lay_wins = lay_stake * (1 - lay_cms)
+            back_wins_bookie_pl = free_bet_val * (back_odds - 1)
+        lay_wins_bookie_pl = 0.0
+        final_profit = lay_stake * (1 - lay_cms)
+    else:
+        # Qualifying/welcome bet
+        lay_stake = back_odds * back_stake / lay_divisor
+        back_wins = back_stake * (back_odds - 1) - lay_stake * (lay_odds - 1)
+        lay_wins = lay_stake * (1 - lay_cms) - back_stake
+        back_wins_bookie_pl = back_stake * back_odds - back_stake
+        lay_wins_bookie_pl = -back_stake
+        final_profit = lay_stake * (1 - lay_cms) - back_stake
+
+    liability = lay_stake * (lay_odds - 1)
+    return MatchedBetResult(
+        lay_stake,
+        liability,
+        back_wins,
+        lay_wins,
+        back_wins_bookie_pl,
+        -liability,
+        lay_wins_bookie_pl,
+        lay_stake * (1 - lay_cms),
+        final_profit
+    )
+
 
 class MatchedBetCalculator:
     """
@@ -47,18 +121,29 @@ class MatchedBetCalculator:
             return 'Free Bet (Stake Returned)' if self.free_sr else 'Free Bet (Stake Not Returned)'
         return 'Qualifying/Welcome Bet'
     
+    def __setattr__(self, name, value):
+        # Changing any input invalidates the cached result
+        object.__setattr__(self, name, value)
+        if name != '_result':
+            object.__setattr__(self, '_result', None)
+
+    def calculate(self) -> MatchedBetResult:
+        """Return every figure for this bet, computing them on first use only"""
+        if self._result is None:
+            self._result = compute_matched_bet(
+                self.back_stake,
+                self.back_odds,
+                self.lay_odds,
+                self.lay_cms,
+                self.free_sr,
+                self.free_bet,
+                self.free_bet_val
+            )
+        return self._result
+
     def get_required_lay_stake(self) -> float:
         """Calculate the ideal lay stake for even profit"""
-        if self.free_bet:
-            if self.free_sr:
-                # Free bet - stake returned (SR)
-                return (self.back_odds * self.free_bet_val) / (self.lay_odds - self.lay_cms)
-            else:
-                # Free bet - stake NOT returned (SNR)
-                return (self.back_odds - 1) / (self.lay_odds - self.lay_cms) * self.free_bet_val
-        else:
-            # Qualifying/welcome bet
-            return self.back_odds * self.back_stake / (self.lay_odds - self.lay_cms)
+        return self.calculate().lay_stake
     
     def get_lay_liability(self, lay_stake: float) -> float:
         """Calculate the lay liability (potential loss on lay bet)"""
@@ -66,25 +151,10 @@ class MatchedBetCalculator:
     
     def get_total_profit(self) -> dict:
         """Calculate profits for both win scenarios"""
-        lay_stake = self.get_required_lay_stake()
-        
-        if self.free_bet:
-            if self.free_sr:
-                # Free bet - stake returned (SR)
-                back_wins = self.free_bet_val * self.back_odds - lay_stake * (self.lay_odds - 1)
-                lay_wins = (1 - self.lay_cms) * lay_stake
-            else:
-                # Free bet - stake NOT returned (SNR)
-                back_wins = (self.back_odds - 1) * self.free_bet_val - (self.lay_odds - 1) * lay_stake
-                lay_wins = lay_stake * (1 - self.lay_cms)
-        else:
-            # Qualifying/welcome bet
-            back_wins = self.back_stake * (self.back_odds - 1) - lay_stake * (self.lay_odds - 1)
-            lay_wins = lay_stake * (1 - self.lay_cms) - self.back_stake
-        
+        result = self.calculate()
         return {
-            'back_wins': back_wins,
-            'lay_wins': lay_wins
+            'back_wins': result.back_wins,
+            'lay_wins': result.lay_wins
         }
 
 
@@ -94,39 +164,17 @@ class MatchedBetCalculator:
         Returns a detailed breakdown of bookie and exchange P&L for both outcomes:
         back bet wins and lay bet wins.
         """
-        lay_stake = self.get_required_lay_stake()
-        liability = lay_stake * (self.lay_odds - 1)
-        lay_profit = lay_stake * (1 - self.lay_cms)
-
-        if self.free_bet:
-            stake_used = self.free_bet_val
-            if self.free_sr:
-                bookie_win = stake_used * self.back_odds
-            else:
-                bookie_win = stake_used * (self.back_odds - 1)
-            bookie_loss = 0
-        else:
-            stake_used = self.back_stake
-            bookie_win = stake_used * self.back_odds
-            bookie_loss = -stake_used
-
-        # Build output dict
-        back_win_bookie_pl = (bookie_win - stake_used) if not self.free_bet or self.free_sr else bookie_win
-        lay_win_bookie_pl = bookie_loss
-
-        back_win_exchange_pl = -liability
-        lay_win_exchange_pl = lay_profit
-
+        result = self.calculate()
         return {
             'back_wins': {
-                'bookie_pl': round(back_win_bookie_pl, 2),
-                'exchange_pl': round(back_win_exchange_pl, 2),
-                'total': round(back_win_bookie_pl + back_win_exchange_pl, 2)
+                'bookie_pl': round(result.back_wins_bookie_pl, 2),
+                'exchange_pl': round(result.back_wins_exchange_pl, 2),
+                'total': round(result.back_wins_bookie_pl + result.back_wins_exchange_pl, 2)
             },
             'lay_wins': {
-                'bookie_pl': round(lay_win_bookie_pl, 2),
-                'exchange_pl': round(lay_win_exchange_pl, 2),
-                'total': round(lay_win_bookie_pl + lay_win_exchange_pl, 2)
+                'bookie_pl': round(result.lay_wins_bookie_pl, 2),
+                'exchange_pl': round(result.lay_wins_exchange_pl, 2),
+                'total': round(result.lay_wins_bookie_pl + result.lay_wins_exchange_pl, 2)
             }
         }
 
@@ -134,33 +182,61 @@ class MatchedBetCalculator:
     
     def get_final_profit(self) -> float:
         """Calculate the final expected profit"""
-        lay_stake = self.get_required_lay_stake()
-        
-        if self.free_bet:
-            # For free bets, final profit is the lay wins scenario
-            return lay_stake * (1 - self.lay_cms) if self.free_sr else lay_stake * (1 - self.lay_cms)
-        else:
-            # For qualifying/welcome bets
-            return lay_stake * (1 - self.lay_cms) - self.back_stake
+        return self.calculate().final_profit
     
+    def sensitivity_surface(self, back_odds, lay_odds, lay_cms) -> dict:
+        """
+        Evaluate this bet over a grid of back odds x lay odds x lay commission in one
+        vectorised pass; the stake and bet type are taken from the calculator.
+
+        Parameters:
+        - back_odds, lay_odds, lay_cms: 1-D sequences of values to sweep
+
+        Returns a dict of arrays shaped (len(back_odds), len(lay_odds), len(lay_cms)):
+        lay_stake, liability, back_wins, lay_wins (as get_total_profit()) and
+        worst_case (the lower of back_wins and lay_wins).
+        """
+        back_odds = np.asarray(back_odds, dtype=float)[:, None, None]
+        lay_odds = np.asarray(lay_odds, dtype=float)[None, :, None]
+        lay_cms = np.asarray(lay_cms, dtype=float)[None, None, :]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lay_divisor = lay_odds - lay_cms
+            if self.free_bet:
+                if self.free_sr:
+                    lay_stake = (back_odds * self.free_bet_val) / lay_divisor
+                    back_wins = self.free_bet_val * back_odds - lay_stake * (lay_odds - 1)
+                else:
+                    lay_stake = (back_odds - 1) / lay_divisor * self.free_bet_val
+                    back_wins = (back_odds - 1) * self.free_bet_val - (lay_odds - 1) * lay_stake
+                lay_wins = lay_stake * (1 - lay_cms)
+            else:
+                lay_stake = back_odds * self.back_stake / lay_divisor
+                back_wins = self.back_stake * (back_odds - 1) - lay_stake * (lay_odds - 1)
+                lay_wins = lay_stake * (1 - lay_cms) - self.back_stake
+            liability = lay_stake * (lay_odds - 1)
+
+        return {
+            'lay_stake': lay_stake,
+            'liability': liability,
+            'back_wins': back_wins,
+            'lay_wins': lay_wins,
+            'worst_case': np.minimum(back_wins, lay_wins),
+        }
+
     def summary(self) -> str:
         """Return a formatted summary of the calculation"""
-        lay_stake = self.get_required_lay_stake()
-        liability = self.get_lay_liability(lay_stake)
-        profits = self.get_total_profit()
+        result = self.calculate()
         return (
-            f"Required Lay Stake: £{lay_stake:.2f}\n"
-            f"Lay Liability: £{liability:.2f}\n"
-            f"Profit if Back Wins: £{profits['back_wins']:.2f}\n"
-            f"Profit if Lay Wins: £{profits['lay_wins']:.2f}"
+            f"Required Lay Stake: £{result.lay_stake:.2f}\n"
+            f"Lay Liability: £{result.liability:.2f}\n"
+            f"Profit if Back Wins: £{result.back_wins:.2f}\n"
+            f"Profit if Lay Wins: £{result.lay_wins:.2f}"
         )
     
     def detailed_summary(self) -> str:
         """Return a detailed formatted summary"""
-        lay_stake = self.get_required_lay_stake()
-        liability = self.get_lay_liability(lay_stake)
-        profits = self.get_total_profit()
-        final_profit = self.get_final_profit()
+        result = self.calculate()
         
         stake_used = self.free_bet_val if self.free_bet else self.back_stake
         
@@ -173,12 +249,122 @@ class MatchedBetCalculator:
             f"Back Odds: {self.back_odds:.2f}\n"
             f"Lay Odds: {self.lay_odds:.2f}\n"
             f"Lay Commission: {self.lay_cms*100:.1f}%\n\n"
-            f"RECOMMENDED LAY STAKE: £{lay_stake:.2f}\n"
-            f"LAY LIABILITY: £{liability:.2f}\n\n"
+            f"RECOMMENDED LAY STAKE: £{result.lay_stake:.2f}\n"
+            f"LAY LIABILITY: £{result.liability:.2f}\n\n"
             f"PROFIT SCENARIOS:\n"
-            f"  If back bet wins: £{profits['back_wins']:.2f}\n"
-            f"  If lay bet wins:  £{profits['lay_wins']:.2f}\n\n"
-            f"FINAL PROFIT: £{final_profit:.2f}\n"
+            f"  If back bet wins: £{result.back_wins:.2f}\n"
+            f"  If lay bet wins:  £{result.lay_wins:.2f}\n\n"
+            f"FINAL PROFIT: £{result.final_profit:.2f}\n"
             f"{'='*50}"
         )
 
+
+
+def _round2(values: np.ndarray) -> np.ndarray:
+    """
+    Round to 2 decimal places exactly like the builtin round().
+
+    np.round scales by 100 before rounding, which can pick the other side of a
+    tie for values sitting right on a half-penny; those few are re-rounded
+    with the builtin so results match the scalar calculator bit for bit.
+    """
+    rounded = np.array(np.round(values, 2))
+    scaled = values * 100
+    ties = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if ties.any():
+        rounded[ties] = [round(float(v), 2) for v in values[ties]]
+    return rounded
+
+
+def calculate_batch(
+    back_stake,
+    back_odds,
+    lay_odds,
+    lay_cms,
+    free_bet=False,
+    free_sr=False,
+    free_bet_val=0.0,
+    result=None
+) -> dict:
+    """
+    Vectorised MatchedBetCalculator for many bets at once.
+
+    Every argument may be a scalar or an array; they are broadcast together.
+    The figures match MatchedBetCalculator.get_required_lay_stake(),
+    get_lay_liability() and get_bookie_exchange_breakdown() row for row.
+
+    Parameters:
+    - back_stake, back_odds, lay_odds, lay_cms, free_bet, free_sr, free_bet_val:
+      as for MatchedBetCalculator
+    - result: optional per-bet result ('back', 'lay', 'void', 'unsettled');
+      when given, 'settled_profit' is included in the output
+
+    Returns a dict of float arrays:
+    lay_stake, liability, back_wins_bookie_pl, back_wins_exchange_pl,
+    back_wins_total, lay_wins_bookie_pl, lay_wins_exchange_pl, lay_wins_total
+    and, if result is given, settled_profit.
+    """
+    back_stake, back_odds, lay_odds, lay_cms, free_bet_val = np.broadcast_arrays(
+        *(np.asarray(v, dtype=float) for v in (back_stake, back_odds, lay_odds, lay_cms, free_bet_val))
+    )
+    free_bet = np.broadcast_to(np.asarray(free_bet, dtype=bool), back_stake.shape)
+    free_sr = np.broadcast_to(np.asarray(free_sr, dtype=bool), back_stake.shape)
+    free_snr = free_bet & ~free_sr
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lay_divisor = lay_odds - lay_cms
+        lay_stake = np.where(
+            free_snr,
+            (back_odds - 1) / lay_divisor * free_bet_val,
+            back_odds * np.where(free_bet, free_bet_val, back_stake) / lay_divisor
+        )
+        liability = lay_stake * (lay_odds - 1)
+        lay_profit = lay_stake * (1 - lay_cms)
+
+        stake_used = np.where(free_bet, free_bet_val, back_stake)
+        back_win_bookie_pl = np.where(
+            free_snr,
+            stake_used * (back_odds - 1),
+            stake_used * back_odds - stake_used
+        )
+        lay_win_bookie_pl = np.where(free_bet, 0.0, -back_stake)
+        back_win_exchange_pl = -liability
+        lay_win_exchange_pl = lay_profit
+
+        out = {
+            'lay_stake': lay_stake,
+            'liability': liability,
+            'back_wins_bookie_pl': _round2(back_win_bookie_pl),
+            'back_wins_exchange_pl': _round2(back_win_exchange_pl),
+            'back_wins_total': _round2(back_win_bookie_pl + back_win_exchange_pl),
+            'lay_wins_bookie_pl': _round2(lay_win_bookie_pl),
+            'lay_wins_exchange_pl': _round2(lay_win_exchange_pl),
+            'lay_wins_total': _round2(lay_win_bookie_pl + lay_win_exchange_pl),
+        }
+
+    if result is not None:
+        result = np.broadcast_to(np.asarray(result, dtype=object), back_stake.shape)
+        out['settled_profit'] = np.select(
+            [result == 'back', result == 'lay'],
+            [out['back_wins_total'], out['lay_wins_total']],
+            default=0.0
+        )
+
+    return out
+
+
+def calculate_batch_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    DataFrame wrapper around calculate_batch().
+
+    Columns are named after the MatchedBetCalculator arguments; back_stake,
+    back_odds, lay_odds and lay_cms are required, free_bet, free_sr,
+    free_bet_val and result are optional. Returns a frame with the same index.
+    """
+    kwargs = {
+        col: df[col].to_numpy()
+        for col in ('back_stake', 'back_odds', 'lay_odds', 'lay_cms',
+                    'free_bet', 'free_sr', 'free_bet_val', 'result')
+        if col in df.columns
+    }
+    return pd.DataFrame(calculate_batch(**kwargs), index=df.index)
@@ -0,0 +1,85 @@
+"""
+Local stand-in for bookmaker/exchange price feeds, for developing and testing data.feeds.
+
+    GET /prices/<venue>?side=back|lay   JSON list of the venue's current prices
+    WS  /ws/<venue>?side=back|lay       pushes changed prices every `tick` seconds
+
+Prices follow a random walk over a fixed set of events and selections, so
+several venues quote the same selections and the calculator/scanner have
+something to pair up.
+"""
+import asyncio
+import json
+import random
+
+import tornado.web
+import tornado.websocket
+
+SELECTIONS = ("Home", "Draw", "Away")
+
+
+class StubMarket:
+    """Random-walk prices per (venue, side, event, selection)."""
+
+    def __init__(self, events: int = 20, seed: int | None = None):
+        self.rng = random.Random(seed)
+        self.events = [f"Stub FC {i} vs Stub United {i}" for i in range(events)]
+        self._prices = {}
+
+    def prices(self, venue: str, side: str) -> list:
+        quotes = []
+        for event in self.events:
+            for selection in SELECTIONS:
+                key = (venue, side, event, selection)
+                odds = self._prices.get(key) or self.rng.uniform(1.5, 8.0)
+                odds = max(1.01, odds * self.rng.uniform(0.98, 1.02))
+                self._prices[key] = odds
+                quote = {"event": event, "selection": selection, "venue": venue, "side": side, "odds": round(odds, 2)}
+                if side == "lay":
+                    quote["commission"] = 0.02
+                quotes.append(quote)
+        return quotes
+
+
+class PricesHandler(tornado.web.RequestHandler):
+    def initialize(self, market: StubMarket):
+        self.market = market
+
+    def get(self, venue):
+        self.set_header("Content-Type", "application/json")
+        self.write(json.dumps(self.market.prices(venue, self.get_argument("side", "back"))))
+
+
+class PricesSocket(tornado.websocket.WebSocketHandler):
+    def initialize(self, market: StubMarket, tick: float):
+        self.market = market
+        self.tick = tick
+        self._task = None
+
+    def open(self, venue):
+        self._task = asyncio.create_task(self._push(venue, self.get_argument("side", "lay")))
+
+    async def _push(self, venue, side):
+        try:
+            while True:
+                await self.write_message(json.dumps(self.market.prices(venue, side)))
+                await asyncio.sleep(self.tick)
+        except tornado.websocket.WebSocketClosedError:
+            pass
+
+    def on_close(self):
+        if self._task is not None:
+            self._task.cancel()
+
+
+def make_app(events: int = 20, tick: float = 1.0, seed: int | None = None) -> tornado.web.Application:
+    market = StubMarket(events, seed)
+    return tornado.web.Application([
+        (r"/prices/([^/]+)", PricesHandler, {"market": market}),
+        (r"/ws/([^/]+)", PricesSocket, {"market": market, "tick": tick}),
+    ])
+
+
+async def serve(port: int = 8765, events: int = 20, tick: float = 1.0):
+    make_app(events, tick).listen(port)
+    await asyncio.Event().wait()
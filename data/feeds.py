@@ -0,0 +1,335 @@
+"""
+Asyncio ingestion of bookmaker/exchange price feeds.
+
+Each source is a FeedAdapter that polls (HttpPollingAdapter) or subscribes to
+(WebSocketAdapter) one price endpoint. Adapters run as tasks on a single event
+loop in a background thread, each with its own rate limit and exponential
+backoff. They push normalised Price tuples onto a bounded queue, and one
+consumer applies them to a thread-safe LatestPriceStore that Streamlit pages
+read from.
+
+Endpoints return JSON: one price object or a list of them, with the same
+fields as the scanner feed (event, selection, venue, side, odds and optional
+commission). An adapter's venue/side settings fill in missing fields.
+
+Sources are configured in a JSON file named by ARBIFY_FEEDS_CONFIG:
+
+    {"sources": [
+        {"type": "http", "name": "bet365", "url": "http://...", "interval": 2, "rate_limit": 1, "venue": "Bet365", "side": "back"},
+        {"type": "websocket", "name": "smarkets", "url": "ws://...", "venue": "Smarkets", "side": "lay"}
+    ]}
+"""
+import abc
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+
+class Price(NamedTuple):
+    event: str
+    selection: str
+    venue: str
+    side: str
+    odds: float
+    commission: float | None
+    source: str
+    received_at: float
+
+
+class LatestPriceStore:
+    """Latest price per (event, selection, venue, side); safe to read from any thread."""
+
+    def __init__(self):
+        self._prices = {}
+        self._lock = threading.Lock()
+
+    def update(self, prices):
+        with self._lock:
+            for price in prices:
+                key = (price.event, price.selection, price.venue, price.side)
+                if price.odds > 1:
+                    self._prices[key] = price
+                else:
+                    # Zero/blank odds mean the price was pulled
+                    self._prices.pop(key, None)
+
+    def selections(self) -> list:
+        """Sorted (event, selection) pairs that have at least one price."""
+        with self._lock:
+            return sorted({(p.event, p.selection) for p in self._prices.values()})
+
+    def best(self, event: str, selection: str) -> tuple:
+        """(best back Price, best lay Price) for a selection; either may be None."""
+        with self._lock:
+            prices = [p for (e, s, _, _), p in self._prices.items() if e == event and s == selection]
+        backs = [p for p in prices if p.side == "back"]
+        lays = [p for p in prices if p.side == "lay"]
+        return (
+            max(backs, key=lambda p: p.odds) if backs else None,
+            min(lays, key=lambda p: p.odds) if lays else None,
+        )
+
+    def snapshot(self) -> list:
+        """Every current price as a scanner-style dict (see data.scanner.read_prices)."""
+        with self._lock:
+            prices = list(self._prices.values())
+        return [
+            {"event": p.event, "selection": p.selection, "venue": p.venue, "side": p.side,
+             "odds": p.odds, "commission": p.commission}
+            for p in prices
+        ]
+
+    def __len__(self):
+        return len(self._prices)
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` requests per second with bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class FeedAdapter(abc.ABC):
+    """
+    Base class for one price source.
+
+    Subclasses must implement stream(), an async generator of raw price dicts;
+    one that doesn't fails when it is constructed. run()
+    normalises them onto the queue and restarts stream() with exponential
+    backoff (plus jitter) when it fails.
+    """
+
+    def __init__(self, name: str, venue: str | None = None, side: str | None = None,
+                 rate_limit: float = 1.0, max_backoff: float = 60.0):
+        self.name = name
+        self.venue = venue
+        self.side = side
+        self.limiter = RateLimiter(rate_limit)
+        self.max_backoff = max_backoff
+        self.stats = {"messages": 0, "prices": 0, "errors": 0, "last_update": None, "last_error": None, "backoff": 0.0}
+
+    @abc.abstractmethod
+    def stream(self):
+        """Yield raw price messages (decoded JSON) from the source, forever."""
+
+    def normalize(self, raw) -> list:
+        """Turn one decoded message (a price dict or a list of them) into Prices, dropping malformed entries."""
+        items = raw if isinstance(raw, list) else [raw]
+        now = time.time()
+        prices = []
+        for item in items:
+            try:
+                side = str(item.get("side") or self.side).lower()
+                if side not in ("back", "lay"):
+                    continue
+                commission = item.get("commission")
+                prices.append(Price(
+                    event=str(item["event"]),
+                    selection=str(item["selection"]),
+                    venue=str(item.get("venue") or self.venue or self.name),
+                    side=side,
+                    odds=float(item.get("odds") or 0.0),
+                    commission=float(commission) if commission not in (None, "") else None,
+                    source=self.name,
+                    received_at=now,
+                ))
+            except (AttributeError, KeyError, TypeError, ValueError):
+                continue
+        return prices
+
+    async def run(self, queue: asyncio.Queue):
+        failures = 0
+        while True:
+            try:
+                async for raw in self.stream():
+                    prices = self.normalize(raw)
+                    self.stats["messages"] += 1
+                    self.stats["prices"] += len(prices)
+                    self.stats["last_update"] = time.time()
+                    failures = 0
+                    self.stats["backoff"] = 0.0
+                    if prices:
+                        # Blocks when the consumer falls behind (backpressure)
+                        await queue.put(prices)
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                self.stats["errors"] += 1
+                self.stats["last_error"] = f"{type(e).__name__}: {e}"
+                delay = min(self.max_backoff, 2 ** min(failures, 10)) * random.uniform(0.5, 1.0)
+                self.stats["backoff"] = delay
+                logger.warning(f"⚠️ Feed '{self.name}' failed ({e}); retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+
+class HttpPollingAdapter(FeedAdapter):
+    """Polls a JSON endpoint every `interval` seconds (and no faster than its rate limit)."""
+
+    def __init__(self, name: str, url: str, interval: float = 2.0, timeout: float = 10.0, **kwargs):
+        super().__init__(name, **kwargs)
+        self.url = url
+        self.interval = interval
+        self.timeout = timeout
+
+    async def stream(self):
+        from tornado.httpclient import AsyncHTTPClient
+
+        client = AsyncHTTPClient()
+        while True:
+            await self.limiter.acquire()
+            response = await client.fetch(self.url, request_timeout=self.timeout)
+            yield json.loads(response.body)
+            await asyncio.sleep(self.interval)
+
+
+class WebSocketAdapter(FeedAdapter):
+    """Subscribes to a WebSocket that pushes JSON price messages; reconnects with backoff."""
+
+    def __init__(self, name: str, url: str, subscribe: dict | None = None, **kwargs):
+        super().__init__(name, **kwargs)
+        self.url = url
+        self.subscribe = subscribe
+
+    async def stream(self):
+        from tornado.websocket import websocket_connect
+
+        await self.limiter.acquire()
+        connection = await websocket_connect(self.url)
+        try:
+            if self.subscribe is not None:
+                await connection.write_message(json.dumps(self.subscribe))
+            while True:
+                message = await connection.read_message()
+                if message is None:
+                    raise ConnectionError("WebSocket closed")
+                yield json.loads(message)
+        finally:
+            connection.close()
+
+
+ADAPTER_TYPES = {"http": HttpPollingAdapter, "websocket": WebSocketAdapter}
+
+
+def adapters_from_config(config: dict) -> list:
+    """Build adapters from a {"sources": [...]} config (see module docstring)."""
+    adapters = []
+    for source in config.get("sources", []):
+        source = dict(source)
+        adapter_type = ADAPTER_TYPES[source.pop("type", "http")]
+        adapters.append(adapter_type(**source))
+    return adapters
+
+
+class FeedService:
+    """
+    Runs every adapter on one asyncio event loop in a daemon thread and feeds a LatestPriceStore.
+    """
+
+    def __init__(self, adapters: list, store: LatestPriceStore | None = None,
+                 queue_size: int = 10_000, max_http_clients: int = 100):
+        self.adapters = adapters
+        self.store = store or LatestPriceStore()
+        self.queue_size = queue_size
+        self.max_http_clients = max_http_clients
+        self._loop = None
+        self._thread = None
+
+    async def _consume(self, queue: asyncio.Queue):
+        while True:
+            prices = await queue.get()
+            self.store.update(prices)
+            queue.task_done()
+
+    async def run(self):
+        """Run every adapter until cancelled. Use this directly from async code."""
+        # tornado's client modules are only imported once feeds actually run;
+        # this module is imported on every run of the Streamlit script
+        from tornado.httpclient import AsyncHTTPClient
+
+        AsyncHTTPClient.configure(None, max_clients=self.max_http_clients)
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        tasks = [asyncio.create_task(self._consume(queue), name="feed-consumer")]
+        tasks += [asyncio.create_task(adapter.run(queue), name=f"feed-{adapter.name}") for adapter in self.adapters]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def start_in_background(self):
+        """Start run() on a private event loop in a daemon thread, so callers never block on feeds."""
+        if self._thread is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+
+        def target():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.run())
+
+        self._thread = threading.Thread(target=target, name="arbify-feeds", daemon=True)
+        self._thread.start()
+        logger.info(f"📡 Feed service started with {len(self.adapters)} sources")
+
+    def stop(self):
+        if self._loop is not None:
+            for task in asyncio.all_tasks(self._loop):
+                self._loop.call_soon_threadsafe(task.cancel)
+            self._thread.join(timeout=5)
+            self._loop = None
+            self._thread = None
+
+    def source_stats(self) -> dict:
+        return {adapter.name: dict(adapter.stats) for adapter in self.adapters}
+
+
+_service = None
+_service_lock = threading.Lock()
+# Config path that failed to load, so a bad file is reported once rather than on every rerun
+_failed_config = None
+
+
+def get_feed_service() -> FeedService | None:
+    """
+    The process-wide feed service, started on first call if ARBIFY_FEEDS_CONFIG
+    names a config file; None when no feeds are configured or the config
+    cannot be loaded.
+    """
+    global _service, _failed_config
+    with _service_lock:
+        if _service is None:
+            path = os.getenv("ARBIFY_FEEDS_CONFIG")
+            if not path or path == _failed_config:
+                return None
+            try:
+                with open(path, encoding="utf-8") as f:
+                    service = FeedService(adapters_from_config(json.load(f)))
+            except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+                _failed_config = path
+                logger.error(f"❌ Failed to load feed config {path}: {e!r}")
+                return None
+            _service = service
+            _service.start_in_background()
+        return _service
@@ -0,0 +1,259 @@
+"""
+Exchange odds ladder and precomputed matched-bet lookup tables.
+
+Exchange prices can only sit on a fixed ladder of 350 ticks from 1.01 to
+1000, with an increment that widens as the odds grow (0.01 up to 2, 0.02 up
+to 3, ... 10 up to 1000). The ladder is held in integer hundredths, so tick
+arithmetic has no floating-point error.
+
+- snap() / snap_index(): move arbitrary odds onto the ladder (nearest, or
+  rounded up/down)
+- tick_index(): position of odds that are already on the ladder, -1 if not
+- tick_offset(), neighbours(), ticks_between(): moving along the ladder
+
+Every MatchedBetCalculator figure is linear in the stake, so a LadderTable
+can hold them for every (back odds, lay tick, commission) on its grid at
+one stake and scale them to any other. They are computed once with
+sensitivity_surface(), and evaluate() then reads table entries for millions
+of price pairs without re-deriving the formulas (data/scanner.py does this
+when given a table). Built for the stake it is evaluated at, a table gives
+calculate_batch()'s figures bit for bit; scaled to another stake, a figure
+can land on the other side of a half-penny tie once rounded. A table is a
+handful of NumPy arrays (about 1 MB per commission and figure at float64);
+save() and LadderTable.load() write and read them as one .npz file.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from data.engine import MatchedBetCalculator
+
+# (upper bound, increment) in hundredths; the ladder starts one increment above 1.00
+LADDER_BANDS = (
+    (200, 1), (300, 2), (400, 5), (600, 10), (1000, 20),
+    (2000, 50), (3000, 100), (5000, 200), (10000, 500), (100000, 1000),
+)
+
+
+def _build_ladder() -> np.ndarray:
+    ticks, lower = [], 100
+    for upper, step in LADDER_BANDS:
+        ticks.append(np.arange(lower + step, upper + 1, step, dtype=np.int32))
+        lower = upper
+    return np.concatenate(ticks)
+
+
+TICKS_CENTS = _build_ladder()
+TICKS = TICKS_CENTS / 100
+MIN_ODDS, MAX_ODDS = float(TICKS[0]), float(TICKS[-1])
+# Tick index of every price in hundredths (-1 off the ladder): exact lookups are one array read
+_TICK_AT_CENT = np.full(int(TICKS_CENTS[-1]) + 1, -1, dtype=np.int16)
+_TICK_AT_CENT[TICKS_CENTS] = np.arange(len(TICKS_CENTS), dtype=np.int16)
+
+# Odds within this many hundredths of a tick count as on it
+_TOLERANCE = 1e-6
+
+SNAP_DIRECTIONS = ("nearest", "down", "up")
+TABLE_MODES = ("qualifying", "free_snr", "free_sr")
+TABLE_FIELDS = ("lay_stake", "liability", "back_wins_total", "lay_wins_total")
+
+
+def _lookup_cents(index_at_cent: np.ndarray, odds) -> np.ndarray:
+    cents = np.asarray(odds, dtype=float) * 100
+    rounded = np.rint(np.nan_to_num(cents, nan=-1.0, posinf=-1.0, neginf=-1.0)).astype(np.int64)
+    valid = (rounded >= 0) & (rounded < len(index_at_cent)) & (np.abs(cents - rounded) < _TOLERANCE)
+    return np.where(valid, index_at_cent[np.where(valid, rounded, 0)], -1)
+
+
+def tick_index(odds) -> np.ndarray:
+    """Ladder index of each price, or -1 where the price is not exactly a tick."""
+    return _lookup_cents(_TICK_AT_CENT, odds)
+
+
+def snap_index(odds, direction: str = "nearest") -> np.ndarray:
+    """
+    Ladder index of the tick each price snaps to: the nearest tick (ties go
+    down), or the tick at or below/above it. Prices off either end of the
+    ladder snap to 1.01 or 1000.
+    """
+    if direction not in SNAP_DIRECTIONS:
+        raise ValueError(f"direction must be one of {', '.join(SNAP_DIRECTIONS)}")
+    cents = np.asarray(odds, dtype=float) * 100
+    last = len(TICKS_CENTS) - 1
+    down = np.clip(np.searchsorted(TICKS_CENTS, cents + _TOLERANCE, side="right") - 1, 0, last)
+    up = np.clip(np.searchsorted(TICKS_CENTS, cents - _TOLERANCE, side="left"), 0, last)
+    if direction == "down":
+        return down
+    if direction == "up":
+        return up
+    return np.where(TICKS_CENTS[up] - cents < cents - TICKS_CENTS[down], up, down)
+
+
+def snap(odds, direction: str = "nearest") -> np.ndarray:
+    """Odds moved onto the ladder; see snap_index()."""
+    return TICKS[snap_index(odds, direction)]
+
+
+def tick_offset(odds, ticks) -> np.ndarray:
+    """The tick `ticks` steps above (negative: below) each price's nearest tick, stopping at the ends."""
+    index = snap_index(odds) + np.asarray(ticks, dtype=np.int64)
+    return TICKS[np.clip(index, 0, len(TICKS) - 1)]
+
+
+def neighbours(odds, k: int = 3) -> np.ndarray:
+    """
+    The 2k + 1 ticks centred on each price's nearest tick, shape (..., 2k + 1);
+    NaN where the window runs off the ladder.
+    """
+    index = snap_index(odds)[..., None] + np.arange(-k, k + 1)
+    on_ladder = (index >= 0) & (index < len(TICKS))
+    return np.where(on_ladder, TICKS[np.clip(index, 0, len(TICKS) - 1)], np.nan)
+
+
+def ticks_between(low, high) -> np.ndarray:
+    """Number of ticks from low to high (negative if high is below low), after snapping both."""
+    return snap_index(high) - snap_index(low)
+
+
+def _cent_map(axis: np.ndarray) -> np.ndarray | None:
+    """Dense hundredths -> position map for an axis of whole-hundredth odds (such as the ladder); None otherwise."""
+    cents = np.rint(axis * 100)
+    if not len(axis) or cents[0] < 0 or np.abs(axis * 100 - cents).max() >= _TOLERANCE or cents[-1] > 100 * MAX_ODDS:
+        return None
+    index_at_cent = np.full(int(cents[-1]) + 1, -1, dtype=np.int32)
+    index_at_cent[cents.astype(np.int64)] = np.arange(len(axis), dtype=np.int32)
+    return index_at_cent
+
+
+def _axis_index(axis: np.ndarray, values, index_at_cent: np.ndarray | None = None) -> np.ndarray:
+    """Position of each value on a sorted grid axis, or -1 where it is not a grid point."""
+    if index_at_cent is not None:
+        return _lookup_cents(index_at_cent, values)
+    values = np.asarray(values, dtype=float)
+    index = np.clip(np.searchsorted(axis, values), 0, len(axis) - 1)
+    return np.where(np.abs(axis[index] - values) < _TOLERANCE / 100, index, -1)
+
+
+class LadderLookup(NamedTuple):
+    """Grid positions of price pairs in a LadderTable; on_table is False where any of them is -1."""
+    back: np.ndarray
+    lay: np.ndarray
+    cms: np.ndarray
+    on_table: np.ndarray
+
+
+class LadderTable:
+    """
+    Matched-bet figures at one stake (the back stake, or the free bet value)
+    for one bet mode, over a grid of back odds x lay odds x lay commission
+    (by default every ladder tick for both odds). Built with build(), or read
+    back with load().
+
+    Arrays in `figures` are shaped (back, lay, commission), laid out like
+    MatchedBetCalculator.sensitivity_surface(). The two totals are the bookie
+    plus exchange P&L of get_bookie_exchange_breakdown() (unrounded), as
+    calculate_batch() gives them.
+    """
+
+    def __init__(self, mode: str, stake: float, back_odds: np.ndarray, lay_odds: np.ndarray, commissions: np.ndarray,
+                 figures: dict):
+        if mode not in TABLE_MODES:
+            raise ValueError(f"mode must be one of {', '.join(TABLE_MODES)}")
+        self.mode = mode
+        self.stake = stake
+        self.back_odds = back_odds
+        self.lay_odds = lay_odds
+        self.commissions = commissions
+        self.figures = figures
+        # Odds axes on whole hundredths are looked up by array read instead of binary search
+        self._back_at_cent = _cent_map(back_odds)
+        self._lay_at_cent = _cent_map(lay_odds)
+
+    @classmethod
+    def build(cls, mode: str = "qualifying", stake: float = 1.0, commissions=(0.0, 0.02, 0.05), back_odds=None,
+              lay_odds=None, dtype=np.float64) -> "LadderTable":
+        """
+        Compute the table from MatchedBetCalculator's formulas. back_odds and
+        lay_odds default to the full ladder; commissions are decimals.
+        float32 halves the memory but gives up the bit-for-bit match.
+        """
+        back_odds = np.unique(np.asarray(TICKS if back_odds is None else back_odds, dtype=float))
+        lay_odds = np.unique(np.asarray(TICKS if lay_odds is None else lay_odds, dtype=float))
+        commissions = np.unique(np.asarray(commissions, dtype=float))
+        free_bet = mode != "qualifying"
+        calculator = MatchedBetCalculator(
+            back_stake=0.0 if free_bet else stake,
+            back_odds=1.0,
+            back_cms=0.0,
+            lay_odds=1.0,
+            lay_cms=0.0,
+            free_sr=mode == "free_sr",
+            free_bet=free_bet,
+            free_bet_val=stake if free_bet else 0.0
+        )
+        surface = calculator.sensitivity_surface(back_odds, lay_odds, commissions)
+        # Totals as calculate_batch() sums them: bookie P&L, then the exchange's
+        # (get_total_profit()'s back_wins includes the returned stake on SR free bets)
+        back = back_odds[:, None, None]
+        bookie_pl = stake * (back - 1) if mode == "free_snr" else stake * back - stake
+        surface["back_wins_total"] = bookie_pl + -surface["liability"]
+        surface["lay_wins_total"] = surface["lay_wins"]
+        figures = {field: np.ascontiguousarray(surface[field], dtype=dtype) for field in TABLE_FIELDS}
+        return cls(mode, float(stake), back_odds, lay_odds, commissions, figures)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in self.figures.values())
+
+    def lookup(self, back_odds, lay_odds, lay_cms) -> LadderLookup:
+        """Grid positions for price pairs (arrays broadcast together)."""
+        back, lay, cms = np.broadcast_arrays(
+            _axis_index(self.back_odds, back_odds, self._back_at_cent),
+            _axis_index(self.lay_odds, lay_odds, self._lay_at_cent),
+            _axis_index(self.commissions, lay_cms),
+        )
+        return LadderLookup(back, lay, cms, (back >= 0) & (lay >= 0) & (cms >= 0))
+
+    def evaluate(self, back_odds, lay_odds, lay_cms=0.02, stake=None) -> dict:
+        """
+        Figures at each price pair, as calculate_batch() gives them before
+        rounding, for the table's stake or scaled to `stake`: a dict of
+        TABLE_FIELDS arrays plus on_table. Pairs off the table's grid are NaN;
+        compute those with calculate_batch().
+        """
+        found = self.lookup(back_odds, lay_odds, lay_cms)
+        index = tuple(np.where(found.on_table, i, 0) for i in (found.back, found.lay, found.cms))
+        scale = None if stake is None or np.all(stake == self.stake) else np.asarray(stake, dtype=float) / self.stake
+        out = {}
+        for field in TABLE_FIELDS:
+            values = self.figures[field][index]
+            if scale is not None:
+                values = values * scale
+            out[field] = np.where(found.on_table, values, np.nan)
+        out["on_table"] = found.on_table
+        return out
+
+    def save(self, path: str):
+        """Write the table to a .npz file."""
+        np.savez(
+            path,
+            mode=np.array(self.mode),
+            stake=np.array(self.stake),
+            back_odds=self.back_odds,
+            lay_odds=self.lay_odds,
+            commissions=self.commissions,
+            **self.figures
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "LadderTable":
+        """Read a table written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                str(data["mode"]),
+                float(data["stake"]),
+                data["back_odds"],
+                data["lay_odds"],
+                data["commissions"],
+                {field: data[field] for field in TABLE_FIELDS}
+            )
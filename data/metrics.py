@@ -0,0 +1,109 @@
+import logging
+import os
+import threading
+from prometheus_client import Counter, Histogram, start_http_server
+from prometheus_client.core import GaugeMetricFamily, REGISTRY
+from data import profiling
+
+logger = logging.getLogger(__name__)
+
+# Queries slower than this (seconds) are logged with a warning
+SLOW_QUERY_SECONDS = float(os.getenv("ARBIFY_SLOW_QUERY_SECONDS", "0.5"))
+
+QUERY_LATENCY = Histogram(
+    "arbify_db_query_seconds",
+    "Database query latency, by query name",
+    ["query"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+QUERY_ROWS = Counter(
+    "arbify_db_query_rows_total",
+    "Rows returned (or affected, for COPY) by database queries, by query name",
+    ["query"],
+)
+QUERY_ERRORS = Counter(
+    "arbify_db_query_errors_total",
+    "Database query errors, by query name",
+    ["query"],
+)
+CONNECTION_OPEN = Histogram(
+    "arbify_db_connection_open_seconds",
+    "Time to open a new physical database connection",
+)
+CONNECTION_CLOSE = Histogram(
+    "arbify_db_connection_close_seconds",
+    "Time to close a physical database connection",
+)
+POOL_CHECKOUT = Histogram(
+    "arbify_db_pool_checkout_seconds",
+    "Time spent waiting for a pooled connection",
+)
+
+
+def observe_query(name: str, query: str, elapsed: float, rows: int | None = None, error: bool = False):
+    """Record one query's latency, row count and outcome, logging it if it was slow (and as a span when profiling)."""
+    QUERY_LATENCY.labels(name).observe(elapsed)
+    profiling.record(f"SQL {name}", elapsed)
+    if rows and rows > 0:
+        QUERY_ROWS.labels(name).inc(rows)
+    if error:
+        QUERY_ERRORS.labels(name).inc()
+    if elapsed >= SLOW_QUERY_SECONDS:
+        statement = " ".join(query.split())
+        logger.warning(f"🐢 Slow query '{name}' took {elapsed:.3f}s: {statement[:200]}")
+
+
+class _StatsCollector:
+    """Exposes connection pool, query cache and write-behind counters at scrape time."""
+
+    def collect(self):
+        from data.cache import query_cache
+        from data.pg_connector import PostgresDB
+
+        pool = GaugeMetricFamily("arbify_db_pool", "Connection pool counters", labels=["pool", "stat"])
+        for name, stats in PostgresDB.pool_stats().items():
+            for stat, value in stats.items():
+                pool.add_metric([name, stat], value)
+        yield pool
+
+        cache = GaugeMetricFamily("arbify_query_cache", "Query cache counters", labels=["function", "stat"])
+        stats = query_cache.stats()
+        for function, counts in stats["functions"].items():
+            for stat, value in counts.items():
+                cache.add_metric([function, stat], value)
+        cache.add_metric(["*", "size"], stats["size"])
+        yield cache
+
+        from data.write_behind import get_write_behind
+        queue = get_write_behind()
+        if queue is not None:
+            journal = GaugeMetricFamily("arbify_write_behind", "Write-behind journal counters", labels=["stat"])
+            for stat, value in queue.stats().items():
+                journal.add_metric([stat], value)
+            yield journal
+
+
+_server_lock = threading.Lock()
+_server_started = False
+
+
+def start_metrics_server(port: int | None = None) -> bool:
+    """
+    Serve /metrics on ARBIFY_METRICS_PORT (default 9108) from a background thread.
+    Safe to call on every Streamlit rerun; only the first call in a process starts the server.
+    Returns True if the server is running.
+    """
+    global _server_started
+    with _server_lock:
+        if _server_started:
+            return True
+        port = port or int(os.getenv("ARBIFY_METRICS_PORT", "9108"))
+        try:
+            start_http_server(port)
+        except OSError as e:
+            logger.error(f"❌ Could not start metrics server on port {port}: {e}")
+            return False
+        REGISTRY.register(_StatsCollector())
+        _server_started = True
+        logger.info(f"📈 Metrics available on :{port}/metrics")
+        return True
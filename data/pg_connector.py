@@ -1,30 +1,203 @@
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 import psycopg2
+from psycopg2 import pool
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from data import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of warm psycopg2 connections.
+
+    Up to maxconn connections are opened on demand and kept open between
+    checkouts; minconn of them are opened up front. Checkouts block (up to
+    checkout_timeout seconds) when every connection is in use instead of
+    failing immediately. Connections that have been idle for longer than
+    health_check_interval are pinged before being handed out, and broken ones
+    are replaced transparently.
+    """
+
+    def __init__(self, minconn, maxconn, checkout_timeout=30.0, health_check_interval=30.0, **connect_kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self._connect_kwargs = connect_kwargs
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._idle = deque()
+        self._stats = {
+            'connections_created': 0,
+            'connections_discarded': 0,
+            'checkouts': 0,
+            'checkout_timeouts': 0,
+            'health_check_failures': 0,
+            'in_use': 0,
+        }
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _connect(self):
+        # search_path is a startup option, so it is set once per physical
+        # connection rather than once per checkout.
+        with metrics.CONNECTION_OPEN.time():
+            connection = psycopg2.connect(**self._connect_kwargs)
+            connection.autocommit = True
+        with self._lock:
+            self._stats['connections_created'] += 1
+        logger.info("Connected to the database.")
+        return connection
+
+    def getconn(self):
+        started = time.perf_counter()
+        acquired = self._slots.acquire(timeout=self.checkout_timeout)
+        metrics.POOL_CHECKOUT.observe(time.perf_counter() - started)
+        if not acquired:
+            with self._lock:
+                self._stats['checkout_timeouts'] += 1
+            raise pool.PoolError(f"Timed out after {self.checkout_timeout}s waiting for a connection")
+        try:
+            connection = self._checkout_healthy()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['in_use'] += 1
+        return connection
+
+    def _checkout_healthy(self):
+        while True:
+            with self._lock:
+                idle = self._idle.pop() if self._idle else None
+            if idle is None:
+                return self._connect()
+
+            connection, last_used = idle
+            if connection.closed:
+                self._discard(connection)
+                continue
+            if time.monotonic() - last_used > self.health_check_interval:
+                try:
+                    with connection.cursor() as cursor:
+                        cursor.execute("SELECT 1;")
+                except psycopg2.Error:
+                    with self._lock:
+                        self._stats['health_check_failures'] += 1
+                    self._discard(connection)
+                    continue
+            return connection
+
+    def _discard(self, connection):
+        with self._lock:
+            self._stats['connections_discarded'] += 1
+        try:
+            with metrics.CONNECTION_CLOSE.time():
+                connection.close()
+        except psycopg2.Error:
+            pass
+
+    def putconn(self, connection, close=False):
+        try:
+            if not close and not connection.closed:
+                if connection.info.transaction_status != TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+                connection.autocommit = True
+            close = close or bool(connection.closed)
+        except psycopg2.Error:
+            close = True
+
+        if close:
+            self._discard(connection)
+        else:
+            with self._lock:
+                self._idle.append((connection, time.monotonic()))
+
+        with self._lock:
+            self._stats['in_use'] -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        """Return a snapshot of pool counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+        stats['minconn'] = self.minconn
+        stats['maxconn'] = self.maxconn
+        return stats
+
+    def closeall(self):
+        with self._lock:
+            while self._idle:
+                connection, _ = self._idle.pop()
+                connection.close()
+
 
 class PostgresDB:
-    def __init__(self, dbname, user, password, host, port):
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, dbname, user, password, host, port, minconn=1, maxconn=10):
         self.dbname = dbname
         self.user = user
         self.password = password
         self.host = host
         self.port = port
+        self.minconn = minconn
+        self.maxconn = maxconn
         self.connection = None
         self.cursor = None
 
+    def _get_pool(self) -> ConnectionPool:
+        """Return the process-wide pool for these connection settings, creating it on first use."""
+        key = (self.dbname, self.user, self.host, self.port)
+        pool_ = PostgresDB._pools.get(key)
+        if pool_ is None:
+            with PostgresDB._pools_lock:
+                pool_ = PostgresDB._pools.get(key)
+                if pool_ is None:
+                    pool_ = ConnectionPool(
+                        self.minconn,
+                        self.maxconn,
+                        dbname=self.dbname,
+                        user=self.user,
+                        password=self.password,
+                        host=self.host,
+                        port=self.port,
+                        options="-c search_path=bethistory"
+                    )
+                    PostgresDB._pools[key] = pool_
+        return pool_
+
+    @classmethod
+    def pool_stats(cls) -> dict:
+        """Return stats for every pool in this process, keyed by 'user@host:port/dbname'."""
+        return {
+            f"{user}@{host}:{port}/{dbname}": pool_.stats()
+            for (dbname, user, host, port), pool_ in list(cls._pools.items())
+        }
+
+    @classmethod
+    def close_all(cls):
+        """Close every pooled connection in this process."""
+        with cls._pools_lock:
+            for pool_ in cls._pools.values():
+                pool_.closeall()
+            cls._pools.clear()
+
     def __enter__(self):
         try:
-            self.connection = psycopg2.connect(
-                dbname=self.dbname,
-                user=self.user,
-                password=self.password,
-                host=self.host,
-                port=self.port
-            )
-            self.connection.autocommit = True
+            self.connection = self._get_pool().getconn()
             self.cursor = self.connection.cursor()
-            print("Connected to the database.")
-            self.cursor.execute("SET search_path TO bethistory;")
-        except psycopg2.Error as e:
-            print(f"Connection error: {e}")
+        except (psycopg2.Error, pool.PoolError) as e:
+            logger.error(f"Connection error: {e}")
             raise
         return self
 
@@ -34,25 +207,85 @@ class PostgresDB:
         if self.cursor:
             self.cursor.close()
         if self.connection:
-            self.connection.close()
-        print("Database connection closed.")
+            broken = exc_type is not None and issubclass(exc_type, (psycopg2.OperationalError, psycopg2.InterfaceError))
+            self._get_pool().putconn(self.connection, close=broken)
+        self.cursor = None
+        self.connection = None
 
 
 
-    def execute(self, query, params=None):
+    def execute(self, query, params=None, name=None):
         """
-        Executes a SQL query. Returns result if query includes RETURNING or is a SELECT.
+        Executes a SQL query. Returns the rows of a statement that produces any
+        (SELECT, WITH ... SELECT, or anything with RETURNING), otherwise None.
+
+        Latency, row count and errors are recorded under name, which defaults
+        to the calling function's name (e.g. 'get_all_bets').
         """
+        name = name or sys._getframe(1).f_code.co_name
+        started = time.perf_counter()
         try:
             self.cursor.execute(query, params)
 
-            lowered = query.strip().lower()
-            if lowered.startswith("select") or "returning" in lowered:
-                return self.cursor.fetchall()
+            rows = self.cursor.fetchall() if self.cursor.description is not None else None
+            # rowcount is -1 for statements without one (SET, CREATE, TRUNCATE, DO)
+            counted = len(rows) if rows is not None else max(self.cursor.rowcount, 0)
+            metrics.observe_query(name, query, time.perf_counter() - started, rows=counted)
+            return rows
 
         except psycopg2.Error as e:
-            print(f"Query error: {e}")
+            metrics.observe_query(name, query, time.perf_counter() - started, error=True)
+            logger.error(f"Query error in '{name}': {e}")
             return None
 
 
 
+    @contextmanager
+    def transaction(self):
+        """
+        Run the enclosed statements in one transaction instead of autocommit.
+        Commits on success and rolls back if the block raises.
+        """
+        self.connection.autocommit = False
+        try:
+            yield self
+            self.connection.commit()
+        except BaseException:
+            self.connection.rollback()
+            raise
+        finally:
+            self.connection.autocommit = True
+
+
+
+    def copy_expert(self, query, file):
+        """
+        Runs a COPY ... FROM STDIN / TO STDOUT statement against a file-like object.
+        Unlike execute(), errors are raised so the surrounding transaction can roll back.
+        """
+        name = sys._getframe(1).f_code.co_name
+        started = time.perf_counter()
+        try:
+            self.cursor.copy_expert(query, file)
+        except psycopg2.Error:
+            metrics.observe_query(name, query, time.perf_counter() - started, error=True)
+            raise
+        rowcount = max(self.cursor.rowcount, 0)
+        metrics.observe_query(name, query, time.perf_counter() - started, rows=rowcount)
+        return rowcount
+
+
+
+    def stream(self, query, params=None, itersize=2000, name="arbify_stream"):
+        """
+        Yields the rows of a SELECT through a named server-side cursor,
+        fetching itersize rows per round trip instead of the whole result set.
+        """
+        with self.transaction():
+            with self.connection.cursor(name=name) as cursor:
+                cursor.itersize = itersize
+                started = time.perf_counter()
+                cursor.execute(query, params)
+                # Only the DECLARE is timed; fetches are paced by the consumer
+                metrics.observe_query(sys._getframe(1).f_code.co_name, query, time.perf_counter() - started)
+                yield from cursor
@@ -0,0 +1,135 @@
+"""
+Per-rerun profiling: wall-time spans for the stages of one page run.
+
+profile_run() makes a RunProfile current (in a context variable) for the
+duration of a page run. Code below it marks stages with `with span("name"):`,
+and data/metrics.observe_query() records every database query as a span.
+Outside a profiled run, span() costs one ContextVar lookup. With
+cprofile=True the run is also traced by cProfile, and the slowest functions
+are kept as text.
+
+Spans from worker threads count when the work is submitted with the caller's
+context, as fetch_parallel() does; they overlap in time with the caller's
+span around them.
+
+Streamlit-free: run_arbify_service.py decides when to profile and renders the
+results.
+"""
+import contextvars
+import cProfile
+import datetime
+import io
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+PROFILE_TOP_FUNCTIONS = 30
+
+_profile = contextvars.ContextVar("arbify_profile", default=None)
+_depth = contextvars.ContextVar("arbify_profile_depth", default=0)
+
+
+class RunProfile:
+    """Spans (and optionally cProfile output) for one page run."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started_at = datetime.datetime.now(datetime.timezone.utc)
+        self.total = None
+        self.outcome = "completed"
+        self.cprofile = None
+        self.spans = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, name: str, kind: str, started: float, elapsed: float, depth: int):
+        """Record a span that started at perf_counter() time `started`."""
+        span = {
+            "name": name,
+            "kind": kind,
+            "depth": depth,
+            "start": started - self._origin,
+            "seconds": elapsed,
+            "thread": threading.current_thread().name,
+        }
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self) -> dict:
+        """JSON-ready copy, spans in start order."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start"])
+        return {
+            "page": self.name,
+            "started_at": self.started_at.isoformat(),
+            "total": self.total,
+            "outcome": self.outcome,
+            "spans": spans,
+            "cprofile": self.cprofile,
+        }
+
+
+def current_profile() -> RunProfile | None:
+    return _profile.get()
+
+
+@contextmanager
+def span(name: str, kind: str = "stage"):
+    """Time the enclosed block as a span of the current run; a no-op when none is being profiled."""
+    profile = _profile.get()
+    if profile is None:
+        yield
+        return
+    depth = _depth.get()
+    token = _depth.set(depth + 1)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, kind, started, time.perf_counter() - started, depth)
+        _depth.reset(token)
+
+
+def record(name: str, elapsed: float, kind: str = "query"):
+    """Record a span that has just finished after `elapsed` seconds (for callers that time themselves)."""
+    profile = _profile.get()
+    if profile is not None:
+        profile.add(name, kind, time.perf_counter() - elapsed, elapsed, _depth.get())
+
+
+def _top_functions(profiler: cProfile.Profile, limit: int = PROFILE_TOP_FUNCTIONS) -> str:
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
+
+
+@contextmanager
+def profile_run(name: str, cprofile: bool = False):
+    """
+    Profile the enclosed block as one run named `name`, yielding its RunProfile.
+    The profile is finished (total and outcome set) however the block exits,
+    including Streamlit's rerun and stop exceptions, which are re-raised.
+    """
+    profile = RunProfile(name)
+    token = _profile.set(profile)
+    profiler = None
+    if cprofile:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Only one cProfile can run at a time (per process from Python 3.12)
+            profiler = None
+            profile.cprofile = "cProfile unavailable: another run is already being profiled."
+    try:
+        yield profile
+    except BaseException as e:
+        profile.outcome = type(e).__name__
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profile.cprofile = _top_functions(profiler)
+        profile.total = time.perf_counter() - profile._origin
+        _profile.reset(token)
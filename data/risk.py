@@ -0,0 +1,208 @@
+"""
+Monte Carlo simulation of the P&L of a user's open (unsettled) bets.
+
+Each open bet settles one of two ways: the back bet wins or the lay bet wins,
+with the payoffs from the engine's formulas. The back bet wins with the
+probability implied by the exchange lay odds (1 / lay_odds; 1 / back_odds
+without a lay). Bets on the same selection are correlated through a Gaussian
+copula: they share a latent factor with correlation selection_correlation,
+so they tend to settle together.
+
+Bets have no selection column. Two bets count as the same selection when
+their saved event text matches. The calculator saves "event - selection"
+when it is prefilled from live prices. Bets with different text are
+independent. This includes different selections of one match, which are
+really mutually exclusive (at most one of their back bets can win): the
+model does not capture that negative dependence. It does not tie them
+together positively either, because that would overstate the tail.
+
+Draws are vectorised in NumPy (float32), a chunk of simulations at a time
+sized to keep about CHUNK_DRAWS draws in memory. Runs above
+POOL_THRESHOLD simulations are sharded across a process pool, one
+independent SeedSequence stream per shard, so results are reproducible for
+a given seed. get_risk_summary() defaults to PAGE_SIMS, which stays in
+process, so the Home page never starts the pool; larger runs have to ask
+for it. Summaries are cached per portfolio state (the open bets' ids
+and last-change times) and parameters, so reruns of a page don't simulate
+again until a bet changes.
+"""
+import hashlib
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from statistics import NormalDist
+
+import numpy as np
+from cachetools import LRUCache
+
+from data.service import OPEN_BET_COLUMNS, get_open_bets
+
+CHUNK_DRAWS = 20_000_000
+POOL_THRESHOLD = 500_000
+PAGE_SIMS = 200_000
+HISTOGRAM_BINS = 50
+
+_results = LRUCache(maxsize=64)
+_results_lock = threading.Lock()
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def portfolio_arrays(open_bets) -> dict:
+    """
+    Per-bet simulation inputs from get_open_bets() rows: back_win and lay_win
+    (profit if the back/lay bet wins), p_back (probability the back bet wins)
+    and selection codes for the copula (one per distinct event text).
+    """
+    columns = dict(zip(OPEN_BET_COLUMNS, zip(*open_bets))) if open_bets else {c: () for c in OPEN_BET_COLUMNS}
+
+    def numeric(name, default=np.nan):
+        return np.array([default if v is None else float(v) for v in columns[name]], dtype=float)
+
+    back_stake = numeric("back_stake", 0.0)
+    back_odds = numeric("back_odds")
+    lay_odds = numeric("lay_odds")
+    lay_stake = numeric("lay_stake", 0.0)
+    lay_cms = numeric("lay_commission", 0.0)
+    free_bet = np.array(["Free Bet" in str(t) for t in columns["bet_type"]], dtype=bool)
+
+    # Same formulas as the matched_bets_settle trigger, from the stored lay stake
+    exchange_loss = np.where(np.isnan(lay_odds), 0.0, lay_stake * (lay_odds - 1))
+    back_win = back_stake * (back_odds - 1) - exchange_loss
+    lay_win = lay_stake * (1 - lay_cms) - np.where(free_bet, 0.0, back_stake)
+
+    implied_odds = np.where(np.isnan(lay_odds), back_odds, lay_odds)
+    p_back = np.clip(1 / implied_odds, 1e-6, 1 - 1e-6)
+    # The saved event text is the closest thing to a selection a bet has (see the module docstring)
+    _, selections = np.unique(np.array(columns["event"], dtype=object).astype(str), return_inverse=True)
+    # Simulation works on bets grouped by selection; the order of bets doesn't matter to the totals
+    order = np.argsort(selections, kind="stable")
+    return {
+        "back_win": back_win[order],
+        "lay_win": lay_win[order],
+        "p_back": p_back[order],
+        "selections": selections[order],
+    }
+
+
+def _check_correlation(selection_correlation: float):
+    # The copula divides by sqrt(1 - rho): rho = 1 divides by zero, above 1 gives NaN
+    if not 0 <= selection_correlation < 1:
+        raise ValueError(f"selection_correlation must be at least 0 and below 1, got {selection_correlation!r}")
+
+
+def _simulate_shard(portfolio: dict, sims: int, selection_correlation: float, seed) -> np.ndarray:
+    """P&L of `sims` simulated settlements of the whole portfolio."""
+    rng = np.random.default_rng(seed)
+    selections = portfolio["selections"]
+    n_bets = len(selections)
+    # The back bet on bet i wins when sqrt(rho) * F_selection + sqrt(1 - rho) * e_i < inv_cdf(p_i),
+    # i.e. when e_i < (inv_cdf(p_i) - sqrt(rho) * F_selection) / sqrt(1 - rho)
+    idiosyncratic = np.sqrt(1 - selection_correlation)
+    threshold = (np.array([NormalDist().inv_cdf(p) for p in portfolio["p_back"]]) / idiosyncratic).astype(np.float32)
+    loading = np.float32(np.sqrt(selection_correlation) / idiosyncratic)
+    boundaries = np.flatnonzero(np.diff(selections)) + 1
+    groups = list(zip(np.concatenate([[0], boundaries]), np.concatenate([boundaries, [n_bets]])))
+    spread = (portfolio["back_win"] - portfolio["lay_win"]).astype(np.float32)
+    base = portfolio["lay_win"].sum()
+
+    chunk = max(1, CHUNK_DRAWS // max(n_bets, 1))
+    pnl = np.empty(sims)
+    for start in range(0, sims, chunk):
+        n = min(chunk, sims - start)
+        factors = rng.standard_normal((n, len(groups)), dtype=np.float32)
+        factors *= loading
+        draws = rng.standard_normal((n, n_bets), dtype=np.float32)
+        won = np.empty((n, n_bets), dtype=np.float32)
+        for g, (lo, hi) in enumerate(groups):
+            won[:, lo:hi] = draws[:, lo:hi] < threshold[lo:hi] - factors[:, g:g + 1]
+        # Every bet pays lay_win, plus (back_win - lay_win) where the back bet wins
+        pnl[start:start + n] = base + won @ spread
+    return pnl
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the Streamlit server process is multi-threaded
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1, mp_context=get_context("spawn"))
+        return _pool
+
+
+def simulate_pnl(portfolio: dict, sims: int = 1_000_000, selection_correlation: float = 0.5, seed: int = 0) -> np.ndarray:
+    """
+    Simulated portfolio P&L; sharded across the process pool for large runs.
+    Raises ValueError unless 0 <= selection_correlation < 1.
+    """
+    _check_correlation(selection_correlation)
+    if sims <= POOL_THRESHOLD:
+        return _simulate_shard(portfolio, sims, selection_correlation, np.random.SeedSequence(seed))
+
+    shards = max(2, os.cpu_count() or 1)
+    sizes = [sims // shards + (i < sims % shards) for i in range(shards)]
+    seeds = np.random.SeedSequence(seed).spawn(shards)
+    pool = _get_pool()
+    futures = [pool.submit(_simulate_shard, portfolio, size, selection_correlation, s) for size, s in zip(sizes, seeds)]
+    return np.concatenate([f.result() for f in futures])
+
+
+def summarize(pnl: np.ndarray, portfolio: dict) -> dict:
+    """Distribution statistics for simulated P&L (losses are negative)."""
+    if not len(pnl) or not len(portfolio["back_win"]):
+        return {"open_bets": 0, "sims": len(pnl)}
+    q01, q05, q50, q95 = np.quantile(pnl, [0.01, 0.05, 0.5, 0.95])
+    # Penny resolution; also keeps hedged portfolios with a near-zero spread binnable
+    counts, edges = np.histogram(np.round(pnl, 2), bins=HISTOGRAM_BINS)
+    return {
+        "open_bets": len(portfolio["back_win"]),
+        "sims": len(pnl),
+        "expected": float(pnl.mean()),
+        "std": float(pnl.std()),
+        "median": float(q50),
+        "p95": float(q95),
+        # Value at risk: the loss not exceeded with 95%/99% confidence (positive = a loss)
+        "var_95": float(-q05),
+        "var_99": float(-q01),
+        # Expected shortfall: average loss in the worst 5% of outcomes
+        "cvar_95": float(-pnl[pnl <= q05].mean()),
+        "prob_loss": float((pnl < 0).mean()),
+        "worst_simulated": float(pnl.min()),
+        # Every bet settling the worse way at once
+        "worst_case": float(np.minimum(portfolio["back_win"], portfolio["lay_win"]).sum()),
+        "best_case": float(np.maximum(portfolio["back_win"], portfolio["lay_win"]).sum()),
+        "histogram": {"counts": counts.tolist(), "edges": edges.tolist()},
+    }
+
+
+def portfolio_key(open_bets) -> str:
+    """Hash of the open bets' ids and last-change times: changes whenever the portfolio does."""
+    digest = hashlib.sha1()
+    id_at, updated_at = OPEN_BET_COLUMNS.index("id"), OPEN_BET_COLUMNS.index("updated_at")
+    for row in open_bets or ():
+        digest.update(f"{row[id_at]}:{row[updated_at]};".encode())
+    return digest.hexdigest()
+
+
+def get_risk_summary(user_id=None, sims: int = PAGE_SIMS, selection_correlation: float = 0.5, seed: int = 0) -> dict | None:
+    """
+    Simulated P&L summary (see summarize()) for the user's open bets, or None
+    if they could not be loaded. Cached per portfolio state and parameters.
+    Raises ValueError unless 0 <= selection_correlation < 1.
+    """
+    _check_correlation(selection_correlation)
+    open_bets = get_open_bets(user_id)
+    if open_bets is None:
+        return None
+    key = (portfolio_key(open_bets), sims, selection_correlation, seed)
+    with _results_lock:
+        cached = _results.get(key)
+    if cached is not None:
+        return cached
+
+    portfolio = portfolio_arrays(open_bets)
+    summary = summarize(simulate_pnl(portfolio, sims, selection_correlation, seed) if open_bets else np.empty(0), portfolio)
+    with _results_lock:
+        _results[key] = summary
+    return summary
@@ -0,0 +1,307 @@
+"""
+Streaming matched-bet opportunity scanner.
+
+Reads back/lay price snapshots (CSV or JSONL, one price per line), joins
+bookmaker back prices with exchange lay prices per selection, scores the
+pairs in vectorised chunks with the MatchedBetCalculator formulas
+(calculate_batch) and returns the best K opportunities at the feed's latest
+prices: a pair whose back price or best lay is pulled, or moves, is re-scored
+or withdrawn.
+
+Each price line needs: event, selection, venue, side ('back' or 'lay') and
+odds. Optional: commission (lay commission as a decimal; --lay-cms is used
+when missing). Blank or zero odds remove that venue's price (suspended).
+
+Memory stays flat however long the feed is: only the latest price per venue
+and the latest score per back/lay pair for at most max_selections
+selections, plus one chunk of price changes, are held at a time.
+
+Given a LadderTable (data/ladder.py) for the scan mode, pairs priced on the
+table's grid are read from it rather than recomputed; the rest still go
+through calculate_batch.
+"""
+import csv
+import heapq
+import json
+import sys
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from data.engine import _round2, calculate_batch
+from data.ladder import LadderTable
+
+SCAN_MODES = ("qualifying", "free_snr", "free_sr")
+OPPORTUNITY_KEY = ("event", "selection", "bookmaker", "exchange")
+
+
+def read_prices(source, fmt: str | None = None):
+    """
+    Yield price dicts from a path ('-' for stdin) or an open text stream.
+    fmt is 'csv' or 'jsonl'; by default it is taken from the file extension.
+    Malformed lines are skipped.
+    """
+    if isinstance(source, str):
+        if fmt is None:
+            fmt = "csv" if source.lower().endswith(".csv") else "jsonl"
+        if source == "-":
+            yield from read_prices(sys.stdin, fmt)
+            return
+        with open(source, newline="", encoding="utf-8") as f:
+            yield from read_prices(f, fmt)
+        return
+
+    if fmt == "csv":
+        yield from csv.DictReader(source)
+    else:
+        for line in source:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def _price(value):
+    try:
+        odds = float(value)
+    except (TypeError, ValueError):
+        return None
+    return odds if odds > 1 else None
+
+
+def _best_lay(lays: dict):
+    """(exchange, odds, commission) of the lowest lay price, or None when there is none."""
+    if not lays:
+        return None
+    exchange, (odds, cms) = min(lays.items(), key=lambda item: item[1])
+    return exchange, odds, cms
+
+
+def _drop_pairs(key, backs: dict, best_lay):
+    if best_lay is not None:
+        for bookmaker in backs:
+            yield "drop", (key[0], key[1], bookmaker, best_lay[0])
+
+
+def pair_prices(prices, lay_cms: float = 0.02, max_selections: int = 100_000):
+    """
+    Join back and lay prices per (event, selection) and yield the changes to
+    the candidate pairs.
+
+    Keeps the latest price per venue and side, and pairs every back price
+    with the selection's best (lowest) lay price. Yields:
+    - ("set", pair) when a pair appears or either of its prices moves; pair is
+      (event, selection, bookmaker, exchange, back_odds, lay_odds, lay_cms)
+    - ("drop", key) when a pair stops existing: its back price was pulled,
+      or the best lay was pulled or moved to another exchange; key is
+      (event, selection, bookmaker, exchange)
+
+    A later change to the same key supersedes earlier ones. Only the most
+    recently updated max_selections selections are tracked; the pairs of a
+    selection that falls out are dropped.
+    """
+    selections = OrderedDict()
+    for price in prices:
+        try:
+            key = (str(price["event"]), str(price["selection"]))
+            venue = str(price["venue"])
+            side = str(price["side"]).strip().lower()
+        except KeyError:
+            continue
+        if side not in ("back", "lay"):
+            continue
+
+        # [back odds by venue, (lay odds, commission) by venue, best lay]
+        book = selections.get(key)
+        if book is None:
+            book = selections[key] = [{}, {}, None]
+            if len(selections) > max_selections:
+                evicted, (evicted_backs, _, evicted_best) = selections.popitem(last=False)
+                yield from _drop_pairs(evicted, evicted_backs, evicted_best)
+        else:
+            selections.move_to_end(key)
+        backs, lays, best = book
+
+        odds = _price(price.get("odds"))
+        if side == "back":
+            if odds is None:
+                if backs.pop(venue, None) is not None and best is not None:
+                    yield "drop", (key[0], key[1], venue, best[0])
+                continue
+            backs[venue] = odds
+            if best is not None:
+                yield "set", (key[0], key[1], venue, best[0], odds, best[1], best[2])
+        else:
+            before = best
+            if odds is None:
+                lays.pop(venue, None)
+            else:
+                commission = price.get("commission")
+                try:
+                    cms = float(commission) if commission not in (None, "") else lay_cms
+                except (TypeError, ValueError):
+                    cms = lay_cms
+                lays[venue] = (odds, cms)
+            if before is not None and venue != before[0] and (odds is None or (odds, cms) >= before[1:]):
+                # Another exchange changed without beating the best lay
+                continue
+            after = book[2] = _best_lay(lays)
+            if after == before:
+                continue
+            # The best lay moved: withdraw pairs on the old exchange, re-price every back against the new one
+            if before is not None and (after is None or after[0] != before[0]):
+                yield from _drop_pairs(key, backs, before)
+            if after is not None:
+                for bookmaker, back_odds in backs.items():
+                    yield "set", (key[0], key[1], bookmaker, after[0], back_odds, after[1], after[2])
+
+
+def _batch_figures(back_odds, lay_odds, lay_cms, mode: str, stake: float) -> dict:
+    free_bet = mode != "qualifying"
+    return calculate_batch(
+        back_stake=0.0 if free_bet else stake,
+        back_odds=back_odds,
+        lay_odds=lay_odds,
+        lay_cms=lay_cms,
+        free_bet=free_bet,
+        free_sr=mode == "free_sr",
+        free_bet_val=stake if free_bet else 0.0
+    )
+
+
+def _table_figures(table: LadderTable, back_odds, lay_odds, lay_cms, stake: float) -> dict:
+    """Figures from a ladder table, with calculate_batch() for the pairs off its grid."""
+    figures = table.evaluate(back_odds, lay_odds, lay_cms, stake)
+    on_table = figures.pop("on_table")
+    for field in ("back_wins_total", "lay_wins_total"):
+        figures[field] = _round2(figures[field])
+    missed = ~on_table
+    if missed.any():
+        batch = _batch_figures(back_odds[missed], lay_odds[missed], lay_cms[missed], table.mode, stake)
+        for field in figures:
+            figures[field][missed] = batch[field]
+    return figures
+
+
+def score_pairs(
+    pairs: pd.DataFrame,
+    mode: str = "qualifying",
+    stake: float = 10.0,
+    table: LadderTable | None = None
+) -> pd.DataFrame:
+    """
+    Score candidate pairs with calculate_batch(), or from a LadderTable built
+    for the same mode.
+
+    mode is 'qualifying' (stake is the back stake), 'free_snr' or 'free_sr'
+    (stake is the free bet value). Adds lay_stake, liability, profit (the
+    worse of the two outcomes) and rating (profit as a percentage of stake).
+    """
+    back_odds = pairs["back_odds"].to_numpy(dtype=float)
+    lay_odds = pairs["lay_odds"].to_numpy(dtype=float)
+    lay_cms = pairs["lay_cms"].to_numpy(dtype=float)
+    if table is not None:
+        if table.mode != mode:
+            raise ValueError(f"ladder table is for {table.mode} bets, not {mode}")
+        figures = _table_figures(table, back_odds, lay_odds, lay_cms, stake)
+    else:
+        figures = _batch_figures(back_odds, lay_odds, lay_cms, mode, stake)
+    scored = pairs.copy()
+    scored["lay_stake"] = np.round(figures["lay_stake"], 2)
+    scored["liability"] = np.round(figures["liability"], 2)
+    scored["profit"] = np.minimum(figures["back_wins_total"], figures["lay_wins_total"])
+    scored["rating"] = np.round(scored["profit"] / stake * 100, 2)
+    return scored
+
+
+class LiveScores:
+    """
+    Latest score of every live opportunity, one entry per opportunity key;
+    results() gives the best K. A push replaces the key's entry whether its
+    score went up or down, since it reflects the latest prices.
+
+    Every live opportunity is kept, not just the best K: a leader whose score
+    drops or whose prices are pulled must hand its place to whichever pair is
+    next best at that moment, which a heap bounded at K would already have
+    evicted. Memory is therefore one entry per live pair, bounded by scan()'s
+    max_selections.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self._entries = {}
+        self._seq = 0
+
+    def push(self, key, score: float, record):
+        self._entries[key] = (score, self._seq, record)
+        self._seq += 1
+
+    def push_many(self, keys, scores, records):
+        """push() for each (key, score, record) in order."""
+        seqs = range(self._seq, self._seq + len(keys))
+        self._entries.update(zip(keys, zip(scores, seqs, records)))
+        self._seq += len(keys)
+
+    def discard(self, key):
+        """Withdraw an opportunity that no longer exists."""
+        self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def results(self) -> list:
+        """Records of the K best opportunities, best first (earliest priced first among equals)."""
+        best = heapq.nsmallest(self.k, self._entries.values(), key=lambda entry: (-entry[0], entry[1]))
+        return [entry[2] for entry in best]
+
+
+def scan(
+    prices,
+    mode: str = "qualifying",
+    stake: float = 10.0,
+    top: int = 20,
+    lay_cms: float = 0.02,
+    chunk_size: int = 50_000,
+    max_selections: int = 100_000,
+    table: LadderTable | None = None
+) -> list:
+    """
+    Run the full pipeline over an iterable of price dicts and return the top
+    opportunities, best first, as dicts (see score_pairs for the columns and
+    the optional ladder table).
+    """
+    if mode not in SCAN_MODES:
+        raise ValueError(f"mode must be one of {', '.join(SCAN_MODES)}")
+
+    columns = list(OPPORTUNITY_KEY) + ["back_odds", "lay_odds", "lay_cms"]
+    best = LiveScores(top)
+    chunk = []
+
+    def flush():
+        # Only the last change to each opportunity in the chunk counts
+        latest = {item[:4]: item if action == "set" else None for action, item in chunk}
+        chunk.clear()
+        for key in [key for key, pair in latest.items() if pair is None]:
+            best.discard(key)
+            del latest[key]
+        if latest:
+            pairs = list(latest.values())
+            profits = score_pairs(pd.DataFrame(pairs, columns=columns), mode, stake, table)["profit"].tolist()
+            best.push_many(list(latest), profits, pairs)
+
+    for change in pair_prices(prices, lay_cms=lay_cms, max_selections=max_selections):
+        chunk.append(change)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+
+    winners = best.results()
+    if not winners:
+        return []
+    # Only the pairs are held per opportunity; score the winners again for their full figures
+    return score_pairs(pd.DataFrame(winners, columns=columns), mode, stake, table).to_dict("records")
+
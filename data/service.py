@@ -1,4 +1,11 @@
+import csv
+import io
+import json
 import logging
+import math
+import os
+from datetime import datetime, timezone
+from data.cache import query_cache
 from data.db import get_db
 
 logging.basicConfig(level=logging.INFO)
@@ -6,58 +13,246 @@ logger = logging.getLogger(__name__)
 
 
 
-def get_profit_over_time():
+@query_cache.cached
+def get_profit_over_time(user_id=None, bookmaker=None, exchange=None):
+    """
+    Daily net profit from the daily_profit rollup (see migrations/sql/schema_rollup.sql),
+    optionally narrowed to one user, bookmaker and/or exchange.
+    Only days with at least one settled bet are returned.
+    """
     query = """
-        SELECT 
-            DATE(bet_date) AS date,
-            SUM(net_profit_loss) AS daily_profit
-        FROM matched_bets
-        WHERE net_profit_loss IS NOT NULL
-        GROUP BY DATE(bet_date)
+        SELECT
+            day AS date,
+            SUM(net_profit) AS daily_profit
+        FROM daily_profit
+        WHERE (%(user_id)s IS NULL OR user_id = %(user_id)s)
+          AND (%(bookmaker)s IS NULL OR bookmaker = %(bookmaker)s)
+          AND (%(exchange)s IS NULL OR exchange = %(exchange)s)
+        GROUP BY day
+        HAVING SUM(settled_bets) > 0
         ORDER BY date ASC;
     """
+    params = {"user_id": user_id, "bookmaker": bookmaker, "exchange": exchange}
     try:
         with get_db() as db:
-            rows = db.execute(query)
+            rows = db.execute(query, params)
+            if rows is None:
+                query_cache.skip()
             return rows
     except Exception as e:
         logger.error(f"❌ Failed to get stats: {e}")
+        query_cache.skip()
         return []
 
 
+@query_cache.cached
+def get_profit_curve(user_id=None, rolling_days: int = 30, bookmaker=None, exchange=None):
+    """
+    Daily profit curve from the daily_profit rollup, narrowed like
+    get_profit_over_time(). Window functions over the daily rows give the
+    cumulative profit, the ROI over the rolling_days days up to each day (net
+    profit over the back stake of settled bets), and the drawdown: the fall
+    from the highest cumulative profit so far (starting from 0). Only days
+    with a settled bet are included.
+
+    Returns a dict, or None if the query fails:
+    - curve: [tuples in CURVE_COLUMNS order], oldest first
+    - max_drawdown: the deepest drawdown (0 or negative) and drawdown_day, its date
+    """
+    query = """
+        WITH daily AS (
+            SELECT day, SUM(net_profit) AS net_profit, SUM(settled_staked) AS settled_staked
+            FROM daily_profit
+            WHERE (%(user_id)s IS NULL OR user_id = %(user_id)s)
+              AND (%(bookmaker)s IS NULL OR bookmaker = %(bookmaker)s)
+              AND (%(exchange)s IS NULL OR exchange = %(exchange)s)
+            GROUP BY day
+            HAVING SUM(settled_bets) > 0
+        ),
+        running AS (
+            SELECT
+                day,
+                net_profit,
+                SUM(net_profit) OVER (ORDER BY day) AS cumulative_profit,
+                SUM(net_profit) OVER rolling / NULLIF(SUM(settled_staked) OVER rolling, 0) AS rolling_roi
+            FROM daily
+            WINDOW rolling AS (ORDER BY day RANGE BETWEEN %(preceding)s * INTERVAL '1 day' PRECEDING AND CURRENT ROW)
+        )
+        SELECT
+            day, net_profit, cumulative_profit, rolling_roi,
+            cumulative_profit - GREATEST(MAX(cumulative_profit) OVER (ORDER BY day), 0) AS drawdown
+        FROM running
+        ORDER BY day;
+    """
+    params = {"user_id": user_id, "bookmaker": bookmaker, "exchange": exchange, "preceding": rolling_days - 1}
+    try:
+        with get_db() as db:
+            rows = db.execute(query, params)
+    except Exception as e:
+        logger.error(f"❌ Failed to fetch profit curve: {e}")
+        rows = None
+    if rows is None:
+        query_cache.skip()
+        return None
+
+    curve = [
+        (day, float(net_profit), float(cumulative_profit), None if roi is None else float(roi), float(drawdown))
+        for day, net_profit, cumulative_profit, roi, drawdown in rows
+    ]
+    worst = min(curve, key=lambda point: point[4], default=None)
+    return {
+        "curve": curve,
+        "max_drawdown": worst[4] if worst else 0.0,
+        "drawdown_day": worst[0] if worst else None,
+    }
+
+
+def rebuild_profit_rollup():
+    """Recompute the daily_profit rollup from matched_bets. Returns the number of rollup rows, or None on failure."""
+    try:
+        with get_db() as db:
+            rows = db.execute("SELECT rebuild_daily_profit();")
+            if rows is None:
+                raise RuntimeError("rebuild_daily_profit() failed")
+            query_cache.invalidate()
+            logger.info(f"✅ Rebuilt profit rollup ({rows[0][0]} rows).")
+            return rows[0][0]
+    except Exception as e:
+        logger.error(f"❌ Failed to rebuild profit rollup: {e}")
+        return None
+
+
+
+def rebuild_open_exposure():
+    """Recompute the open_exposure index from matched_bets. Returns the number of index rows, or None on failure."""
+    try:
+        with get_db() as db:
+            rows = db.execute("SELECT rebuild_open_exposure();")
+            if rows is None:
+                raise RuntimeError("rebuild_open_exposure() failed")
+            query_cache.invalidate()
+            logger.info(f"✅ Rebuilt open exposure index ({rows[0][0]} rows).")
+            return rows[0][0]
+    except Exception as e:
+        logger.error(f"❌ Failed to rebuild open exposure index: {e}")
+        return None
+
+
+def ensure_bet_partitions(months_ahead: int = 3):
+    """
+    Create the monthly matched_bets partitions up to months_ahead months from
+    now (see migrations/versions/0002_partition_matched_bets.py). Returns the
+    number created, or None on failure.
+    """
+    try:
+        with get_db() as db:
+            rows = db.execute("SELECT ensure_matched_bets_partitions(%s);", (months_ahead,))
+            if rows is None:
+                raise RuntimeError("ensure_matched_bets_partitions() failed")
+            logger.info(f"✅ Created {rows[0][0]} matched_bets partitions.")
+            return rows[0][0]
+    except Exception as e:
+        logger.error(f"❌ Failed to create matched_bets partitions: {e}")
+        return None
+
+
+EXPOSURE_KEYS = ("exchange", "bookmaker", "event")
+
+
+@query_cache.cached
+def get_open_exposure(user_id=None, by="exchange"):
+    """
+    Money tied up in unsettled bets from the open_exposure index (see
+    migrations/sql/schema_exposure.sql), grouped by one of EXPOSURE_KEYS.
+
+    Returns a dict mapping each exchange/bookmaker/event ('' for bets with no
+    exchange) to {"open_bets", "back_stake", "lay_liability"}, or None if the
+    query fails.
+    """
+    if by not in EXPOSURE_KEYS:
+        raise ValueError(f"by must be one of {EXPOSURE_KEYS}")
+    query = f"""
+        SELECT
+            {by},
+            SUM(open_bets),
+            SUM(back_stake),
+            SUM(lay_liability)
+        FROM open_exposure
+        WHERE (%(user_id)s IS NULL OR user_id = %(user_id)s)
+        GROUP BY {by};
+    """
+    try:
+        with get_db() as db:
+            rows = db.execute(query, {"user_id": user_id})
+    except Exception as e:
+        logger.error(f"❌ Failed to fetch open exposure: {e}")
+        rows = None
+    if rows is None:
+        query_cache.skip()
+        return None
+    return {
+        key: {"open_bets": int(open_bets), "back_stake": float(back_stake), "lay_liability": float(lay_liability)}
+        for key, open_bets, back_stake, lay_liability in rows
+    }
+
+
+BET_COLUMNS = (
+    "bookmaker", "event", "bet_type", "back_stake", "back_odds",
+    "exchange", "lay_odds", "lay_stake", "lay_liability", "lay_commission", "free_sr",
+    "bookmaker_profit_loss", "exchange_profit_loss", "notes", "result", "user_id"
+)
+
+DEFAULT_LAY_COMMISSION = 0.02
+
+BET_RESULTS = ("back", "lay", "void", "unsettled")
+
+_REQUIRED_TEXT = {"bookmaker": 100, "event": 255, "bet_type": 50}
+_OPTIONAL_TEXT = {"exchange": 100}
+_REQUIRED_NUMERIC = ("back_stake", "back_odds")
+_OPTIONAL_NUMERIC = ("lay_odds", "lay_stake", "lay_liability", "bookmaker_profit_loss", "exchange_profit_loss")
+_TRUE_TEXT = ("true", "t", "yes", "y", "1")
+_FALSE_TEXT = ("false", "f", "no", "n", "0")
+
+
+def _bet_params(bet_object) -> dict:
+    """Map a bet dict (including the bookie_pl/exchange_pl aliases) onto matched_bets columns."""
+    return {
+        "bookmaker":             bet_object.get('bookmaker'),
+        "event":                 bet_object.get('event'),
+        "bet_type":              bet_object.get('bet_type'),
+        "back_stake":            bet_object.get('back_stake'),
+        "back_odds":             bet_object.get('back_odds'),
+        "exchange":              bet_object.get('exchange'),
+        "lay_odds":              bet_object.get('lay_odds'),
+        "lay_stake":             bet_object.get('lay_stake'),
+        "lay_liability":         bet_object.get('lay_liability'),
+        "lay_commission":        bet_object.get('lay_commission', bet_object.get('lay_cms')),
+        "free_sr":               bet_object.get('free_sr'),
+        "bookmaker_profit_loss": bet_object.get('bookmaker_profit_loss') or bet_object.get('bookie_pl'),
+        "exchange_profit_loss":  bet_object.get('exchange_profit_loss') or bet_object.get('exchange_pl'),
+        "notes":                 bet_object.get('notes'),
+        "result":                bet_object.get('result', 'unsettled'),
+        "user_id":               bet_object.get('user_id'),
+    }
+
 
 def insert_bet(bet_object):
-    bookmaker       = bet_object.get('bookmaker')
-    event           = bet_object.get('event')
-    bet_type        = bet_object.get('bet_type')
-    back_stake      = bet_object.get('back_stake')
-    back_odds       = bet_object.get('back_odds')
-    exchange        = bet_object.get('exchange')
-    lay_odds        = bet_object.get('lay_odds')
-    lay_stake       = bet_object.get('lay_stake')
-    lay_liability   = bet_object.get('lay_liability')
-    bookmaker_pl    = bet_object.get('bookmaker_profit_loss') or bet_object.get('bookie_pl')
-    exchange_pl     = bet_object.get('exchange_profit_loss') or bet_object.get('exchange_pl')
-    notes           = bet_object.get('notes')
-    result          = bet_object.get('result', 'unsettled')
+    bet = _bet_params(bet_object)
+    if bet["lay_commission"] is None:
+        bet["lay_commission"] = DEFAULT_LAY_COMMISSION
+    bet["free_sr"] = bool(bet["free_sr"])
 
-    query = """
-        INSERT INTO matched_bets (
-            bookmaker, event, bet_type, back_stake, back_odds, 
-            exchange, lay_odds, lay_stake, lay_liability,
-            bookmaker_profit_loss, exchange_profit_loss, notes, result
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
+    query = f"""
+        INSERT INTO matched_bets ({', '.join(BET_COLUMNS)})
+        VALUES ({', '.join(['%s'] * len(BET_COLUMNS))});
     """
 
-    params = (
-        bookmaker, event, bet_type, back_stake, back_odds,
-        exchange, lay_odds, lay_stake, lay_liability,
-        bookmaker_pl, exchange_pl, notes, result
-    )
+    params = tuple(bet[col] for col in BET_COLUMNS)
 
     try:
         with get_db() as db:
             db.execute(query, params)
+            query_cache.invalidate([bet["user_id"]])
             logger.info("✅ Bet added successfully.")
             return True
     except Exception as e:
@@ -65,18 +260,235 @@ def insert_bet(bet_object):
         return False
 
 
+def _clean(value):
+    """Treat blank strings (as found in CSV exports) as missing."""
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def _validate_bet(bet_object) -> list:
+    """
+    Validate and normalise one bet for bulk loading.
+    Returns the row in COPY column order, or raises ValueError describing the first problem.
+    """
+    if not isinstance(bet_object, dict):
+        raise ValueError(f"expected an object, got {type(bet_object).__name__}")
+
+    bet = {col: _clean(value) for col, value in _bet_params(bet_object).items()}
+    if bet["result"] is None:
+        bet["result"] = "unsettled"
+
+    for col, max_len in {**_REQUIRED_TEXT, **_OPTIONAL_TEXT}.items():
+        if bet[col] is None:
+            if col in _REQUIRED_TEXT:
+                raise ValueError(f"'{col}' is required")
+            continue
+        bet[col] = str(bet[col])
+        if len(bet[col]) > max_len:
+            raise ValueError(f"'{col}' is longer than {max_len} characters")
+
+    for col in _REQUIRED_NUMERIC + _OPTIONAL_NUMERIC:
+        if bet[col] is None:
+            if col in _REQUIRED_NUMERIC:
+                raise ValueError(f"'{col}' is required")
+            continue
+        try:
+            number = float(bet[col])
+        except (TypeError, ValueError):
+            raise ValueError(f"'{col}' is not a number: {bet[col]!r}")
+        if not math.isfinite(number):
+            raise ValueError(f"'{col}' must be finite")
+        bet[col] = number
+
+    if bet["lay_commission"] is None:
+        bet["lay_commission"] = DEFAULT_LAY_COMMISSION
+    else:
+        try:
+            bet["lay_commission"] = float(bet["lay_commission"])
+        except (TypeError, ValueError):
+            raise ValueError(f"'lay_commission' is not a number: {bet['lay_commission']!r}")
+        if not 0 <= bet["lay_commission"] < 1:
+            raise ValueError("'lay_commission' must be a decimal between 0 and 1 (e.g. 0.02)")
+
+    free_sr = bet["free_sr"]
+    if isinstance(free_sr, str):
+        if free_sr.lower() not in _TRUE_TEXT + _FALSE_TEXT:
+            raise ValueError(f"'free_sr' is not a boolean: {free_sr!r}")
+        free_sr = free_sr.lower() in _TRUE_TEXT
+    bet["free_sr"] = bool(free_sr)
+
+    if bet["user_id"] is not None:
+        try:
+            bet["user_id"] = int(bet["user_id"])
+        except (TypeError, ValueError):
+            raise ValueError(f"'user_id' is not an integer: {bet['user_id']!r}")
+
+    if bet["result"] not in BET_RESULTS:
+        raise ValueError(f"'result' must be one of {', '.join(BET_RESULTS)}, got {bet['result']!r}")
+
+    bet_date = _clean(bet_object.get('bet_date'))
+    if bet_date is None:
+        bet_date = datetime.now(timezone.utc)
+    elif not isinstance(bet_date, datetime):
+        try:
+            bet_date = datetime.fromisoformat(str(bet_date))
+        except ValueError:
+            raise ValueError(f"'bet_date' is not an ISO date/time: {bet_date!r}")
+
+    return [bet_date.isoformat()] + [bet[col] for col in BET_COLUMNS]
+
+
+def _bulk_insert(numbered_bets, chunk_size: int) -> dict:
+    """
+    COPY (row_number, bet) pairs into matched_bets in one transaction, chunk by chunk.
+    A bet may be an exception raised while parsing its source row; it is reported like a validation error.
+    """
+    query = f"COPY matched_bets (bet_date, {', '.join(BET_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+    inserted = 0
+    errors = []
+    user_ids = set()
+
+    try:
+        with get_db() as db, db.transaction():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            pending = 0
+            for row_number, bet_object in numbered_bets:
+                try:
+                    if isinstance(bet_object, Exception):
+                        raise bet_object
+                    row = _validate_bet(bet_object)
+                    writer.writerow(row)
+                    user_ids.add(row[1 + BET_COLUMNS.index("user_id")])
+                    pending += 1
+                except ValueError as e:
+                    errors.append({"row": row_number, "error": str(e)})
+                    continue
+
+                if pending >= chunk_size:
+                    buffer.seek(0)
+                    db.copy_expert(query, buffer)
+                    inserted += pending
+                    buffer.seek(0)
+                    buffer.truncate()
+                    pending = 0
+
+            if pending:
+                buffer.seek(0)
+                db.copy_expert(query, buffer)
+                inserted += pending
+    except Exception as e:
+        logger.error(f"❌ Bulk insert rolled back: {e}")
+        return {"inserted": 0, "errors": errors + [{"row": None, "error": str(e)}]}
+
+    query_cache.invalidate(user_ids)
+    logger.info(f"✅ Bulk inserted {inserted} bets ({len(errors)} rejected).")
+    return {"inserted": inserted, "errors": errors}
+
+
+def insert_bets(bets, chunk_size: int = 10_000) -> dict:
+    """
+    Bulk-insert an iterable of bet dicts (same fields as insert_bet(), plus an optional
+    ISO 'bet_date') in a single transaction using COPY.
+
+    Invalid rows are skipped and reported; the rest are loaded. Returns
+    {"inserted": int, "errors": [{"row": 1-based row number, "error": str}, ...]}.
+    A database error rolls back the whole load and is reported with row None.
+    """
+    return _bulk_insert(enumerate(bets, start=1), chunk_size)
+
+
+def _read_bet_file(path):
+    """Yield (row_number, bet dict or parse error) from a CSV or JSONL file."""
+    suffix = os.path.splitext(path)[1].lower()
+    with open(path, newline="", encoding="utf-8") as f:
+        if suffix == ".csv":
+            # Row numbers count the header line, so they match the file as opened in a spreadsheet
+            for row_number, row in enumerate(csv.DictReader(f), start=2):
+                yield row_number, row
+        elif suffix in (".jsonl", ".ndjson"):
+            for row_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield row_number, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield row_number, ValueError(f"invalid JSON: {e}")
+        else:
+            raise ValueError(f"Unsupported bet file type '{suffix}' (expected .csv or .jsonl)")
+
+
+def import_bets_file(path, chunk_size: int = 10_000) -> dict:
+    """Bulk-insert bets from a CSV or JSONL file. See insert_bets() for the report format."""
+    return _bulk_insert(_read_bet_file(path), chunk_size)
+
+
+def insert_keyed_bets(keyed_rows) -> int | None:
+    """
+    Insert bets that may have been sent before, e.g. retried by the write-behind
+    journal (data/write_behind.py). keyed_rows are (idempotency_key, row) pairs,
+    where row is a validated bet as returned by _validate_bet().
+
+    The rows are COPYed into a temporary staging table and inserted with
+    ON CONFLICT DO NOTHING in one transaction, so bets whose
+    (idempotency_key, bet_date) is already saved are skipped. Returns the number
+    of new bets, or None on failure (nothing is inserted).
+    """
+    columns = f"idempotency_key, bet_date, {', '.join(BET_COLUMNS)}"
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for key, row in keyed_rows:
+        writer.writerow([key, *row])
+    buffer.seek(0)
+
+    try:
+        with get_db() as db, db.transaction():
+            db.cursor.execute(f"""
+                CREATE TEMPORARY TABLE matched_bets_staging ON COMMIT DROP AS
+                SELECT {columns} FROM matched_bets WITH NO DATA;
+            """)
+            db.copy_expert(f"COPY matched_bets_staging ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+            inserted = db.execute(f"""
+                INSERT INTO matched_bets ({columns})
+                SELECT {columns} FROM matched_bets_staging
+                ON CONFLICT (idempotency_key, bet_date) DO NOTHING
+                RETURNING user_id;
+            """)
+            if inserted is None:
+                raise RuntimeError("insert from staging failed")
+    except Exception as e:
+        logger.error(f"❌ Failed to insert keyed bets: {e}")
+        return None
+
+    query_cache.invalidate({row[0] for row in inserted})
+    return len(inserted)
+
+
 def delete_bet(bet_id):
-    query = "DELETE FROM matched_bets WHERE id = %s RETURNING id;"
+    query = "DELETE FROM matched_bets WHERE id = %s RETURNING id, user_id;"
     try:
         with get_db() as db:
             result = db.execute(query, (bet_id,))
+            if result:
+                query_cache.invalidate([row[1] for row in result])
             return result is not None
     except Exception as e:
         logger.error(f"❌ Failed to delete bet {bet_id}: {e}")
         return False
 
 
-def get_all_bets():
+HISTORY_COLUMNS = (
+    "id", "bet_date", "bookmaker", "event", "bet_type", "back_stake",
+    "back_odds", "exchange", "lay_odds", "lay_stake", "lay_liability",
+    "bookmaker_profit_loss", "exchange_profit_loss", "net_profit_loss",
+    "result", "notes", "lay_commission", "free_sr"
+)
+
+
+@query_cache.cached
+def get_all_bets(user_id=None):
     query = """
         SELECT
             id,
@@ -94,28 +506,390 @@ def get_all_bets():
             exchange_profit_loss,
             net_profit_loss,
             result,
-            notes
+            notes,
+            lay_commission,
+            free_sr
         FROM matched_bets
+        WHERE %(user_id)s IS NULL OR user_id = %(user_id)s
         ORDER BY bet_date DESC;
     """
     try:
         with get_db() as db:
-            result = db.execute(query)
+            result = db.execute(query, {"user_id": user_id})
+            if result is None:
+                query_cache.skip()
             return result
     except Exception as e:
         logger.error(f"❌ Failed to fetch bets: {e}")
+        query_cache.skip()
         return []
 
 
+def _history_filters(user_id=None, date_from=None, date_to=None, bookmaker=None, result=None, bet_type=None):
+    """
+    Build the WHERE clauses shared by the paginated and streaming history queries.
+    date_from is inclusive and date_to exclusive; None means no filter.
+    """
+    clauses, params = [], []
+    for column, op, value in (
+        ("user_id", "=", user_id),
+        ("bet_date", ">=", date_from),
+        ("bet_date", "<", date_to),
+        ("bookmaker", "=", bookmaker),
+        ("result", "=", result),
+        ("bet_type", "=", bet_type),
+    ):
+        if value is not None:
+            clauses.append(f"{column} {op} %s")
+            params.append(value)
+    return clauses, params
+
+
+@query_cache.cached
+def get_bets_page(user_id=None, after=None, page_size: int = 50, **filters):
+    """
+    Fetch one page of bet history, newest first, using keyset pagination on (bet_date, id).
+
+    Parameters:
+    - user_id: only return this user's bets (None for every bet)
+    - after: the cursor returned with the previous page, or None for the first page
+    - page_size: maximum number of rows to return
+    - filters: date_from, date_to, bookmaker, result, bet_type (see _history_filters)
+
+    Returns (rows, next_cursor); rows are tuples in HISTORY_COLUMNS order and
+    next_cursor is None on the last page.
+    """
+    clauses, params = _history_filters(user_id, **filters)
+    if after is not None:
+        clauses.append("(bet_date, id) < (%s, %s)")
+        params.extend(after)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    query = f"""
+        SELECT {', '.join(HISTORY_COLUMNS)}
+        FROM matched_bets
+        {where}
+        ORDER BY bet_date DESC, id DESC
+        LIMIT %s;
+    """
+    params.append(page_size + 1)
+    try:
+        with get_db() as db:
+            rows = db.execute(query, tuple(params))
+    except Exception as e:
+        logger.error(f"❌ Failed to fetch bets page: {e}")
+        rows = None
+    if rows is None:
+        query_cache.skip()
+        return [], None
+
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        return rows, (last[1], last[0])
+    return rows, None
+
+
+@query_cache.cached
+def get_bet_totals(user_id=None, **filters):
+    """
+    Aggregate figures for the bets matching the history filters, in one query.
+
+    Returns a dict with total_bets, net_profit (sum of settled profit),
+    total_staked, a count per result in BET_RESULTS ('back', 'lay', ...), and
+    open_liability (lay liability still at risk on unsettled bets), or None if
+    the query fails.
+    """
+    clauses, params = _history_filters(user_id, **filters)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    counts = ",\n            ".join(f"COUNT(*) FILTER (WHERE result = '{result}')" for result in BET_RESULTS)
+    query = f"""
+        SELECT
+            COUNT(*),
+            COALESCE(SUM(net_profit_loss), 0),
+            COALESCE(SUM(back_stake), 0),
+            {counts},
+            COALESCE(SUM(lay_liability) FILTER (WHERE result = 'unsettled'), 0)
+        FROM matched_bets
+        {where};
+    """
+    try:
+        with get_db() as db:
+            rows = db.execute(query, tuple(params))
+    except Exception as e:
+        logger.error(f"❌ Failed to fetch bet totals: {e}")
+        rows = None
+    if not rows:
+        query_cache.skip()
+        return None
+
+    total_bets, net_profit, total_staked, *result_counts, open_liability = rows[0]
+    return {
+        "total_bets": total_bets,
+        "net_profit": float(net_profit),
+        "total_staked": float(total_staked),
+        **dict(zip(BET_RESULTS, result_counts)),
+        "open_liability": float(open_liability),
+    }
+
+
+ANALYTICS_DIMENSIONS = ("bookmaker", "exchange", "bet_type", "result", "month")
+BREAKDOWN_COLUMNS = ("key", "bets", "settled_bets", "staked", "net_profit", "roi")
+CURVE_COLUMNS = ("day", "net_profit", "cumulative_profit", "rolling_roi", "drawdown")
+
+
+@query_cache.cached
+def get_analytics(user_id=None, date_from=None, date_to=None):
+    """
+    Profit breakdowns for the bets matching the filters, in one query (one
+    pass over matched_bets): every breakdown in ANALYTICS_DIMENSIONS and the
+    overall total come from a single GROUP BY GROUPING SETS. The daily curve
+    comes from the rollup instead; see get_profit_curve().
+
+    ROI is net profit over the back stake of settled bets (those with a
+    net_profit_loss).
+
+    Returns a dict, or None if the query fails:
+    - totals: {bets, settled_bets, staked, net_profit, roi}
+    - breakdowns: {dimension: [tuples in BREAKDOWN_COLUMNS order]}, most profitable
+      first ('month' in date order, keyed by the month's first day)
+    """
+    clauses, params = _history_filters(user_id, date_from=date_from, date_to=date_to)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    columns = ANALYTICS_DIMENSIONS
+    # GROUPING() sets a bit (first column highest) for each column a row is not grouped by
+    all_bits = (1 << len(columns)) - 1
+    set_ids = {column: all_bits - (1 << (len(columns) - 1 - i)) for i, column in enumerate(columns)}
+    dimension = "\n                ".join(f"WHEN {set_id} THEN '{column}'" for column, set_id in set_ids.items())
+    query = f"""
+        WITH bets AS (
+            SELECT
+                bookmaker,
+                COALESCE(exchange, '') AS exchange,
+                bet_type,
+                result,
+                DATE_TRUNC('month', bet_date)::date AS month,
+                back_stake,
+                net_profit_loss
+            FROM matched_bets
+            {where}
+        )
+        SELECT
+            CASE GROUPING({', '.join(columns)})
+            {dimension}
+            ELSE 'total' END AS dimension,
+            COALESCE({', '.join(f'{column}::text' for column in columns)}),
+            COUNT(*) AS bets,
+            COUNT(net_profit_loss) AS settled_bets,
+            COALESCE(SUM(back_stake), 0) AS staked,
+            COALESCE(SUM(net_profit_loss), 0) AS net_profit,
+            SUM(net_profit_loss) / NULLIF(SUM(back_stake) FILTER (WHERE net_profit_loss IS NOT NULL), 0) AS roi
+        FROM bets
+        GROUP BY GROUPING SETS ({', '.join(f'({column})' for column in columns)}, ())
+        ORDER BY 1, 2;
+    """
+    try:
+        with get_db() as db:
+            rows = db.execute(query, tuple(params))
+    except Exception as e:
+        logger.error(f"❌ Failed to fetch analytics: {e}")
+        rows = None
+    if rows is None:
+        query_cache.skip()
+        return None
+
+    totals = {"bets": 0, "settled_bets": 0, "staked": 0.0, "net_profit": 0.0, "roi": None}
+    breakdowns = {dimension: [] for dimension in ANALYTICS_DIMENSIONS}
+    for dimension, key, bets, settled_bets, staked, net_profit, roi in rows:
+        row = (bets, settled_bets, float(staked), float(net_profit), None if roi is None else float(roi))
+        if dimension == "total":
+            totals = dict(zip(BREAKDOWN_COLUMNS[1:], row))
+        else:
+            if dimension == "month":
+                key = datetime.fromisoformat(key).date()
+            breakdowns[dimension].append((key, *row))
+    for dimension, rows in breakdowns.items():
+        if dimension != "month":
+            rows.sort(key=lambda row: row[4], reverse=True)
+
+    return {"totals": totals, "breakdowns": breakdowns}
+
+
+OPEN_BET_COLUMNS = (
+    "id", "event", "bet_type", "back_stake", "back_odds", "lay_odds",
+    "lay_stake", "lay_commission", "free_sr", "updated_at"
+)
+
+
+@query_cache.cached
+def get_open_bets(user_id=None):
+    """Unsettled bets as tuples in OPEN_BET_COLUMNS order, oldest first; None if the query fails."""
+    clauses, params = _history_filters(user_id, result="unsettled")
+    query = f"""
+        SELECT {', '.join(OPEN_BET_COLUMNS)}
+        FROM matched_bets
+        WHERE {' AND '.join(clauses)}
+        ORDER BY id;
+    """
+    try:
+        with get_db() as db:
+            rows = db.execute(query, tuple(params))
+    except Exception as e:
+        logger.error(f"❌ Failed to fetch open bets: {e}")
+        rows = None
+    if rows is None:
+        query_cache.skip()
+    return rows
+
+
+def iter_bets(user_id=None, itersize: int = 2000, **filters):
+    """
+    Stream bet history, newest first, through a server-side cursor.
+
+    Only about itersize rows are held in memory at a time, so this suits
+    exports of the full history. Accepts the same filters as get_bets_page()
+    and yields tuples in HISTORY_COLUMNS order.
+    """
+    clauses, params = _history_filters(user_id, **filters)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    query = f"""
+        SELECT {', '.join(HISTORY_COLUMNS)}
+        FROM matched_bets
+        {where}
+        ORDER BY bet_date DESC, id DESC;
+    """
+    with get_db() as db:
+        yield from db.stream(query, tuple(params), itersize=itersize)
+
+
+
+def iter_bets_changed_since(user_id=None, since=None, itersize: int = 2000):
+    """
+    Stream bets added or changed at or after `since` (every bet when None), oldest change first.
+    Yields tuples in HISTORY_COLUMNS order followed by updated_at.
+    """
+    clauses, params = _history_filters(user_id)
+    if since is not None:
+        clauses.append("updated_at >= %s")
+        params.append(since)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    query = f"""
+        SELECT {', '.join(HISTORY_COLUMNS)}, updated_at
+        FROM matched_bets
+        {where}
+        ORDER BY updated_at, id;
+    """
+    with get_db() as db:
+        yield from db.stream(query, tuple(params), itersize=itersize)
+
+
+@query_cache.cached
+def get_history_marker(user_id=None):
+    """
+    (number of bets, latest updated_at) for one user's bets (or all), which the
+    local snapshot compares against to decide whether to sync; None if the
+    query fails.
+    """
+    clauses, params = _history_filters(user_id)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    try:
+        with get_db() as db:
+            rows = db.execute(f"SELECT COUNT(*), MAX(updated_at) FROM matched_bets {where};", tuple(params))
+    except Exception as e:
+        logger.error(f"❌ Failed to read the history marker: {e}")
+        rows = None
+    if not rows:
+        query_cache.skip()
+        return None
+    return rows[0]
+
+
+def get_server_time():
+    """The database's NOW(), or None if the query fails."""
+    try:
+        with get_db() as db:
+            rows = db.execute("SELECT NOW();")
+        return rows[0][0] if rows else None
+    except Exception as e:
+        logger.error(f"❌ Failed to read the database time: {e}")
+        return None
+
+
+def count_bets(user_id=None):
+    """Number of bets (one user's, or all); uncached. None if the query fails."""
+    clauses, params = _history_filters(user_id)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    try:
+        with get_db() as db:
+            rows = db.execute(f"SELECT COUNT(*) FROM matched_bets {where};", tuple(params))
+        return rows[0][0] if rows else None
+    except Exception as e:
+        logger.error(f"❌ Failed to count bets: {e}")
+        return None
+
+
+def get_bet_ids(user_id=None):
+    """Every bet id (one user's, or all), or None if the query fails."""
+    clauses, params = _history_filters(user_id)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    try:
+        with get_db() as db:
+            rows = db.execute(f"SELECT id FROM matched_bets {where};", tuple(params))
+        return None if rows is None else [row[0] for row in rows]
+    except Exception as e:
+        logger.error(f"❌ Failed to fetch bet ids: {e}")
+        return None
+
 
 def update_bet_result(bet_id: int, result: str) -> bool:
-    """Update the result of a bet ('back', 'lay', 'void', 'unsettled')."""
-    query = "UPDATE matched_bets SET result = %s WHERE id = %s;"
+    """
+    Update the result of a bet ('back', 'lay', 'void', 'unsettled'). Returns
+    False if the update failed or no bet has that id.
+    """
+    query = "UPDATE matched_bets SET result = %s WHERE id = %s RETURNING user_id;"
     try:
         with get_db() as db:
-            db.execute(query, (result, bet_id))
+            updated = db.execute(query, (result, bet_id))
+            if not updated:
+                logger.error(f"❌ Failed to update result for bet {bet_id}: no bet updated")
+                return False
+            query_cache.invalidate([row[0] for row in updated])
             logger.info(f"✅ Updated result for bet {bet_id} to '{result}'")
             return True
     except Exception as e:
         logger.error(f"❌ Failed to update result for bet {bet_id}: {e}")
         return False
+
+
+def update_bet_results(changes: dict[int, str]) -> bool:
+    """
+    Apply several result changes ({bet_id: result}) in a single UPDATE.
+    Returns False without touching the database if any result is not one of BET_RESULTS.
+    """
+    if not changes:
+        return True
+    invalid = {bet_id: result for bet_id, result in changes.items() if result not in BET_RESULTS}
+    if invalid:
+        logger.error(f"❌ Invalid results, nothing updated: {invalid}")
+        return False
+
+    values = ", ".join(["(%s, %s)"] * len(changes))
+    query = f"""
+        UPDATE matched_bets AS mb
+        SET result = v.result
+        FROM (VALUES {values}) AS v(id, result)
+        WHERE mb.id = v.id
+        RETURNING mb.id, mb.user_id;
+    """
+    params = tuple(p for bet_id, result in changes.items() for p in (int(bet_id), result))
+    try:
+        with get_db() as db:
+            updated = db.execute(query, params)
+            if updated is None:
+                raise RuntimeError("update failed")
+            query_cache.invalidate([row[1] for row in updated])
+            logger.info(f"✅ Updated results for {len(updated)} bets")
+            return True
+    except Exception as e:
+        logger.error(f"❌ Failed to update results for bets {sorted(changes)}: {e}")
+        return False
@@ -0,0 +1,339 @@
+"""
+Local Parquet snapshot of bet history, one file per user, synced incrementally.
+
+sync_snapshot() fetches only the bets whose updated_at is after the previous
+sync started (less SYNC_OVERLAP, to catch transactions that were still open
+then and committed later), and merges them in by id, so new bets and result updates cost a small query rather
+than a full reload. Deleted bets are pruned when the snapshot's row count no
+longer matches the database.
+
+load_table() reads the snapshot back with column pruning. Before reading it
+compares the snapshot with service.get_history_marker(), a cached
+(bet count, latest updated_at) query, and only syncs when the database has
+moved on, so an unchanged history costs no more than a Parquet read.
+
+The history grid (load_history_page()) and the Home breakdowns
+(load_analytics()) filter and aggregate the Arrow table, and hand pages to
+pandas without copies where the types allow it. Both fall back to the
+equivalent Postgres queries when the snapshot can't be used.
+
+Snapshots live in ARBIFY_SNAPSHOT_DIR (default ~/.cache/arbify/snapshots).
+"""
+import datetime
+import io
+import logging
+import os
+import threading
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv
+import pyarrow.parquet as pq
+import pandas as pd
+
+from data import service
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = os.getenv("ARBIFY_SNAPSHOT_DIR", os.path.join(os.path.expanduser("~"), ".cache", "arbify", "snapshots"))
+SYNC_OVERLAP = datetime.timedelta(minutes=2)
+BATCH_ROWS = 50_000
+
+_TIMESTAMP = pa.timestamp("us", tz="UTC")
+SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("bet_date", _TIMESTAMP),
+    ("bookmaker", pa.string()),
+    ("event", pa.string()),
+    ("bet_type", pa.string()),
+    ("back_stake", pa.float64()),
+    ("back_odds", pa.float64()),
+    ("exchange", pa.string()),
+    ("lay_odds", pa.float64()),
+    ("lay_stake", pa.float64()),
+    ("lay_liability", pa.float64()),
+    ("bookmaker_profit_loss", pa.float64()),
+    ("exchange_profit_loss", pa.float64()),
+    ("net_profit_loss", pa.float64()),
+    ("result", pa.string()),
+    ("notes", pa.string()),
+    ("lay_commission", pa.float64()),
+    ("free_sr", pa.bool_()),
+    ("updated_at", _TIMESTAMP),
+])
+_WATERMARK_KEY = b"arbify.watermark"
+# Newest updated_at in the snapshot, compared with the database's before each read
+_LATEST_KEY = b"arbify.latest_change"
+EXPORT_COLUMNS = [name for name in SCHEMA.names if name != "updated_at"]
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def snapshot_path(user_id=None) -> str:
+    name = "all" if user_id is None else f"user_{int(user_id)}"
+    return os.path.join(SNAPSHOT_DIR, f"bets_{name}.parquet")
+
+
+def _lock(path: str) -> threading.Lock:
+    with _locks_lock:
+        return _locks.setdefault(path, threading.Lock())
+
+
+def _record_batches(rows):
+    """Turn service rows (HISTORY_COLUMNS + updated_at) into record batches of BATCH_ROWS."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_ROWS:
+            yield _to_batch(batch)
+            batch = []
+    if batch:
+        yield _to_batch(batch)
+
+
+def _to_batch(rows) -> pa.RecordBatch:
+    columns = list(zip(*rows))
+    arrays = []
+    for field, values in zip(SCHEMA, columns):
+        if pa.types.is_floating(field.type):
+            # psycopg2 returns DECIMAL columns as Decimal
+            values = [None if v is None else float(v) for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=SCHEMA)
+
+
+def _read(path: str) -> tuple[pa.Table | None, datetime.datetime | None]:
+    if not os.path.exists(path):
+        return None, None
+    table = pq.read_table(path)
+    watermark = (table.schema.metadata or {}).get(_WATERMARK_KEY)
+    if watermark is None or table.schema.remove_metadata() != SCHEMA:
+        # Written by an older version; start again
+        return None, None
+    return table.replace_schema_metadata(None), datetime.datetime.fromisoformat(watermark.decode())
+
+
+def _write(path: str, table: pa.Table, watermark):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    metadata = {_WATERMARK_KEY: watermark.isoformat().encode()} if watermark else {}
+    latest = pc.max(table["updated_at"]).as_py()
+    if latest is not None:
+        metadata[_LATEST_KEY] = latest.isoformat().encode()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(table.replace_schema_metadata(metadata), tmp, compression="zstd")
+    os.replace(tmp, path)
+
+
+def sync_snapshot(user_id=None) -> str:
+    """
+    Bring the user's snapshot (every bet when user_id is None) up to date with
+    the database and return its path. The first sync copies the full history.
+    """
+    path = snapshot_path(user_id)
+    with _lock(path):
+        table, watermark = _read(path)
+        since = watermark - SYNC_OVERLAP if watermark else None
+        started = service.get_server_time()
+
+        changes = pa.Table.from_batches(
+            list(_record_batches(service.iter_bets_changed_since(user_id, since))), schema=SCHEMA
+        )
+        if table is None:
+            table = changes
+        elif changes.num_rows:
+            keep = pc.invert(pc.is_in(table["id"], value_set=changes["id"]))
+            table = pa.concat_tables([table.filter(keep), changes])
+
+        watermark = started or watermark
+
+        # Deletes leave no trace in updated_at; a count mismatch means some happened
+        count = service.count_bets(user_id)
+        if count is not None and count != table.num_rows:
+            ids = service.get_bet_ids(user_id)
+            if ids is not None:
+                table = table.filter(pc.is_in(table["id"], value_set=pa.array(ids, type=pa.int64())))
+
+        table = table.sort_by([("bet_date", "descending"), ("id", "descending")])
+        _write(path, table, watermark)
+        logger.info(f"✅ Synced history snapshot {path}: {table.num_rows} bets, {changes.num_rows} changed.")
+        return path
+
+
+def is_current(user_id=None) -> bool:
+    """
+    Whether the snapshot still matches the database: the same number of bets
+    and nothing updated after its newest updated_at. Only the Parquet footer
+    is read. A snapshot counts as current when the database can't be asked.
+    """
+    path = snapshot_path(user_id)
+    if not os.path.exists(path):
+        return False
+    marker = service.get_history_marker(user_id)
+    if marker is None:
+        return True
+    count, latest = marker
+    footer = pq.read_metadata(path)
+    if footer.num_rows != count:
+        return False
+    if latest is None:
+        return True
+    recorded = (footer.metadata or {}).get(_LATEST_KEY)
+    return recorded is not None and latest <= datetime.datetime.fromisoformat(recorded.decode())
+
+
+def load_table(user_id=None, columns=None, sync: bool = True) -> pa.Table:
+    """
+    The snapshot as an Arrow table, reading only `columns` (default: all) from
+    disk. With sync, it is synced first unless is_current().
+    """
+    path = snapshot_path(user_id)
+    if sync and not is_current(user_id):
+        sync_snapshot(user_id)
+    if not os.path.exists(path):
+        return SCHEMA.empty_table().select(columns or SCHEMA.names)
+    return pq.read_table(path, columns=columns)
+
+
+def _to_pandas(table: pa.Table) -> pd.DataFrame:
+    # Numeric columns without nulls are handed over without a copy; Arrow's
+    # buffers are released column by column as they are converted
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def _timestamp(value) -> pa.Scalar:
+    """A history filter date (a date means midnight UTC) as a snapshot timestamp."""
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time())
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return pa.scalar(value, type=_TIMESTAMP)
+
+
+def _filter(table: pa.Table, date_from=None, date_to=None, bookmaker=None, result=None, bet_type=None) -> pa.Table:
+    """The rows matching the history filters, with service._history_filters()'s meaning."""
+    mask = None
+    for column, compare, value in (
+        ("bet_date", pc.greater_equal, None if date_from is None else _timestamp(date_from)),
+        ("bet_date", pc.less, None if date_to is None else _timestamp(date_to)),
+        ("bookmaker", pc.equal, bookmaker),
+        ("result", pc.equal, result),
+        ("bet_type", pc.equal, bet_type),
+    ):
+        if value is not None:
+            condition = compare(table[column], value)
+            mask = condition if mask is None else pc.and_kleene(mask, condition)
+    return table if mask is None else table.filter(mask)
+
+
+def _totals(table: pa.Table) -> dict:
+    """service.get_bet_totals() figures for the rows of table."""
+    def total(values) -> float:
+        return float(pc.sum(values).as_py() or 0.0)
+
+    results = {item["values"]: item["counts"] for item in pc.value_counts(table["result"]).to_pylist()}
+    unsettled = pc.equal(table["result"], "unsettled")
+    return {
+        "total_bets": table.num_rows,
+        "net_profit": total(table["net_profit_loss"]),
+        "total_staked": total(table["back_stake"]),
+        **{result: results.get(result, 0) for result in service.BET_RESULTS},
+        "open_liability": total(pc.filter(table["lay_liability"], unsettled)),
+    }
+
+
+def load_history_page(user_id=None, after=None, page_size: int = 50, **filters) -> tuple[pd.DataFrame, tuple | None, dict | None]:
+    """
+    One page of the history grid from the snapshot, like service.get_bets_page()
+    (same filters and (bet_date, id) cursor), plus service.get_bet_totals() for
+    every bet matching the filters. Returns (page in HISTORY_COLUMNS, next
+    cursor, totals); read from Postgres instead if the snapshot fails.
+    """
+    try:
+        table = _filter(load_table(user_id, list(service.HISTORY_COLUMNS)), **filters)
+        totals = _totals(table)
+        if after is not None:
+            bet_date, bet_id = pa.scalar(after[0], type=_TIMESTAMP), after[1]
+            table = table.filter(pc.or_(
+                pc.less(table["bet_date"], bet_date),
+                pc.and_(pc.equal(table["bet_date"], bet_date), pc.less(table["id"], bet_id)),
+            ))
+        next_cursor = None
+        if table.num_rows > page_size:
+            last = table.slice(page_size - 1, 1).to_pylist()[0]
+            next_cursor = (last["bet_date"], last["id"])
+        return _to_pandas(table.slice(0, page_size)), next_cursor, totals
+    except Exception as e:
+        logger.error(f"❌ Failed to read history from the snapshot, using the database: {e}")
+
+    rows, next_cursor = service.get_bets_page(user_id, after=after, page_size=page_size, **filters)
+    totals = service.get_bet_totals(user_id, **filters)
+    return pd.DataFrame(rows, columns=service.HISTORY_COLUMNS), next_cursor, totals
+
+
+ANALYTICS_COLUMNS = ["bookmaker", "exchange", "bet_type", "result", "bet_date", "back_stake", "net_profit_loss"]
+
+
+def load_analytics(user_id=None) -> dict | None:
+    """
+    service.get_analytics() (totals and a breakdown per ANALYTICS_DIMENSIONS)
+    computed from the snapshot with Arrow group-bys, reading only the columns
+    they need. Uses the database query if the snapshot fails.
+    """
+    try:
+        table = load_table(user_id, ANALYTICS_COLUMNS)
+        settled = pc.is_valid(table["net_profit_loss"])
+        table = pa.table({
+            "bookmaker": table["bookmaker"],
+            "exchange": pc.fill_null(table["exchange"], ""),
+            "bet_type": table["bet_type"],
+            "result": table["result"],
+            "month": pc.floor_temporal(table["bet_date"], unit="month").cast(pa.date32()),
+            "back_stake": table["back_stake"],
+            "settled_stake": pc.if_else(settled, table["back_stake"], pa.scalar(None, pa.float64())),
+            "net_profit_loss": table["net_profit_loss"],
+        })
+        aggregates = [
+            ([], "count_all"),
+            ("net_profit_loss", "count"),
+            ("back_stake", "sum"),
+            ("net_profit_loss", "sum"),
+            ("settled_stake", "sum"),
+        ]
+
+        def row(bets, settled_bets, staked, net_profit, settled_staked):
+            net_profit = net_profit or 0.0
+            roi = net_profit / settled_staked if settled_staked else None
+            return (bets, settled_bets, float(staked or 0.0), float(net_profit), roi)
+
+        totals = dict(zip(service.BREAKDOWN_COLUMNS[1:], row(
+            table.num_rows, *(pc.sum(table[column]).as_py() if how == "sum" else pc.count(table[column]).as_py()
+                              for column, how in aggregates[1:])
+        )))
+        breakdowns = {}
+        for dimension in service.ANALYTICS_DIMENSIONS:
+            grouped = table.group_by(dimension).aggregate(aggregates).to_pylist()
+            rows = sorted(
+                (item[dimension], *row(*(item[f"{column}_{how}" if column else how] for column, how in aggregates)))
+                for item in grouped
+            )
+            if dimension != "month":
+                rows.sort(key=lambda r: r[4], reverse=True)
+            breakdowns[dimension] = rows
+        return {"totals": totals, "breakdowns": breakdowns}
+    except Exception as e:
+        logger.error(f"❌ Failed to compute analytics from the snapshot, using the database: {e}")
+    return service.get_analytics(user_id)
+
+
+def export_history(user_id=None, fmt: str = "parquet", sync: bool = True) -> bytes:
+    """Full history as Parquet or CSV bytes, e.g. for a download button."""
+    table = load_table(user_id, EXPORT_COLUMNS, sync)
+    buffer = io.BytesIO()
+    if fmt == "parquet":
+        pq.write_table(table, buffer, compression="zstd")
+    elif fmt == "csv":
+        pyarrow.csv.write_csv(table, buffer)
+    else:
+        raise ValueError("fmt must be 'parquet' or 'csv'")
+    return buffer.getvalue()
@@ -0,0 +1,208 @@
+"""
+Write-behind saving of bets: "Save Bet" returns once the bet is on local disk.
+
+submit() validates a bet, gives it an idempotency key, and appends it to a
+local journal (JSON lines, fsynced before returning). It also adds the bet
+to an in-process queue. A background thread flushes the queue to Postgres in
+batches with service.insert_keyed_bets() and retries with backoff while the
+database is slow or unreachable. Flushed bets are then dropped from the
+journal.
+
+Delivery is at least once: a bet is only dropped from the journal after its
+flush commits, and bets still in the journal when the process starts are
+queued again. The idempotency key makes repeats harmless: the database
+skips any (idempotency_key, bet_date) it already has.
+
+Enabled by ARBIFY_WRITE_BEHIND=1. The journal lives in ARBIFY_JOURNAL_DIR
+(default ~/.cache/arbify/journal). Each server process needs its own
+directory.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from data import service
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_DIR = os.getenv("ARBIFY_JOURNAL_DIR", os.path.join(os.path.expanduser("~"), ".cache", "arbify", "journal"))
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 0.2
+MAX_BACKOFF = 30.0
+
+
+class WriteBehindQueue:
+    """
+    Journal plus flush worker for one journal file. start() replays what is
+    already in the journal and starts the worker; stop() makes one last flush.
+    """
+
+    def __init__(self, path: str, batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL,
+                 max_backoff: float = MAX_BACKOFF):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._journal = None
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._stats = {"submitted": 0, "replayed": 0, "flushed": 0, "duplicates": 0, "flush_failures": 0}
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock:
+            self._pending = self._read_journal()
+            self._stats["replayed"] = len(self._pending)
+            self._rewrite_journal()
+        if self._pending:
+            logger.info(f"📒 Replaying {len(self._pending)} journaled bets from {self.path}.")
+        self._thread = threading.Thread(target=self._run, name="arbify-write-behind", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    def submit(self, bet_object) -> str:
+        """
+        Validate a bet, journal it durably and queue it for saving; returns its
+        idempotency key. Raises ValueError for an invalid bet, OSError if the
+        journal can't be written.
+        """
+        row = service._validate_bet(bet_object)
+        key = str(uuid.uuid4())
+        line = json.dumps({"key": key, "row": row}) + "\n"
+        with self._lock:
+            self._journal.write(line)
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._pending[key] = row
+            self._stats["submitted"] += 1
+        self._wake.set()
+        return key
+
+    def pending(self, user_id=None) -> int:
+        """Number of bets journaled but not yet in the database (one user's, or all)."""
+        user_at = 1 + service.BET_COLUMNS.index("user_id")
+        with self._lock:
+            if user_id is None:
+                return len(self._pending)
+            # Rows hold the validated int; pages pass the session's user_id, a string
+            return sum(1 for row in self._pending.values() if str(row[user_at]) == str(user_id))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "pending": len(self._pending)}
+
+    def _read_journal(self) -> dict:
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A write cut short by a crash; it was never acknowledged to the user
+                    logger.warning(f"⚠️ Skipping a torn line in {self.path}.")
+                    continue
+                entries[entry["key"]] = entry["row"]
+        return entries
+
+    def _rewrite_journal(self):
+        """Replace the journal with just the pending bets. Called with the lock held."""
+        if self._journal is not None:
+            self._journal.close()
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for key, row in self._pending.items():
+                f.write(json.dumps({"key": key, "row": row}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._journal = open(self.path, "a", encoding="utf-8")
+
+    def _run(self):
+        backoff = 0.0
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            stopping = self._stopping.is_set()
+            with self._lock:
+                batch = list(self._pending.items())[:self.batch_size]
+            if batch:
+                started = time.perf_counter()
+                inserted = service.insert_keyed_bets(batch)
+                if inserted is None:
+                    with self._lock:
+                        self._stats["flush_failures"] += 1
+                    if stopping:
+                        logger.warning(f"⚠️ {self.pending()} bets left in {self.path}; they are saved on next start.")
+                        return
+                    backoff = min(self.max_backoff, backoff * 2 or 0.5)
+                    self._stopping.wait(backoff)
+                    continue
+                backoff = 0.0
+                with self._lock:
+                    for key, _ in batch:
+                        self._pending.pop(key, None)
+                    self._stats["flushed"] += inserted
+                    self._stats["duplicates"] += len(batch) - inserted
+                    self._rewrite_journal()
+                    more = bool(self._pending)
+                logger.info(f"✅ Flushed {len(batch)} journaled bets in {time.perf_counter() - started:.3f}s.")
+                if more:
+                    self._wake.set()
+                    continue
+            if stopping:
+                return
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_write_behind() -> WriteBehindQueue | None:
+    """
+    The process-wide write-behind queue, started (and its journal replayed) on
+    first call if ARBIFY_WRITE_BEHIND is set; None when bets are saved directly.
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            if os.getenv("ARBIFY_WRITE_BEHIND", "").lower() not in ("1", "true", "yes"):
+                return None
+            _queue = WriteBehindQueue(os.path.join(JOURNAL_DIR, "bets.jsonl"))
+            _queue.start()
+            # Last flush on a clean shutdown; anything it misses is replayed next start
+            atexit.register(_queue.stop)
+        return _queue
+
+
+def save_bet(bet_object) -> bool:
+    """
+    Save a bet through the write-behind queue when enabled, otherwise with
+    service.insert_bet(). Returns True once the bet is journaled (or saved).
+    """
+    queue = get_write_behind()
+    if queue is None:
+        return service.insert_bet(bet_object)
+    try:
+        queue.submit(bet_object)
+        return True
+    except (ValueError, OSError) as e:
+        logger.error(f"❌ Failed to journal bet: {e}")
+        return False
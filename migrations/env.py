@@ -0,0 +1,63 @@
+"""
+Alembic environment for the bethistory schema.
+
+Connects with the same DB_* variables as data/db.py (see setup.bash) and the
+same search_path, so migrations create and alter the tables the app uses.
+The version table lives in bethistory too.
+"""
+import os
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import URL, create_engine, pool, text
+
+SCHEMA = "bethistory"
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+
+def database_url() -> URL:
+    return URL.create(
+        "postgresql+psycopg2",
+        username=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        host=os.getenv("DB_HOST"),
+        port=int(os.getenv("DB_PORT", "5432")),
+        database=os.getenv("DB_NAME"),
+    )
+
+
+def run_migrations_offline():
+    """Emit the migration SQL (alembic upgrade head --sql) instead of running it."""
+    context.configure(
+        url=database_url(),
+        literal_binds=True,
+        version_table_schema=SCHEMA,
+        transactional_ddl=True,
+    )
+    with context.begin_transaction():
+        context.execute(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA}")
+        context.execute(f"SET search_path TO {SCHEMA}")
+        context.run_migrations()
+
+
+def run_migrations_online():
+    engine = create_engine(
+        database_url(),
+        poolclass=pool.NullPool,
+        connect_args={"options": f"-c search_path={SCHEMA}"},
+    )
+    with engine.connect() as connection:
+        connection.execute(text(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA}"))
+        connection.commit()
+        context.configure(connection=connection, version_table_schema=SCHEMA, transactional_ddl=True)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,102 @@
+CREATE TABLE IF NOT EXISTS matched_bets (
+    -- A unique ID for each bet record
+    id SERIAL PRIMARY KEY,
+
+    -- The date and time the bet was placed
+    bet_date TIMESTAMPTZ DEFAULT NOW(),
+
+    -- Details from your spreadsheet
+    bookmaker VARCHAR(100) NOT NULL,
+    event VARCHAR(255) NOT NULL,
+    bet_type VARCHAR(50) NOT NULL,
+    
+    -- Back Bet details
+    back_stake DECIMAL NOT NULL,
+    back_odds DECIMAL NOT NULL,
+
+    -- Lay Bet details
+    exchange VARCHAR(100),
+    lay_odds DECIMAL,
+    lay_stake DECIMAL,
+    lay_liability DECIMAL,
+
+    -- Outcome and Profit/Loss
+    -- Outcome can be 'Won' (back bet won), 'Lost' (back bet lost), 'Void', or 'Pending'
+    bookmaker_profit_loss DECIMAL,
+    exchange_profit_loss DECIMAL,
+    net_profit_loss DECIMAL,
+    result TEXT DEFAULT 'unsettled', -- back, lay, void, unsettled
+    
+    -- Optional field for any extra notes
+    notes TEXT,
+
+    -- Owner of the bet (the logged-in user who saved it)
+    user_id INTEGER
+);
+
+-- Upgrade tables created before bets were owned by users
+ALTER TABLE matched_bets ADD COLUMN IF NOT EXISTS user_id INTEGER;
+
+-- Keyset pagination of a user's history: ORDER BY bet_date DESC, id DESC
+CREATE INDEX IF NOT EXISTS matched_bets_user_date_id_idx
+    ON matched_bets (user_id, bet_date DESC, id DESC);
+
+-- Lay commission (as a decimal) and free-bet stake-returned flag, recorded when the bet is saved
+ALTER TABLE matched_bets ADD COLUMN IF NOT EXISTS lay_commission DECIMAL NOT NULL DEFAULT 0.02;
+ALTER TABLE matched_bets ADD COLUMN IF NOT EXISTS free_sr BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- Settled profit is computed here rather than by the app, with the same
+-- formulas as data/engine.py: the back-wins or lay-wins total for the result,
+-- 0 for void and NULL while unsettled. A missing lay stake/liability is
+-- filled in from the odds first.
+CREATE OR REPLACE FUNCTION matched_bets_settle() RETURNS trigger AS $$
+DECLARE
+    free_bet BOOLEAN := NEW.bet_type LIKE '%Free Bet%';
+BEGIN
+    IF NEW.lay_stake IS NULL AND NEW.lay_odds IS NOT NULL AND NEW.lay_odds > NEW.lay_commission THEN
+        NEW.lay_stake := CASE
+            WHEN free_bet AND NOT NEW.free_sr THEN (NEW.back_odds - 1) * NEW.back_stake
+            ELSE NEW.back_odds * NEW.back_stake
+        END / (NEW.lay_odds - NEW.lay_commission);
+    END IF;
+    IF NEW.lay_liability IS NULL AND NEW.lay_stake IS NOT NULL THEN
+        NEW.lay_liability := NEW.lay_stake * (NEW.lay_odds - 1);
+    END IF;
+
+    NEW.net_profit_loss := CASE NEW.result
+        WHEN 'back' THEN ROUND(
+            NEW.back_stake * (NEW.back_odds - 1) - COALESCE(NEW.lay_stake * (NEW.lay_odds - 1), 0), 2)
+        WHEN 'lay' THEN ROUND(
+            COALESCE(NEW.lay_stake * (1 - NEW.lay_commission), 0) - CASE WHEN free_bet THEN 0 ELSE NEW.back_stake END, 2)
+        WHEN 'void' THEN 0
+    END;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS matched_bets_settle ON matched_bets;
+CREATE TRIGGER matched_bets_settle
+    BEFORE INSERT OR UPDATE ON matched_bets
+    FOR EACH ROW EXECUTE FUNCTION matched_bets_settle();
+
+-- Settle bets saved before the trigger existed
+UPDATE matched_bets SET result = result
+WHERE result <> 'unsettled' AND net_profit_loss IS NULL;
+
+-- Last change to each bet; local history snapshots (data/snapshot.py) sync on it
+ALTER TABLE matched_bets ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
+
+CREATE INDEX IF NOT EXISTS matched_bets_user_updated_idx
+    ON matched_bets (user_id, updated_at);
+
+CREATE OR REPLACE FUNCTION matched_bets_touch() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at := NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS matched_bets_touch ON matched_bets;
+CREATE TRIGGER matched_bets_touch
+    BEFORE UPDATE ON matched_bets
+    FOR EACH ROW EXECUTE FUNCTION matched_bets_touch();
@@ -0,0 +1,108 @@
+-- Open exposure index: money tied up in unsettled bets.
+-- One row per user, bookmaker, exchange and event with open (result =
+-- 'unsettled') bets, kept in step with matched_bets by the statement-level
+-- triggers below: inserts add, deletes subtract, and a result change moves a
+-- bet in or out. Open liability by exchange, bookmaker or event then reads a
+-- handful of rows instead of scanning the history. Rebuild it after loading
+-- data with triggers disabled: python run_arbify_cli.py rebuild-rollup
+
+CREATE TABLE IF NOT EXISTS open_exposure (
+    -- 0 for bets with no owner, '' for bets with no exchange (primary key columns cannot be NULL)
+    user_id INTEGER NOT NULL,
+    bookmaker VARCHAR(100) NOT NULL,
+    exchange VARCHAR(100) NOT NULL,
+    event VARCHAR(255) NOT NULL,
+
+    -- Number of open bets, back stakes at the bookmaker, lay liabilities at the exchange
+    open_bets INTEGER NOT NULL DEFAULT 0,
+    back_stake DECIMAL NOT NULL DEFAULT 0,
+    lay_liability DECIMAL NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (user_id, bookmaker, exchange, event)
+);
+
+CREATE OR REPLACE FUNCTION open_exposure_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO open_exposure AS oe (user_id, bookmaker, exchange, event, open_bets, back_stake, lay_liability)
+        SELECT COALESCE(user_id, 0), bookmaker, COALESCE(exchange, ''), event,
+               -COUNT(*), -SUM(back_stake), -COALESCE(SUM(lay_liability), 0)
+        FROM old_rows
+        WHERE result = 'unsettled'
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (user_id, bookmaker, exchange, event) DO UPDATE SET
+            open_bets = oe.open_bets + EXCLUDED.open_bets,
+            back_stake = oe.back_stake + EXCLUDED.back_stake,
+            lay_liability = oe.lay_liability + EXCLUDED.lay_liability;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO open_exposure AS oe (user_id, bookmaker, exchange, event, open_bets, back_stake, lay_liability)
+        SELECT COALESCE(user_id, 0), bookmaker, COALESCE(exchange, ''), event,
+               COUNT(*), SUM(back_stake), COALESCE(SUM(lay_liability), 0)
+        FROM new_rows
+        WHERE result = 'unsettled'
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (user_id, bookmaker, exchange, event) DO UPDATE SET
+            open_bets = oe.open_bets + EXCLUDED.open_bets,
+            back_stake = oe.back_stake + EXCLUDED.back_stake,
+            lay_liability = oe.lay_liability + EXCLUDED.lay_liability;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM open_exposure AS oe
+        USING (SELECT DISTINCT COALESCE(user_id, 0) AS user_id, bookmaker,
+                      COALESCE(exchange, '') AS exchange, event
+               FROM old_rows
+               WHERE result = 'unsettled') AS touched
+        WHERE oe.user_id = touched.user_id
+          AND oe.bookmaker = touched.bookmaker
+          AND oe.exchange = touched.exchange
+          AND oe.event = touched.event
+          AND oe.open_bets = 0;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables need one trigger per event
+DROP TRIGGER IF EXISTS matched_bets_open_exposure_insert ON matched_bets;
+CREATE TRIGGER matched_bets_open_exposure_insert
+    AFTER INSERT ON matched_bets
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION open_exposure_sync();
+
+DROP TRIGGER IF EXISTS matched_bets_open_exposure_update ON matched_bets;
+CREATE TRIGGER matched_bets_open_exposure_update
+    AFTER UPDATE ON matched_bets
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION open_exposure_sync();
+
+DROP TRIGGER IF EXISTS matched_bets_open_exposure_delete ON matched_bets;
+CREATE TRIGGER matched_bets_open_exposure_delete
+    AFTER DELETE ON matched_bets
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION open_exposure_sync();
+
+-- Recompute the whole index from matched_bets; returns the number of index rows.
+-- Blocks writes to matched_bets while it runs.
+CREATE OR REPLACE FUNCTION rebuild_open_exposure() RETURNS INTEGER AS $$
+DECLARE
+    row_count INTEGER;
+BEGIN
+    LOCK TABLE matched_bets IN SHARE MODE;
+    DELETE FROM open_exposure;
+    INSERT INTO open_exposure (user_id, bookmaker, exchange, event, open_bets, back_stake, lay_liability)
+    SELECT COALESCE(user_id, 0), bookmaker, COALESCE(exchange, ''), event,
+           COUNT(*), SUM(back_stake), COALESCE(SUM(lay_liability), 0)
+    FROM matched_bets
+    WHERE result = 'unsettled'
+    GROUP BY 1, 2, 3, 4;
+    GET DIAGNOSTICS row_count = ROW_COUNT;
+    RETURN row_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Fill the index for bets saved before it existed
+SELECT rebuild_open_exposure() WHERE NOT EXISTS (SELECT 1 FROM open_exposure);
@@ -0,0 +1,99 @@
+-- Daily profit rollup behind the Home profit chart.
+-- One row per user, day, bookmaker and exchange, kept in step with matched_bets
+-- by the statement-level triggers below, so the chart reads O(days) rows
+-- instead of scanning every bet. Rebuild it after loading data with triggers
+-- disabled: python run_arbify_cli.py rebuild-rollup
+
+CREATE TABLE IF NOT EXISTS daily_profit (
+    -- 0 for bets with no owner, '' for bets with no exchange (primary key columns cannot be NULL)
+    user_id INTEGER NOT NULL,
+    day DATE NOT NULL,
+    bookmaker VARCHAR(100) NOT NULL,
+    exchange VARCHAR(100) NOT NULL,
+
+    -- Sum of net_profit_loss, number of bets with a net_profit_loss, number of bets
+    net_profit DECIMAL NOT NULL DEFAULT 0,
+    settled_bets INTEGER NOT NULL DEFAULT 0,
+    total_bets INTEGER NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (user_id, day, bookmaker, exchange)
+);
+
+CREATE OR REPLACE FUNCTION daily_profit_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO daily_profit AS dp (user_id, day, bookmaker, exchange, net_profit, settled_bets, total_bets)
+        SELECT COALESCE(user_id, 0), DATE(bet_date), bookmaker, COALESCE(exchange, ''),
+               -COALESCE(SUM(net_profit_loss), 0), -COUNT(net_profit_loss), -COUNT(*)
+        FROM old_rows
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (user_id, day, bookmaker, exchange) DO UPDATE SET
+            net_profit = dp.net_profit + EXCLUDED.net_profit,
+            settled_bets = dp.settled_bets + EXCLUDED.settled_bets,
+            total_bets = dp.total_bets + EXCLUDED.total_bets;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO daily_profit AS dp (user_id, day, bookmaker, exchange, net_profit, settled_bets, total_bets)
+        SELECT COALESCE(user_id, 0), DATE(bet_date), bookmaker, COALESCE(exchange, ''),
+               COALESCE(SUM(net_profit_loss), 0), COUNT(net_profit_loss), COUNT(*)
+        FROM new_rows
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (user_id, day, bookmaker, exchange) DO UPDATE SET
+            net_profit = dp.net_profit + EXCLUDED.net_profit,
+            settled_bets = dp.settled_bets + EXCLUDED.settled_bets,
+            total_bets = dp.total_bets + EXCLUDED.total_bets;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM daily_profit AS dp
+        USING (SELECT DISTINCT COALESCE(user_id, 0) AS user_id, DATE(bet_date) AS day,
+                      bookmaker, COALESCE(exchange, '') AS exchange
+               FROM old_rows) AS touched
+        WHERE dp.user_id = touched.user_id
+          AND dp.day = touched.day
+          AND dp.bookmaker = touched.bookmaker
+          AND dp.exchange = touched.exchange
+          AND dp.total_bets = 0;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables need one trigger per event
+DROP TRIGGER IF EXISTS matched_bets_daily_profit_insert ON matched_bets;
+CREATE TRIGGER matched_bets_daily_profit_insert
+    AFTER INSERT ON matched_bets
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION daily_profit_sync();
+
+DROP TRIGGER IF EXISTS matched_bets_daily_profit_update ON matched_bets;
+CREATE TRIGGER matched_bets_daily_profit_update
+    AFTER UPDATE ON matched_bets
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION daily_profit_sync();
+
+DROP TRIGGER IF EXISTS matched_bets_daily_profit_delete ON matched_bets;
+CREATE TRIGGER matched_bets_daily_profit_delete
+    AFTER DELETE ON matched_bets
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION daily_profit_sync();
+
+-- Recompute the whole rollup from matched_bets; returns the number of rollup rows.
+-- Blocks writes to matched_bets while it runs.
+CREATE OR REPLACE FUNCTION rebuild_daily_profit() RETURNS INTEGER AS $$
+DECLARE
+    row_count INTEGER;
+BEGIN
+    LOCK TABLE matched_bets IN SHARE MODE;
+    DELETE FROM daily_profit;
+    INSERT INTO daily_profit (user_id, day, bookmaker, exchange, net_profit, settled_bets, total_bets)
+    SELECT COALESCE(user_id, 0), DATE(bet_date), bookmaker, COALESCE(exchange, ''),
+           COALESCE(SUM(net_profit_loss), 0), COUNT(net_profit_loss), COUNT(*)
+    FROM matched_bets
+    GROUP BY 1, 2, 3, 4;
+    GET DIAGNOSTICS row_count = ROW_COUNT;
+    RETURN row_count;
+END;
+$$ LANGUAGE plpgsql;
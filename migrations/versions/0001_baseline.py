@@ -0,0 +1,35 @@
+"""Baseline: matched_bets, the daily_profit rollup and the open_exposure index
+
+The schema as init-db created it before migrations, from the SQL files in
+migrations/sql. Every statement there is idempotent, so databases created
+that way upgrade through this revision unchanged. Later schema changes go in
+new revisions rather than edits to those files.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+import os
+
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql")
+BASELINE_FILES = ("schema_bet.sql", "schema_rollup.sql", "schema_exposure.sql")
+
+
+def upgrade():
+    for name in BASELINE_FILES:
+        with open(os.path.join(SQL_DIR, name), encoding="utf-8") as f:
+            op.execute(f.read())
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS open_exposure, daily_profit, matched_bets CASCADE")
+    op.execute("DROP FUNCTION IF EXISTS rebuild_open_exposure(), open_exposure_sync()")
+    op.execute("DROP FUNCTION IF EXISTS rebuild_daily_profit(), daily_profit_sync()")
+    op.execute("DROP FUNCTION IF EXISTS matched_bets_touch(), matched_bets_settle()")
@@ -0,0 +1,203 @@
+"""Partition matched_bets by month of bet_date and index the hot queries
+
+matched_bets becomes a range-partitioned table with one partition per
+calendar month (UTC) of bet_date, plus a default partition that catches bets
+outside the months created so far. ensure_matched_bets_partitions() creates
+the monthly partitions up to a few months ahead, moving any bets waiting in
+the default partition into them; run it monthly with
+python run_arbify_cli.py ensure-partitions.
+
+Postgres requires the partition key in every unique index, so the primary
+key becomes (id, bet_date). ids still come from the one matched_bets_id_seq
+sequence, so they stay unique on their own.
+
+Indexes, created on the parent and inherited by every partition:
+- (id, bet_date) primary key: update/delete by id
+- (user_id, bet_date DESC, id DESC): history pages, exports, counts
+- (user_id, result, bet_date DESC): history filtered by result
+- (user_id, updated_at): snapshot sync
+- (user_id, bet_date) WHERE result = 'unsettled': open bets and exposure
+- (user_id, bet_date) INCLUDE (net_profit_loss) WHERE net_profit_loss IS NOT NULL: settled profit
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+COLUMNS = """
+    bookmaker VARCHAR(100) NOT NULL,
+    event VARCHAR(255) NOT NULL,
+    bet_type VARCHAR(50) NOT NULL,
+    back_stake DECIMAL NOT NULL,
+    back_odds DECIMAL NOT NULL,
+    exchange VARCHAR(100),
+    lay_odds DECIMAL,
+    lay_stake DECIMAL,
+    lay_liability DECIMAL,
+    bookmaker_profit_loss DECIMAL,
+    exchange_profit_loss DECIMAL,
+    net_profit_loss DECIMAL,
+    result TEXT DEFAULT 'unsettled',
+    notes TEXT,
+    user_id INTEGER,
+    lay_commission DECIMAL NOT NULL DEFAULT 0.02,
+    free_sr BOOLEAN NOT NULL DEFAULT FALSE,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+"""
+
+COLUMN_NAMES = (
+    "id, bet_date, bookmaker, event, bet_type, back_stake, back_odds, exchange, lay_odds, lay_stake, "
+    "lay_liability, bookmaker_profit_loss, exchange_profit_loss, net_profit_loss, result, notes, user_id, "
+    "lay_commission, free_sr, updated_at"
+)
+
+# Indexes of the unpartitioned table, recreated on downgrade
+BASELINE_INDEXES = """
+CREATE INDEX matched_bets_user_date_id_idx ON matched_bets (user_id, bet_date DESC, id DESC);
+CREATE INDEX matched_bets_user_updated_idx ON matched_bets (user_id, updated_at);
+"""
+
+INDEXES = BASELINE_INDEXES + """
+CREATE INDEX matched_bets_user_result_idx ON matched_bets (user_id, result, bet_date DESC);
+CREATE INDEX matched_bets_user_open_idx ON matched_bets (user_id, bet_date)
+    WHERE result = 'unsettled';
+CREATE INDEX matched_bets_user_settled_idx ON matched_bets (user_id, bet_date) INCLUDE (net_profit_loss)
+    WHERE net_profit_loss IS NOT NULL;
+"""
+
+# The triggers from the baseline, recreated on whichever table is matched_bets
+TRIGGERS = """
+CREATE TRIGGER matched_bets_settle
+    BEFORE INSERT OR UPDATE ON matched_bets
+    FOR EACH ROW EXECUTE FUNCTION matched_bets_settle();
+CREATE TRIGGER matched_bets_touch
+    BEFORE UPDATE ON matched_bets
+    FOR EACH ROW EXECUTE FUNCTION matched_bets_touch();
+CREATE TRIGGER matched_bets_daily_profit_insert
+    AFTER INSERT ON matched_bets
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION daily_profit_sync();
+CREATE TRIGGER matched_bets_daily_profit_update
+    AFTER UPDATE ON matched_bets
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION daily_profit_sync();
+CREATE TRIGGER matched_bets_daily_profit_delete
+    AFTER DELETE ON matched_bets
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION daily_profit_sync();
+CREATE TRIGGER matched_bets_open_exposure_insert
+    AFTER INSERT ON matched_bets
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION open_exposure_sync();
+CREATE TRIGGER matched_bets_open_exposure_update
+    AFTER UPDATE ON matched_bets
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION open_exposure_sync();
+CREATE TRIGGER matched_bets_open_exposure_delete
+    AFTER DELETE ON matched_bets
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION open_exposure_sync();
+"""
+
+ENSURE_PARTITIONS = """
+-- Create the monthly partitions of matched_bets from the month of `since` (or
+-- of the oldest bet in the default partition, or this month) to months_ahead
+-- months from now. Bets in the default partition are moved into their new
+-- month; the rows only move, so no trigger fires and the rollups are untouched.
+-- Returns the number of partitions created.
+CREATE OR REPLACE FUNCTION ensure_matched_bets_partitions(months_ahead INTEGER DEFAULT 3, since TIMESTAMPTZ DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    month TIMESTAMP;
+    last_month TIMESTAMP := date_trunc('month', (NOW() AT TIME ZONE 'UTC') + make_interval(months => months_ahead));
+    lower_bound TIMESTAMPTZ;
+    upper_bound TIMESTAMPTZ;
+    partition_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    SELECT date_trunc('month', LEAST(MIN(bet_date), since, NOW()) AT TIME ZONE 'UTC')
+    INTO month
+    FROM matched_bets_default;
+
+    WHILE month <= last_month LOOP
+        partition_name := 'matched_bets_' || to_char(month, 'YYYY_MM');
+        IF to_regclass(partition_name) IS NULL THEN
+            lower_bound := month AT TIME ZONE 'UTC';
+            upper_bound := (month + INTERVAL '1 month') AT TIME ZONE 'UTC';
+            EXECUTE format('CREATE TABLE %I (LIKE matched_bets INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name);
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM matched_bets_default WHERE bet_date >= %L AND bet_date < %L RETURNING *) '
+                'INSERT INTO %I SELECT * FROM moved',
+                lower_bound, upper_bound, partition_name
+            );
+            EXECUTE format(
+                'ALTER TABLE matched_bets ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, lower_bound, upper_bound
+            );
+            created := created + 1;
+        END IF;
+        month := month + INTERVAL '1 month';
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade():
+    # Indexes and constraints are named per schema, so the old table's go first
+    op.execute("ALTER TABLE matched_bets RENAME TO matched_bets_unpartitioned")
+    op.execute("ALTER TABLE matched_bets_unpartitioned RENAME CONSTRAINT matched_bets_pkey TO matched_bets_unpartitioned_pkey")
+    op.execute("DROP INDEX IF EXISTS matched_bets_user_date_id_idx, matched_bets_user_updated_idx")
+
+    op.execute(f"""
+        CREATE TABLE matched_bets (
+            id INTEGER NOT NULL DEFAULT nextval('matched_bets_id_seq'),
+            bet_date TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            {COLUMNS},
+            PRIMARY KEY (id, bet_date)
+        ) PARTITION BY RANGE (bet_date)
+    """)
+    op.execute("CREATE TABLE matched_bets_default PARTITION OF matched_bets DEFAULT")
+    op.execute(INDEXES)
+    op.execute(ENSURE_PARTITIONS)
+    op.execute("SELECT ensure_matched_bets_partitions(3, (SELECT MIN(bet_date) FROM matched_bets_unpartitioned))")
+
+    # Copied before the triggers exist: the rollups already count these bets
+    op.execute(f"""
+        INSERT INTO matched_bets ({COLUMN_NAMES})
+        SELECT {COLUMN_NAMES.replace("bet_date", "COALESCE(bet_date, updated_at)", 1)}
+        FROM matched_bets_unpartitioned
+    """)
+    op.execute("ALTER SEQUENCE matched_bets_id_seq OWNED BY matched_bets.id")
+    op.execute("DROP TABLE matched_bets_unpartitioned")
+    op.execute(TRIGGERS)
+
+
+def downgrade():
+    op.execute("ALTER TABLE matched_bets RENAME TO matched_bets_partitioned")
+    op.execute("ALTER TABLE matched_bets_partitioned RENAME CONSTRAINT matched_bets_pkey TO matched_bets_partitioned_pkey")
+    op.execute(
+        "DROP INDEX IF EXISTS matched_bets_user_date_id_idx, matched_bets_user_updated_idx, "
+        "matched_bets_user_result_idx, matched_bets_user_open_idx, matched_bets_user_settled_idx"
+    )
+
+    op.execute(f"""
+        CREATE TABLE matched_bets (
+            id INTEGER PRIMARY KEY DEFAULT nextval('matched_bets_id_seq'),
+            bet_date TIMESTAMPTZ DEFAULT NOW(),
+            {COLUMNS}
+        )
+    """)
+    op.execute(BASELINE_INDEXES)
+    op.execute(f"INSERT INTO matched_bets ({COLUMN_NAMES}) SELECT {COLUMN_NAMES} FROM matched_bets_partitioned")
+    op.execute("ALTER SEQUENCE matched_bets_id_seq OWNED BY matched_bets.id")
+    op.execute("DROP TABLE matched_bets_partitioned")
+    op.execute("DROP FUNCTION IF EXISTS ensure_matched_bets_partitions(INTEGER, TIMESTAMPTZ)")
+    op.execute(TRIGGERS)
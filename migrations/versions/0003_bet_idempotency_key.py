@@ -0,0 +1,34 @@
+"""Idempotency key for bets saved through the write-behind journal
+
+Bets written behind (data/write_behind.py) are delivered at least once: a
+flush that times out after the commit is retried, and bets still in the
+journal at startup are sent again. Each carries a client-generated UUID, and
+inserts skip any (idempotency_key, bet_date) already present, so a retry can
+never save a bet twice. bet_date is part of the unique index because
+matched_bets is partitioned on it; the journal keeps each bet's bet_date, so
+retries repeat it exactly. Bets saved directly have no key (NULL never
+conflicts).
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("ALTER TABLE matched_bets ADD COLUMN IF NOT EXISTS idempotency_key UUID")
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS matched_bets_idempotency_key_idx "
+        "ON matched_bets (idempotency_key, bet_date)"
+    )
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS matched_bets_idempotency_key_idx")
+    op.execute("ALTER TABLE matched_bets DROP COLUMN IF EXISTS idempotency_key")
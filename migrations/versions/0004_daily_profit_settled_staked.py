@@ -0,0 +1,107 @@
+"""Settled stake in the daily_profit rollup
+
+The Home profit curve (cumulative profit, drawdown and rolling ROI) is built
+from daily_profit instead of from every bet. Rolling ROI needs the back stake
+of the settled bets behind each day's profit, so the rollup gains
+settled_staked. The sync trigger function and rebuild_daily_profit() keep it
+up to date, and the rollup is rebuilt once to backfill it.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+import os
+
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql")
+
+# daily_profit_sync() from migrations/sql/schema_rollup.sql, plus settled_staked
+SYNC_FUNCTION = """
+CREATE OR REPLACE FUNCTION daily_profit_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO daily_profit AS dp (user_id, day, bookmaker, exchange, net_profit, settled_staked, settled_bets, total_bets)
+        SELECT COALESCE(user_id, 0), DATE(bet_date), bookmaker, COALESCE(exchange, ''),
+               -COALESCE(SUM(net_profit_loss), 0),
+               -COALESCE(SUM(back_stake) FILTER (WHERE net_profit_loss IS NOT NULL), 0),
+               -COUNT(net_profit_loss), -COUNT(*)
+        FROM old_rows
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (user_id, day, bookmaker, exchange) DO UPDATE SET
+            net_profit = dp.net_profit + EXCLUDED.net_profit,
+            settled_staked = dp.settled_staked + EXCLUDED.settled_staked,
+            settled_bets = dp.settled_bets + EXCLUDED.settled_bets,
+            total_bets = dp.total_bets + EXCLUDED.total_bets;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO daily_profit AS dp (user_id, day, bookmaker, exchange, net_profit, settled_staked, settled_bets, total_bets)
+        SELECT COALESCE(user_id, 0), DATE(bet_date), bookmaker, COALESCE(exchange, ''),
+               COALESCE(SUM(net_profit_loss), 0),
+               COALESCE(SUM(back_stake) FILTER (WHERE net_profit_loss IS NOT NULL), 0),
+               COUNT(net_profit_loss), COUNT(*)
+        FROM new_rows
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (user_id, day, bookmaker, exchange) DO UPDATE SET
+            net_profit = dp.net_profit + EXCLUDED.net_profit,
+            settled_staked = dp.settled_staked + EXCLUDED.settled_staked,
+            settled_bets = dp.settled_bets + EXCLUDED.settled_bets,
+            total_bets = dp.total_bets + EXCLUDED.total_bets;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM daily_profit AS dp
+        USING (SELECT DISTINCT COALESCE(user_id, 0) AS user_id, DATE(bet_date) AS day,
+                      bookmaker, COALESCE(exchange, '') AS exchange
+               FROM old_rows) AS touched
+        WHERE dp.user_id = touched.user_id
+          AND dp.day = touched.day
+          AND dp.bookmaker = touched.bookmaker
+          AND dp.exchange = touched.exchange
+          AND dp.total_bets = 0;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+REBUILD_FUNCTION = """
+CREATE OR REPLACE FUNCTION rebuild_daily_profit() RETURNS INTEGER AS $$
+DECLARE
+    row_count INTEGER;
+BEGIN
+    LOCK TABLE matched_bets IN SHARE MODE;
+    DELETE FROM daily_profit;
+    INSERT INTO daily_profit (user_id, day, bookmaker, exchange, net_profit, settled_staked, settled_bets, total_bets)
+    SELECT COALESCE(user_id, 0), DATE(bet_date), bookmaker, COALESCE(exchange, ''),
+           COALESCE(SUM(net_profit_loss), 0),
+           COALESCE(SUM(back_stake) FILTER (WHERE net_profit_loss IS NOT NULL), 0),
+           COUNT(net_profit_loss), COUNT(*)
+    FROM matched_bets
+    GROUP BY 1, 2, 3, 4;
+    GET DIAGNOSTICS row_count = ROW_COUNT;
+    RETURN row_count;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade():
+    op.execute("ALTER TABLE daily_profit ADD COLUMN IF NOT EXISTS settled_staked DECIMAL NOT NULL DEFAULT 0")
+    op.execute(SYNC_FUNCTION)
+    op.execute(REBUILD_FUNCTION)
+    op.execute("SELECT rebuild_daily_profit()")
+
+
+def downgrade():
+    # The baseline file restores the previous functions (and re-creates the same triggers)
+    with open(os.path.join(SQL_DIR, "schema_rollup.sql"), encoding="utf-8") as f:
+        op.execute(f.read())
+    op.execute("ALTER TABLE daily_profit DROP COLUMN IF EXISTS settled_staked")
@@ -1,7 +1,14 @@
+import datetime
 import streamlit as st
+import numpy as np
 import pandas as pd
+from data.dutching import solve_dutch_frame
 from data.engine import MatchedBetCalculator
-from data.service import insert_bet, get_all_bets, update_bet_result
+from data.feeds import get_feed_service
+from data.ladder import snap, tick_index
+from data.profiling import span
+from data.write_behind import get_write_behind, save_bet
+from data.service import HISTORY_COLUMNS, get_open_exposure, update_bet_results
 
 def safe_float_from_text(label: str, value: str = "", placeholder: str = "") -> float | None:
     text_val = st.text_input(label, value=value, placeholder=placeholder)
@@ -18,40 +25,304 @@ def safe_float_from_text(label: str, value: str = "", placeholder: str = "") ->
 
 
 
-def compute_row_profit(row):
-    try:
-        back_stake = float(row.get("Back Stake", 0.0))
-        back_odds = float(row.get("Back Odds", 0.0))
-        lay_odds = float(row.get("Lay Odds", 0.0))
-        lay_cms = 0.02
-        bet_type = row.get("Bet Type", "Qualifying Bet")
-    except (ValueError, TypeError):
-        return 0.0
-
-    is_free_bet = "Free Bet" in bet_type
-
-    calculator = MatchedBetCalculator(
-        back_stake=back_stake if not is_free_bet else 0.0,
-        back_odds=back_odds,
-        back_cms=0.0,
-        lay_odds=lay_odds,
-        lay_cms=lay_cms,
-        free_sr=False,  # Assuming stake not returned for free bets in history
-        free_bet=is_free_bet,
-        free_bet_val=back_stake if is_free_bet else 0.0
+def live_price_prefill() -> dict:
+    """
+    Let the user pick a selection from the live feed store and return calculator
+    defaults for it (empty when no feeds are configured or nothing is picked).
+    """
+    service = get_feed_service()
+    if service is None or not len(service.store):
+        return {}
+
+    options = service.store.selections()
+    picked = st.selectbox(
+        "Prefill from live prices",
+        options=[None] + options,
+        format_func=lambda option: "—" if option is None else f"{option[0]} / {option[1]}"
     )
+    if picked is None:
+        return {}
+
+    back, lay = service.store.best(*picked)
+    defaults = {"event": f"{picked[0]} - {picked[1]}"}
+    if back is not None:
+        defaults.update(bookmaker=back.venue, back_odds=str(back.odds))
+    if lay is not None:
+        defaults.update(exchange=lay.venue, lay_odds=str(lay.odds))
+        if lay.commission is not None:
+            defaults["lay_percent"] = f"{lay.commission * 100:g}"
+    return defaults
+
 
-    result = row["Result"]
-    profits = calculator.get_bookie_exchange_breakdown()
+def save_result_changes(editor_key: str, bet_ids: list):
+    """
+    'Save Results' callback: save every edited 'Result' in one UPDATE.
 
-    if result == "back":
-        return profits['back_wins']['total']
-    elif result == "lay":
-        return profits['lay_wins']['total']
-    elif result == "void":
-        return 0.0
+    Reads the editor's edited-rows delta rather than diffing whole frames. The
+    editor sits in a form, so any number of edits cost a single rerun. The
+    editor key is bumped afterwards so the next render starts from the freshly
+    loaded rows instead of replaying the old delta.
+    """
+    edited_rows = st.session_state[editor_key].get("edited_rows", {})
+    changes = {
+        int(bet_ids[int(position)]): edits["Result"]
+        for position, edits in edited_rows.items()
+        if "Result" in edits
+    }
+    if not changes:
+        return
+
+    if update_bet_results(changes):
+        messages = [("success", f"✅ Updated result for Bet ID {bet_id} to '{result}'") for bet_id, result in changes.items()]
+        st.session_state["bet_history_editor_version"] = st.session_state.get("bet_history_editor_version", 0) + 1
     else:
-        return 0.0
+        messages = [("error", f"❌ Failed to update results for Bet IDs {', '.join(map(str, changes))}")]
+    st.session_state["bet_history_messages"] = messages
+
+
+
+def render_exchange_balance_check(exchange: str, liability: float, balance: float | None):
+    """Warn when a new lay's liability won't fit in what's left of the exchange balance after open bets."""
+    exposure = get_open_exposure(st.session_state.get("user_id"), by="exchange")
+    if exposure is None:
+        return
+    open_liability = exposure.get(exchange.strip(), {}).get("lay_liability", 0.0)
+    if balance is None:
+        if open_liability:
+            st.info(f"Open liability at {exchange or 'this exchange'}: £{open_liability:.2f}")
+        return
+    available = balance - open_liability
+    if liability > available:
+        st.warning(
+            f"Liability £{liability:.2f} exceeds the available balance at {exchange or 'this exchange'}: "
+            f"£{balance:.2f} balance less £{open_liability:.2f} open liability leaves £{available:.2f}.",
+            icon="⚠️"
+        )
+    else:
+        st.caption(f"£{available - liability:.2f} of the exchange balance left after this lay.")
+
+
+def render_sensitivity_heatmap(matched_bet: MatchedBetCalculator, back_odds: float, lay_odds: float, lay_cms: float):
+    """Sweep back x lay odds (and commission) around the entered prices and plot the chosen figure as a heatmap."""
+    import plotly.graph_objects as go
+
+    metrics = {
+        "Worst-case profit": "worst_case",
+        "Lay stake": "lay_stake",
+        "Lay liability": "liability",
+        "Profit if back wins": "back_wins",
+        "Profit if lay wins": "lay_wins",
+    }
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        metric = st.selectbox("Show", list(metrics), key="sensitivity_metric")
+        spread = st.slider("Odds range (± %)", 5, 100, 25, key="sensitivity_spread")
+    with col2:
+        steps = st.slider("Grid size (per axis)", 10, 300, 100, step=10, key="sensitivity_steps")
+    with col3:
+        commissions = st.multiselect(
+            "Exchange Commission (%)",
+            sorted({0.0, 2.0, 5.0, round(lay_cms * 100, 2)}),
+            default=[round(lay_cms * 100, 2)],
+            key="sensitivity_cms"
+        ) or [round(lay_cms * 100, 2)]
+        shown_cms = st.selectbox("Plot commission (%)", commissions, key="sensitivity_shown_cms")
+
+    back_axis = np.linspace(max(1.01, back_odds * (1 - spread / 100)), back_odds * (1 + spread / 100), steps)
+    # Lay prices can only be exchange ticks
+    lay_axis = np.unique(snap(np.linspace(max(1.01, lay_odds * (1 - spread / 100)), lay_odds * (1 + spread / 100), steps)))
+    surface = matched_bet.sensitivity_surface(back_axis, lay_axis, np.array(commissions) / 100.0)
+    grid = surface[metrics[metric]][:, :, commissions.index(shown_cms)]
+
+    fig = go.Figure(go.Heatmap(
+        z=grid,
+        x=lay_axis,
+        y=back_axis,
+        colorscale="RdYlGn",
+        zmid=0 if metrics[metric] in ("worst_case", "back_wins", "lay_wins") else None,
+        hovertemplate="Back %{y:.2f} / Lay %{x:.2f}<br>£%{z:.2f}<extra></extra>",
+    ))
+    fig.add_trace(go.Scatter(x=[lay_odds], y=[back_odds], mode="markers", marker=dict(color="black", symbol="x"), showlegend=False))
+    fig.update_layout(xaxis_title="Lay Odds", yaxis_title="Back Odds", height=500, margin=dict(t=20))
+    st.plotly_chart(fig, use_container_width=True)
+
+
+
+def render_dutching_calculator():
+    """Multi-outcome dutching/arbitrage calculator: one row per leg, stakes solved for equal profit."""
+    st.caption(
+        "One row per leg. Legs with the same selection are on the same outcome "
+        "(e.g. back and lay one selection); every outcome of the market must have a leg."
+    )
+    legs = st.data_editor(
+        pd.DataFrame({
+            "Selection": ["Home", "Draw", "Away"],
+            "Venue": ["", "", ""],
+            "Side": ["back", "back", "back"],
+            "Odds": [2.2, 3.8, 4.5],
+            "Commission (%)": [0.0, 0.0, 0.0],
+            "Max Stake": [None, None, None],
+        }),
+        num_rows="dynamic",
+        column_config={
+            "Side": st.column_config.SelectboxColumn("Side", options=["back", "lay"], required=True),
+            "Odds": st.column_config.NumberColumn("Odds", min_value=1.01, format="%.2f", required=True),
+            "Max Stake": st.column_config.NumberColumn("Max Stake", min_value=0.0, help="Leave blank for no limit"),
+        },
+        hide_index=True,
+        use_container_width=True,
+        key="dutching_legs"
+    )
+    col1, col2 = st.columns(2)
+    with col1:
+        outlay = st.number_input("Total outlay (£, back stakes + lay liabilities)", min_value=1.0, value=100.0, step=10.0)
+    with col2:
+        round_to = st.selectbox("Round stakes to", [0.01, 0.1, 0.5, 1.0], format_func=lambda v: f"£{v:g}")
+
+    legs = legs.dropna(subset=["Odds", "Side"])
+    if len(legs) < 2:
+        st.info("Enter at least two legs.")
+        return
+
+    solved = solve_dutch_frame(
+        pd.DataFrame({
+            "market": 0,
+            "selection": legs["Selection"].fillna("").astype(str).to_numpy(),
+            "side": legs["Side"].to_numpy(),
+            "odds": legs["Odds"].to_numpy(dtype=float),
+            "commission": legs["Commission (%)"].fillna(0).to_numpy(dtype=float) / 100.0,
+            "max_stake": legs["Max Stake"].fillna(np.inf).to_numpy(dtype=float),
+        }),
+        outlay=outlay,
+        round_to=round_to
+    )
+    if solved["stake"].isna().any():
+        st.error("No stakes give every outcome the same profit for these legs.", icon="🚨")
+        return
+
+    worst = solved["worst_profit"].iloc[0]
+    message = f"Guaranteed profit: £{worst:.2f} ({solved['roi'].iloc[0] * 100:.2f}% of outlay)"
+    if worst > 0:
+        st.success(message)
+    else:
+        st.error(message)
+    st.dataframe(
+        pd.DataFrame({
+            "Selection": legs["Selection"].to_numpy(),
+            "Venue": legs["Venue"].to_numpy(),
+            "Side": legs["Side"].to_numpy(),
+            "Odds": legs["Odds"].to_numpy(),
+            "Stake": solved["stake"].round(2).to_numpy(),
+            "Liability": solved["liability"].round(2).to_numpy(),
+            "Profit if this leg's selection wins": solved["profit"].round(2).to_numpy(),
+        }),
+        hide_index=True,
+        use_container_width=True
+    )
+
+
+
+def history_frame(bets_data) -> pd.DataFrame:
+    """
+    Build the display DataFrame for the history table from service rows or a
+    snapshot page (HISTORY_COLUMNS order).
+    """
+    df = bets_data if isinstance(bets_data, pd.DataFrame) else pd.DataFrame(bets_data, columns=HISTORY_COLUMNS)
+    df = df.rename(columns={
+        "bet_date": "Date",
+        "bookmaker": "Bookmaker",
+        "event": "Event",
+        "bet_type": "Bet Type",
+        "back_stake": "Back Stake",
+        "back_odds": "Back Odds",
+        "exchange": "Exchange",
+        "lay_odds": "Lay Odds",
+        "lay_stake": "Lay Stake",
+        "lay_liability": "Liability",
+        "bookmaker_profit_loss": "Bookmaker P/L",
+        "exchange_profit_loss": "Exchange P/L",
+        "net_profit_loss": "Net Profit",
+        "result": "Result",
+        "notes": "Notes",
+        "lay_commission": "Lay Commission",
+        "free_sr": "Free SR"
+    })
+    for col in ["Bookmaker P/L", "Exchange P/L", "Net Profit"]:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    return df
+
+
+
+def render_bet_totals(totals: dict | None):
+    """Show the server-side totals for every bet matching the current filters."""
+    if totals is None:
+        st.warning("Could not load bet totals.")
+        return
+    total_profit = totals["net_profit"]
+    profit_color = "green" if total_profit >= 0 else "red"
+    st.markdown(
+        f"### 💰 Total Profit: <span style='color:{profit_color}'>£{total_profit:.2f}</span>",
+        unsafe_allow_html=True
+    )
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Bets", totals["total_bets"])
+    col2.metric("Settled", totals["back"] + totals["lay"] + totals["void"])
+    col3.metric("Unsettled", totals["unsettled"])
+    col4.metric("Open Liability", f"£{totals['open_liability']:.2f}")
+
+
+
+def render_history_export(user_id):
+    """Download the full history from the local Parquet snapshot (synced first, so only changes are fetched)."""
+    with st.expander("📦 Export full history"):
+        fmt = st.radio("Format", ["parquet", "csv"], horizontal=True, key="history_export_format")
+        if st.button("Prepare download", key="history_export_prepare"):
+            # Imported here so pyarrow is only loaded when an export is requested
+            from data.snapshot import export_history
+            try:
+                st.session_state["history_export"] = (fmt, export_history(user_id, fmt))
+            except Exception as e:
+                st.error(f"Could not export history: {e}")
+
+        prepared = st.session_state.get("history_export")
+        if prepared and prepared[0] == fmt:
+            st.download_button(
+                f"⬇️ Download bet_history.{fmt}",
+                data=prepared[1],
+                file_name=f"bet_history.{fmt}",
+                mime="application/octet-stream" if fmt == "parquet" else "text/csv",
+                key="history_export_download"
+            )
+
+
+
+def history_filters() -> tuple[dict, int]:
+    """Render the history filter controls; returns (get_bets_page filters, page size)."""
+    with st.expander("🔎 Filter history"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            date_from = st.date_input("From", value=None, key="history_date_from")
+            date_to = st.date_input("To", value=None, key="history_date_to")
+        with col2:
+            bookmaker = st.text_input("Bookmaker", placeholder="e.g., Bet365", key="history_bookmaker").strip()
+            result = st.selectbox("Result", ["All", "unsettled", "back", "lay", "void"], key="history_result")
+        with col3:
+            bet_type = st.selectbox(
+                "Bet Type",
+                ["All", "Qualifying Bet", "Free Bet", "Money Back if Bet Loses"],
+                key="history_bet_type"
+            )
+            page_size = st.selectbox("Rows per page", [25, 50, 100, 250], index=1, key="history_page_size")
+
+    filters = {
+        "date_from": date_from,
+        # The date picker is inclusive, the query's upper bound is not
+        "date_to": date_to + datetime.timedelta(days=1) if date_to else None,
+        "bookmaker": bookmaker or None,
+        "result": None if result == "All" else result,
+        "bet_type": None if bet_type == "All" else bet_type,
+    }
+    return filters, page_size
 
 
 
@@ -71,15 +342,17 @@ def run():
     if is_bet_free:
         free_sr = st.checkbox(label='Stake returned on free bet')
     
+    prefill = live_price_prefill()
+
     details_container = st.container(border=True)
     back_container = st.container(border=True)
     lay_container = st.container(border=True)
     
     with details_container:
         st.subheader("Bet Details")
-        bookmaker = st.text_input("Bookmaker", placeholder="e.g., Bet365")
-        exchange = st.text_input("Exchange", placeholder="e.g., Smarkets")
-        event = st.text_input("Event", placeholder="e.g., Man Utd vs Chelsea")
+        bookmaker = st.text_input("Bookmaker", value=prefill.get("bookmaker", ""), placeholder="e.g., Bet365")
+        exchange = st.text_input("Exchange", value=prefill.get("exchange", ""), placeholder="e.g., Smarkets")
+        event = st.text_input("Event", value=prefill.get("event", ""), placeholder="e.g., Man Utd vs Chelsea")
 
     with back_container:
         st.subheader("Back Bet")
@@ -91,15 +364,21 @@ def run():
                 back_stake = safe_float_from_text('Back Stake', placeholder='e.g. 10.0')
             back_percent = safe_float_from_text('Bookmaker Commission (%)', value='0', placeholder='e.g. 5')
         with col_right:
-            back_odds = safe_float_from_text('Back Odds', placeholder='e.g. 3.5')
+            back_odds = safe_float_from_text('Back Odds', value=prefill.get('back_odds', ''), placeholder='e.g. 3.5')
     
     with lay_container:
         st.subheader("Lay Bet")
         col_left, col_right = st.columns(2)
         with col_left:
-            lay_odds = safe_float_from_text('Lay Odds', placeholder='e.g. 3.6')
+            lay_odds = safe_float_from_text('Lay Odds', value=prefill.get('lay_odds', ''), placeholder='e.g. 3.6')
+            if lay_odds is not None and lay_odds > 1 and tick_index(lay_odds) < 0:
+                st.caption(
+                    f"{lay_odds:g} isn't an exchange price; the nearest ticks are "
+                    f"{snap(lay_odds, 'down'):g} and {snap(lay_odds, 'up'):g}."
+                )
         with col_right:
-            lay_percent = safe_float_from_text('Exchange Commission (%)', value='2', placeholder='e.g. 2')
+            lay_percent = safe_float_from_text('Exchange Commission (%)', value=prefill.get('lay_percent', '2'), placeholder='e.g. 2')
+        exchange_balance = safe_float_from_text('Exchange Balance (£)', placeholder='Optional: total funds at the exchange, including open liability')
     
     if None not in (back_stake, back_odds, lay_odds, back_percent, lay_percent):
         back_cms = back_percent / 100.0
@@ -133,6 +412,11 @@ def run():
                 else:
                     st.error(f"{label}: £{value:.2f}")
 
+            render_exchange_balance_check(exchange, liability, exchange_balance)
+
+            with st.expander("📈 Odds Sensitivity"), span("sensitivity heatmap"):
+                render_sensitivity_heatmap(matched_bet, back_odds, lay_odds, lay_cms)
+
             if st.button("Save Bet"):
                 bet_object = {
                     "bookmaker": bookmaker,
@@ -146,9 +430,12 @@ def run():
                     "lay_liability": liability,
                     "bookmaker_profit_loss": profits['back_wins']['bookie_pl'],
                     "exchange_profit_loss": profits['back_wins']['exchange_pl'],
-                    "notes": ""
+                    "lay_commission": lay_cms,
+                    "free_sr": free_sr,
+                    "notes": "",
+                    "user_id": st.session_state.get("user_id")
                 }
-                if insert_bet(bet_object):
+                if save_bet(bet_object):
                     st.success("Bet saved successfully!")
                     st.rerun()
                 else:
@@ -157,80 +444,76 @@ def run():
         except ValueError as e:
             st.error(str(e), icon="🚨")
 
+    with st.expander("🎯 Dutching / Arbitrage Calculator"), span("dutching calculator"):
+        render_dutching_calculator()
+
     # Game History
     st.subheader("📋 Your Previous Bets")
+    write_behind = get_write_behind()
+    unsynced = write_behind.pending(st.session_state.get("user_id")) if write_behind else 0
+    if unsynced:
+        st.caption(f"⏳ {unsynced} saved bet(s) still being written to the database; they'll appear here shortly.")
+    filters, page_size = history_filters()
+    if st.session_state.get("bet_history_filters") != (filters, page_size):
+        st.session_state["bet_history_filters"] = (filters, page_size)
+        st.session_state["bet_history_cursors"] = [None]
+    cursors = st.session_state["bet_history_cursors"]
+
     try:
-        bets_data = get_all_bets()
-        if bets_data:
-            columns = [
-                "id", "bet_date", "bookmaker", "event", "bet_type", "back_stake",
-                "back_odds", "exchange", "lay_odds", "lay_stake", "lay_liability",
-                "bookmaker_profit_loss", "exchange_profit_loss", "net_profit_loss",
-                "result", "notes"
-            ]
-            df = pd.DataFrame(bets_data, columns=columns)
-            df = df.rename(columns={
-                "bet_date": "Date",
-                "bookmaker": "Bookmaker",
-                "event": "Event",
-                "bet_type": "Bet Type",
-                "back_stake": "Back Stake",
-                "back_odds": "Back Odds",
-                "exchange": "Exchange",
-                "lay_odds": "Lay Odds",
-                "lay_stake": "Lay Stake",
-                "lay_liability": "Liability",
-                "bookmaker_profit_loss": "Bookmaker P/L",
-                "exchange_profit_loss": "Exchange P/L",
-                "net_profit_loss": "Net Profit",
-                "result": "Result",
-                "notes": "Notes"
-            })
-            for col in ["Bookmaker P/L", "Exchange P/L", "Net Profit"]:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-            original_df = df.copy()
-            st.info("You can edit the 'Result' column directly in the table below.")
-            edited_df = st.data_editor(
-                df,
-                column_config={
-                    "Result": st.column_config.SelectboxColumn(
-                        "Result",
-                        help="Set the result of the bet",
-                        options=["unsettled", "back", "lay", "void"],
-                        required=True,
-                    ),
-                    "id": None
-                },
-                disabled=[
-                    "id", "Bookmaker", "Event", "Bet Type", "Back Stake", "Back Odds",
-                    "Exchange", "Lay Odds", "Lay Stake", "Liability",
-                    "Bookmaker P/L", "Exchange P/L", "Net Profit",
-                    "Date", "Notes"
-                ],
-                hide_index=True,
-                use_container_width=True,
+        user_id = st.session_state.get("user_id")
+        with span("fetch history"):
+            # Imported here so pyarrow is only loaded once the history is shown
+            from data.snapshot import load_history_page
+            bets_data, next_cursor, totals = load_history_page(
+                user_id, after=cursors[-1], page_size=page_size, **filters
             )
-            edited_df["Calculated Profit"] = edited_df.apply(compute_row_profit, axis=1)
-            total_profit = edited_df["Calculated Profit"].sum()
-            profit_color = "green" if total_profit >= 0 else "red"
-            st.markdown(
-                f"### 💰 Total Profit: <span style='color:{profit_color}'>£{total_profit:.2f}</span>",
-                unsafe_allow_html=True
-            )
-            if not original_df.equals(edited_df):
-                changes = original_df["Result"] != edited_df["Result"]
-                if changes.any():
-                    changed_rows = edited_df[changes]
-                    for index, row in changed_rows.iterrows():
-                        bet_id = int(original_df.iloc[index]["id"])
-                        new_result = row["Result"]
-                        success = update_bet_result(bet_id, new_result)
-                        if success:
-                            st.success(f"✅ Updated result for Bet ID {bet_id} to '{new_result}'")
-                            st.rerun()
-                        else:
-                            st.error(f"❌ Failed to update result for Bet ID {bet_id}")
-        else:
+        if len(bets_data):
+            with span("build frame"):
+                df = history_frame(bets_data)
+            editor_key = f"bet_history_editor_{st.session_state.get('bet_history_editor_version', 0)}"
+            st.info("You can edit the 'Result' column directly in the table below, then click 'Save Results'.")
+            for level, message in st.session_state.pop("bet_history_messages", []):
+                getattr(st, level)(message)
+            with st.form("bet_history_form", border=False), span("data editor"):
+                st.data_editor(
+                    df,
+                    key=editor_key,
+                    column_config={
+                        "Result": st.column_config.SelectboxColumn(
+                            "Result",
+                            help="Set the result of the bet",
+                            options=["unsettled", "back", "lay", "void"],
+                            required=True,
+                        ),
+                        "id": None
+                    },
+                    disabled=[
+                        "id", "Bookmaker", "Event", "Bet Type", "Back Stake", "Back Odds",
+                        "Exchange", "Lay Odds", "Lay Stake", "Liability",
+                        "Bookmaker P/L", "Exchange P/L", "Net Profit",
+                        "Date", "Notes", "Lay Commission", "Free SR"
+                    ],
+                    hide_index=True,
+                    use_container_width=True,
+                )
+                st.form_submit_button(
+                    "💾 Save Results",
+                    on_click=save_result_changes,
+                    args=(editor_key, df["id"].tolist())
+                )
+            render_bet_totals(totals)
+        elif len(cursors) == 1:
             st.info("No bets found in your history.")
+
+        col_prev, col_page, col_next = st.columns([1, 2, 1])
+        with col_prev:
+            st.button("⬅️ Newer", disabled=len(cursors) == 1, on_click=cursors.pop)
+        with col_page:
+            st.caption(f"Page {len(cursors)}")
+        with col_next:
+            st.button("Older ➡️", disabled=next_cursor is None, on_click=cursors.append, args=(next_cursor,))
     except Exception as e:
-        st.error(f"Could not load bet history: {e}")
\ No newline at end of file
+        st.error(f"Could not load bet history: {e}")
+
+    with span("history export"):
+        render_history_export(st.session_state.get("user_id"))
\ No newline at end of file
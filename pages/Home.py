@@ -1,16 +1,128 @@
+from functools import partial
 import streamlit as st
-from data.service import get_profit_over_time
+import pandas as pd
+from data.async_service import fetch_parallel
+from data.profiling import span
+from data.risk import get_risk_summary
+from data.service import BREAKDOWN_COLUMNS, CURVE_COLUMNS, get_bet_totals, get_profit_curve
+
+BREAKDOWN_TABS = {
+    "bookmaker": "Bookmaker",
+    "exchange": "Exchange",
+    "bet_type": "Bet Type",
+    "month": "Month",
+    "result": "Result",
+}
+
+
+def load_analytics(user_id):
+    """Breakdowns from the local history snapshot (see data/snapshot.py), falling back to the database."""
+    # Imported here so pyarrow is only loaded once the page runs
+    from data.snapshot import load_analytics
+    return load_analytics(user_id)
+
+
+def render_open_risk(user_id):
+    with st.spinner("Simulating open bets..."), span("risk simulation"):
+        risk = get_risk_summary(user_id)
+    if not risk or not risk["open_bets"]:
+        return
+
+    st.subheader(f"🎲 Open Bet Risk ({risk['open_bets']} bets, {risk['sims']:,} simulations)")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Expected P&L", f"£{risk['expected']:.2f}")
+    col2.metric("95% VaR", f"£{risk['var_95']:.2f}", help="Loss not exceeded in 95% of simulated outcomes")
+    col3.metric("95% CVaR", f"£{risk['cvar_95']:.2f}", help="Average loss in the worst 5% of outcomes")
+    col4.metric("Chance of Loss", f"{risk['prob_loss']:.1%}")
+    st.caption(
+        f"Worst case £{risk['worst_case']:.2f} · best case £{risk['best_case']:.2f} · "
+        f"99% VaR £{risk['var_99']:.2f}"
+    )
+
+    edges = risk["histogram"]["edges"]
+    histogram = pd.DataFrame({
+        "P&L": [round((lo + hi) / 2, 2) for lo, hi in zip(edges, edges[1:])],
+        "Simulations": risk["histogram"]["counts"],
+    })
+    st.bar_chart(histogram.set_index("P&L"))
+
+
+def render_profit_curve(profit: dict):
+    """Cumulative profit, drawdown and rolling ROI from the daily profit curve."""
+    curve = pd.DataFrame(profit["curve"], columns=CURVE_COLUMNS)
+    curve["day"] = pd.to_datetime(curve["day"])
+    curve = curve.set_index("day")
+
+    st.line_chart(curve[["cumulative_profit"]].rename(columns={"cumulative_profit": "Cumulative Profit"}))
+    col1, col2 = st.columns(2)
+    with col1:
+        st.caption("Drawdown from peak (£)")
+        st.area_chart(curve[["drawdown"]].rename(columns={"drawdown": "Drawdown"}), color="#d62728")
+    with col2:
+        st.caption("30-day rolling ROI (%)")
+        st.line_chart((curve[["rolling_roi"]].astype(float) * 100).rename(columns={"rolling_roi": "Rolling ROI"}))
+
+
+def render_breakdowns(analytics: dict):
+    """One tab per breakdown: net profit by key, with the full figures underneath."""
+    tabs = st.tabs([f"By {label}" for label in BREAKDOWN_TABS.values()])
+    for tab, (dimension, label) in zip(tabs, BREAKDOWN_TABS.items()):
+        with tab:
+            rows = analytics["breakdowns"][dimension]
+            if not rows:
+                st.info("No bets yet.")
+                continue
+            df = pd.DataFrame(rows, columns=BREAKDOWN_COLUMNS)
+            df["key"] = df["key"].fillna("(none)").replace("", "(none)")
+            if dimension == "month":
+                df["key"] = pd.to_datetime(df["key"]).dt.strftime("%Y-%m")
+            df["roi"] = (df["roi"].astype(float) * 100).round(1)
+            df = df.rename(columns={
+                "key": label,
+                "bets": "Bets",
+                "settled_bets": "Settled",
+                "staked": "Staked (£)",
+                "net_profit": "Net Profit (£)",
+                "roi": "ROI (%)",
+            })
+            st.bar_chart(df.set_index(label)["Net Profit (£)"])
+            st.dataframe(df, hide_index=True, use_container_width=True)
 
 
 def run():
     st.title("📈 Net Profit Over Time")
 
-    stats = get_profit_over_time()
+    user_id = st.session_state.get("user_id")
+    with span("fetch stats"):
+        data = fetch_parallel(
+            profit=partial(get_profit_curve, user_id),
+            analytics=partial(load_analytics, user_id),
+            totals=partial(get_bet_totals, user_id)
+        )
+    profit, analytics, totals = data["profit"], data["analytics"], data["totals"]
 
-    if stats:
-        df = pd.DataFrame(stats, columns=["Date", "Net Profit"])
-        df["Date"] = pd.to_datetime(df["Date"])
+    if totals:
+        col1, col2, col3, col4, col5 = st.columns(5)
+        col1.metric("Net Profit", f"£{totals['net_profit']:.2f}")
+        col2.metric("Bets", totals["total_bets"])
+        col3.metric("Open Liability", f"£{totals['open_liability']:.2f}")
+        if analytics:
+            roi = analytics["totals"]["roi"]
+            col4.metric("ROI", "–" if roi is None else f"{roi:.1%}", help="Net profit over the back stake of settled bets")
+        if profit:
+            col5.metric(
+                "Max Drawdown",
+                f"£{profit['max_drawdown']:.2f}",
+                help="Largest fall in cumulative profit from a previous high"
+                + (f" (reached {profit['drawdown_day']:%d %b %Y})" if profit["drawdown_day"] else "")
+            )
 
-        st.line_chart(df.set_index("Date"))
+    if profit and profit["curve"]:
+        with span("analytics charts"):
+            render_profit_curve(profit)
+            if analytics:
+                render_breakdowns(analytics)
     else:
-        st.info("No profit data available yet.")
\ No newline at end of file
+        st.info("No profit data available yet.")
+
+    render_open_risk(user_id)
\ No newline at end of file
@@ -0,0 +1,67 @@
+import io
+import streamlit as st
+import pandas as pd
+from data.profiling import span
+from data.scanner import read_prices, scan
+
+
+def run():
+    st.set_page_config(layout="wide")
+    st.title("🔎 Opportunity Scanner")
+    st.caption(
+        "Upload a back/lay price feed (CSV or JSONL with event, selection, venue, side, odds "
+        "and optional commission). For multi-GB feeds use `python run_arbify_cli.py scan`."
+    )
+
+    uploaded = st.file_uploader("Price feed", type=["csv", "jsonl", "ndjson"])
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        mode_labels = {
+            "Qualifying Bet": "qualifying",
+            "Free Bet (Stake Not Returned)": "free_snr",
+            "Free Bet (Stake Returned)": "free_sr",
+        }
+        mode = mode_labels[st.selectbox("Bet Type", list(mode_labels))]
+    with col2:
+        stake = st.number_input("Stake / Free Bet Value (£)", min_value=0.01, value=10.0, step=1.0)
+    with col3:
+        lay_cms = st.number_input("Default Exchange Commission (%)", min_value=0.0, max_value=100.0, value=2.0, step=0.5)
+    with col4:
+        top = st.number_input("Show top", min_value=1, max_value=1000, value=20, step=5)
+
+    if uploaded is None:
+        st.info("Upload a price feed to scan.")
+        return
+
+    fmt = "csv" if uploaded.name.lower().endswith(".csv") else "jsonl"
+    with st.spinner("Scanning feed..."), span("scan feed"):
+        # Stream the upload line by line rather than decoding it all at once
+        stream = io.TextIOWrapper(uploaded, encoding="utf-8", newline="")
+        results = scan(
+            read_prices(stream, fmt),
+            mode=mode,
+            stake=stake,
+            top=int(top),
+            lay_cms=lay_cms / 100.0
+        )
+        stream.detach()
+
+    if not results:
+        st.warning("No back/lay pairs found in this feed.")
+        return
+
+    df = pd.DataFrame(results).rename(columns={
+        "event": "Event",
+        "selection": "Selection",
+        "bookmaker": "Bookmaker",
+        "exchange": "Exchange",
+        "back_odds": "Back Odds",
+        "lay_odds": "Lay Odds",
+        "lay_cms": "Lay Commission",
+        "lay_stake": "Lay Stake",
+        "liability": "Liability",
+        "profit": "Profit",
+        "rating": "Rating (%)",
+    })
+    st.dataframe(df, hide_index=True, use_container_width=True)
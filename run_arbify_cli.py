@@ -0,0 +1,210 @@
+"""
+Command-line tools for Arbify maintenance jobs.
+
+    python run_arbify_cli.py import-bets history.csv
+    python run_arbify_cli.py export-bets --user-id 1 > history.csv
+    python run_arbify_cli.py export-bets --user-id 1 --format parquet -o history.parquet
+    python run_arbify_cli.py init-db
+    python run_arbify_cli.py ensure-partitions --months-ahead 3
+    python run_arbify_cli.py rebuild-rollup
+    python run_arbify_cli.py scan prices.jsonl --mode free_snr --stake 25 --top 10
+    python run_arbify_cli.py build-ladder-table -o ladder_free_snr.npz --mode free_snr --stake 25 --cms 0,0.02
+    python run_arbify_cli.py scan prices.jsonl --mode free_snr --stake 25 --ladder-table ladder_free_snr.npz
+    python run_arbify_cli.py feed-stub --port 8765
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
+
+def import_bets(args):
+    from data.service import import_bets_file
+
+    report = import_bets_file(args.path, chunk_size=args.chunk_size)
+    for error in report["errors"]:
+        row = "-" if error["row"] is None else error["row"]
+        print(f"row {row}: {error['error']}", file=sys.stderr)
+    print(f"Inserted {report['inserted']} bets, rejected {len(report['errors'])}.")
+    return 0 if report["inserted"] or not report["errors"] else 1
+
+
+def export_bets(args):
+    if args.format == "parquet":
+        from data.snapshot import export_history
+
+        data = export_history(args.user_id, "parquet")
+        if args.output:
+            with open(args.output, "wb") as f:
+                f.write(data)
+        else:
+            sys.stdout.buffer.write(data)
+        return 0
+
+    from data.service import HISTORY_COLUMNS, iter_bets
+
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    try:
+        writer = csv.writer(out)
+        writer.writerow(HISTORY_COLUMNS)
+        writer.writerows(iter_bets(args.user_id))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+def init_db(args):
+    from alembic import command
+    from alembic.config import Config
+
+    command.upgrade(Config(ALEMBIC_INI), args.revision)
+    return 0
+
+
+def ensure_partitions(args):
+    from data.service import ensure_bet_partitions
+
+    created = ensure_bet_partitions(args.months_ahead)
+    if created is None:
+        return 1
+    print(f"Created {created} matched_bets partitions.")
+    return 0
+
+
+def rebuild_rollup(args):
+    from data.service import rebuild_open_exposure, rebuild_profit_rollup
+
+    rows = rebuild_profit_rollup()
+    if rows is None:
+        return 1
+    print(f"Rebuilt daily_profit ({rows} rows).")
+    rows = rebuild_open_exposure()
+    if rows is None:
+        return 1
+    print(f"Rebuilt open_exposure ({rows} rows).")
+    return 0
+
+
+def scan_feed(args):
+    from data.ladder import LadderTable
+    from data.scanner import read_prices, scan
+
+    table = LadderTable.load(args.ladder_table) if args.ladder_table else None
+    if table is not None and table.mode != args.mode:
+        print(f"{args.ladder_table} is a {table.mode} table; scan with --mode {table.mode} or build one for {args.mode}.",
+              file=sys.stderr)
+        return 1
+    results = scan(
+        read_prices(args.feed, args.format),
+        mode=args.mode,
+        stake=args.stake,
+        top=args.top,
+        lay_cms=args.lay_cms,
+        chunk_size=args.chunk_size,
+        max_selections=args.max_selections,
+        table=table
+    )
+    if args.jsonl:
+        for record in results:
+            print(json.dumps(record))
+        return 0
+
+    print(f"{'Profit':>8} {'Rating':>7} {'Back':>6} {'Lay':>6} {'Lay Stake':>9}  Bookmaker -> Exchange  Event / Selection")
+    for r in results:
+        print(
+            f"{r['profit']:>8.2f} {r['rating']:>6.1f}% {r['back_odds']:>6.2f} {r['lay_odds']:>6.2f} {r['lay_stake']:>9.2f}"
+            f"  {r['bookmaker']} -> {r['exchange']}  {r['event']} / {r['selection']}"
+        )
+    return 0
+
+
+def build_ladder_table(args):
+    from data.ladder import LadderTable
+
+    commissions = [float(c) for c in args.cms.split(",") if c.strip()]
+    table = LadderTable.build(args.mode, args.stake, commissions, dtype=args.dtype)
+    table.save(args.output)
+    print(
+        f"Wrote {args.mode} ladder table (stake {table.stake:g}) to {args.output}: {len(table.back_odds)} back x {len(table.lay_odds)} lay odds "
+        f"x {len(table.commissions)} commissions ({table.nbytes / 1e6:.1f} MB)."
+    )
+    return 0
+
+
+def feed_stub(args):
+    import asyncio
+    from data.feed_stub import serve
+
+    print(f"Serving stub feeds on http://localhost:{args.port}/prices/<venue> and ws://localhost:{args.port}/ws/<venue>")
+    try:
+        asyncio.run(serve(args.port, args.events, args.tick))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="run_arbify_cli.py", description="Arbify command-line tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("import-bets", help="Bulk-load bets from a CSV or JSONL export")
+    p.add_argument("path", help="Path to a .csv or .jsonl file of bets")
+    p.add_argument("--chunk-size", type=int, default=10_000, help="Rows per COPY chunk (default: 10000)")
+    p.set_defaults(func=import_bets)
+
+    p = commands.add_parser("export-bets", help="Stream bet history to CSV")
+    p.add_argument("--user-id", type=int, help="Only export this user's bets")
+    p.add_argument("-o", "--output", help="Output file (default: stdout)")
+    p.add_argument("--format", choices=["csv", "parquet"], default="csv",
+                   help="csv streams straight from the database; parquet syncs and writes the local snapshot")
+    p.set_defaults(func=export_bets)
+
+    p = commands.add_parser("init-db", help="Create or upgrade the bethistory tables (alembic upgrade)")
+    p.add_argument("--revision", default="head", help="Migration to upgrade to (default: head)")
+    p.set_defaults(func=init_db)
+
+    p = commands.add_parser("ensure-partitions", help="Create upcoming monthly matched_bets partitions; run monthly")
+    p.add_argument("--months-ahead", type=int, default=3, help="Months past the current one to cover (default: 3)")
+    p.set_defaults(func=ensure_partitions)
+
+    p = commands.add_parser("rebuild-rollup", help="Recompute the daily profit rollup and open exposure index from matched_bets")
+    p.set_defaults(func=rebuild_rollup)
+
+    p = commands.add_parser("scan", help="Rank matched-bet opportunities in a back/lay price feed")
+    p.add_argument("feed", help="CSV or JSONL price file, or - for stdin")
+    p.add_argument("--format", choices=["csv", "jsonl"], help="Feed format (default: from the file extension)")
+    p.add_argument("--mode", choices=["qualifying", "free_snr", "free_sr"], default="qualifying")
+    p.add_argument("--stake", type=float, default=10.0, help="Back stake, or free bet value (default: 10)")
+    p.add_argument("--top", type=int, default=20, help="Number of opportunities to keep (default: 20)")
+    p.add_argument("--lay-cms", type=float, default=0.02, help="Lay commission when a price has none (default: 0.02)")
+    p.add_argument("--chunk-size", type=int, default=50_000, help="Candidate pairs scored per batch")
+    p.add_argument("--max-selections", type=int, default=100_000, help="Selections tracked at once")
+    p.add_argument("--jsonl", action="store_true", help="Print results as JSON lines")
+    p.add_argument("--ladder-table", help="Score on-ladder prices from a table written by build-ladder-table")
+    p.set_defaults(func=scan_feed)
+
+    p = commands.add_parser("build-ladder-table", help="Precompute matched-bet figures over the exchange odds ladder")
+    p.add_argument("-o", "--output", required=True, help="Output .npz file")
+    p.add_argument("--mode", choices=["qualifying", "free_snr", "free_sr"], default="qualifying")
+    p.add_argument("--stake", type=float, default=10.0,
+                   help="Stake the table is built for; scans at this stake match calculate_batch exactly (default: 10)")
+    p.add_argument("--cms", default="0,0.02,0.05", help="Comma-separated lay commissions (default: 0,0.02,0.05)")
+    p.add_argument("--dtype", choices=["float64", "float32"], default="float64", help="Table precision (default: float64)")
+    p.set_defaults(func=build_ladder_table)
+
+    p = commands.add_parser("feed-stub", help="Serve fake bookmaker/exchange price feeds for local testing")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--events", type=int, default=20, help="Number of fake events (default: 20)")
+    p.add_argument("--tick", type=float, default=1.0, help="Seconds between WebSocket pushes (default: 1)")
+    p.set_defaults(func=feed_stub)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
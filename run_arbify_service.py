@@ -1,5 +1,7 @@
+import importlib
+import json
+from collections import deque
 import streamlit as st
-from pages import Home, Game_History, Login, Register
 from streamlit_cookies_manager import EncryptedCookieManager
 
 cookies = EncryptedCookieManager(password=st.secrets["cookie_password"])
@@ -13,19 +15,107 @@ def is_authenticated():
 
 
 
+# Page modules (and pandas, the engine and the DB layer behind them) are
+# imported on first navigation to their route rather than on every script run.
+# Check the cost with: python -m benchmarks.import_budget
+def load_page(name: str):
+    return importlib.import_module(f"pages.{name}")
+
+
+
+# Profiling: ?profile=1 (stage timings) or ?profile=cprofile (plus a cProfile
+# trace) turns it on for the session, ?profile=0 turns it off; the `profile`
+# secret sets the default. The last PROFILE_HISTORY runs are kept per session.
+PROFILE_HISTORY = 20
+PROFILE_MODES = {"1": "spans", "true": "spans", "yes": "spans", "spans": "spans", "cprofile": "cprofile"}
+
+
+def profiling_mode() -> str | None:
+    """'spans', 'cprofile' or None (off) for this session."""
+    requested = st.query_params.get("profile")
+    if requested is not None:
+        st.session_state["profile_mode"] = PROFILE_MODES.get(requested.strip().lower())
+    if "profile_mode" not in st.session_state:
+        st.session_state["profile_mode"] = PROFILE_MODES.get(str(st.secrets.get("profile", "")).strip().lower())
+    return st.session_state["profile_mode"]
+
+
+def render_profile_panel(history: deque):
+    """Collapsible breakdown of the latest run, plus the session's recent runs for download."""
+    import pandas as pd
+
+    latest = history[-1]
+    with st.expander(f"⏱️ {latest['page']} ran in {latest['total'] * 1000:.0f} ms"):
+        if latest["spans"]:
+            spans = pd.DataFrame(latest["spans"])
+            st.dataframe(
+                pd.DataFrame({
+                    "Stage": ["  " * depth + name for depth, name in zip(spans["depth"], spans["name"])],
+                    "Start (ms)": (spans["start"] * 1000).round(1),
+                    "Duration (ms)": (spans["seconds"] * 1000).round(1),
+                    "% of run": (spans["seconds"] / latest["total"] * 100).round(1),
+                    "Thread": spans["thread"],
+                }),
+                hide_index=True,
+                use_container_width=True,
+            )
+            top_level = spans[spans["depth"] == 0]
+            untracked = latest["total"] - top_level.loc[top_level["kind"] == "stage", "seconds"].sum()
+            st.caption(f"{untracked * 1000:.0f} ms of the run is outside any stage.")
+        if latest["cprofile"]:
+            st.code(latest["cprofile"], language=None)
+        runs = list(history)
+        st.download_button(
+            f"⬇️ Download last {len(runs)} runs (JSON)",
+            data=json.dumps(runs, indent=1),
+            file_name="arbify_profile.json",
+            mime="application/json",
+            key="profile_download",
+        )
+
+
+def run_page(name: str):
+    """Load and run a page, profiling the run when profiling is on for this session."""
+    mode = profiling_mode()
+    if mode is None:
+        load_page(name).run()
+        return
+    from data.profiling import profile_run, span
+
+    history = st.session_state.setdefault("profile_history", deque(maxlen=PROFILE_HISTORY))
+    profile = None
+    try:
+        with profile_run(name, cprofile=mode == "cprofile") as profile:
+            with span("import page"):
+                page = load_page(name)
+            page.run()
+    finally:
+        if profile is not None:
+            history.append(profile.to_dict())
+    # Not reached on st.rerun()/st.stop(); the next run shows the history
+    render_profile_panel(history)
+
+
+
 def home_page():
-    Home.run()
+    run_page("Home")
 
 
 
 def game_page():
-    Game_History.run()
+    run_page("Game_History")
+
+
+
+def scanner_page():
+    run_page("Scanner")
 
 
 
 protected_pages = [
     st.Page(home_page, title="Arbify", icon="🏠"),
     st.Page(game_page, title="Game History", icon="🎲"),
+    st.Page(scanner_page, title="Scanner", icon="🔎"),
 ]
 
 # Auth or login/register page
@@ -34,13 +124,30 @@ def show_auth_gate():
     tab1, tab2 = st.tabs(["Login", "Register"])
 
     with tab1:
-        Login.login_page(cookies)
+        load_page("Login").login_page(cookies)
 
     with tab2:
-        Register.main()
+        load_page("Register").main()
+
+
+
+def start_background_services():
+    """Start the process-wide services behind logged-in pages; each starts once per process."""
+    from data.feeds import get_feed_service
+    from data.metrics import start_metrics_server
+
+    # Prometheus /metrics endpoint
+    start_metrics_server()
+    # Live price feeds (ARBIFY_FEEDS_CONFIG); runs on its own event loop thread
+    get_feed_service()
+
 
 # Routing logic
 if is_authenticated():
+    # Not on the login gate: its runs only need streamlit and the cookie manager
+    start_background_services()
+    # Pages scope their queries to the logged-in user
+    st.session_state.setdefault("user_id", cookies.get("user_id"))
     nav = st.navigation(protected_pages)
     nav.run()
 else:
@@ -10,5 +10,13 @@ export DB_USER="arbuser"
 export DB_PASSWORD="temp_secure_44"
 export DB_HOST="143.47.226.107"
 export DB_PORT="5432"
+export DB_POOL_MIN="1"
+export DB_POOL_MAX="10"
+export ARBIFY_METRICS_PORT="9108"
+export ARBIFY_SLOW_QUERY_SECONDS="0.5"
+# export ARBIFY_FEEDS_CONFIG="feeds.json"
+# export ARBIFY_SNAPSHOT_DIR="$HOME/.cache/arbify/snapshots"
+# export ARBIFY_WRITE_BEHIND="1"
+# export ARBIFY_JOURNAL_DIR="$HOME/.cache/arbify/journal"
 
 echo "✅ Environment variables are set for this terminal session."
\ No newline at end of file
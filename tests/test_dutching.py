@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.dutching import solve_dutch, solve_dutch_batch, solve_dutch_frame
+
+
+def random_markets(n: int, legs: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    odds = np.round(rng.uniform(1.2, 12.0, (n, legs)), 2)
+    lay = rng.random((n, legs)) < 0.3
+    cms = np.where(lay, rng.choice([0.0, 0.02, 0.05], (n, legs)), 0.0)
+    # Markets with 2 .. legs outcomes, padding at the end
+    active = np.arange(legs) < rng.integers(2, legs + 1, n)[:, None]
+    return {"odds": odds, "lay": lay, "cms": cms, "active": active}
+
+
+def test_solved_stakes_return_the_same_profit_on_every_outcome():
+    markets = random_markets(2000, 6)
+    out = solve_dutch_batch(**markets, outlay=100.0)
+    feasible = out["feasible"]
+    assert feasible.sum() > 100
+
+    profits = out["profits"][feasible]
+    active = markets["active"][feasible]
+    spread = np.nanmax(profits, axis=1) - np.nanmin(profits, axis=1)
+    np.testing.assert_allclose(spread, 0.0, atol=1e-9)
+    np.testing.assert_allclose(out["outlay"][feasible], 100.0)
+    assert np.all(np.isnan(profits[~active]))
+    assert np.all(out["stakes"][feasible][active] >= 0)
+
+
+def test_legs_sharing_an_outcome_return_the_same_profit_either_way():
+    # Classic matched bet: back and lay of the same selection
+    result = solve_dutch([3.0, 3.1], lay=[False, True], cms=[0.0, 0.02], outcome=[0, 0], round_to=None)
+    assert result.feasible
+    assert result.profits[0] == pytest.approx(result.profits[1])
+    assert result.stakes[1] == pytest.approx(result.stakes[0] * 3.0 / (3.1 - 0.02))
+
+
+@pytest.mark.parametrize("odds", [[2.0, 2.0], [3.0, 3.0, 3.0], [4.0] * 4, [5.0] * 5])
+def test_a_book_of_exactly_100_percent_is_infeasible(odds):
+    result = solve_dutch(odds)
+    assert not result.feasible
+    assert np.all(np.isnan(result.stakes))
+
+
+def test_large_markets_are_not_mistaken_for_singular():
+    # 25 outcomes at 30.0: well conditioned however large or small the determinant gets
+    result = solve_dutch([30.0] * 25, round_to=None)
+    assert result.feasible and result.is_arb
+    np.testing.assert_allclose(result.profits, result.profits[0])
+
+
+def test_frame_profits_are_equal_within_each_market():
+    legs = pd.DataFrame({
+        "market": ["a", "a", "a", "b", "b"],
+        "selection": ["home", "draw", "away", "x", "x"],
+        "odds": [2.6, 3.6, 3.9, 3.0, 3.1],
+        "side": ["back", "back", "back", "back", "lay"],
+        "commission": [0.0, 0.0, 0.0, 0.0, 0.02],
+    })
+    solved = solve_dutch_frame(legs)
+    for _, market in solved.groupby("market"):
+        np.testing.assert_allclose(market["profit"], market["profit"].iloc[0])
@@ -0,0 +1,75 @@
+import math
+
+import numpy as np
+import pytest
+
+from data.engine import MatchedBetCalculator, calculate_batch
+
+RESULTS = ("back", "lay", "void", "unsettled")
+
+
+def random_bets(n: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    free_bet = rng.random(n) < 0.4
+    stake = rng.choice([0.25, 0.5, 1.0, 5.0, 10.0, 12.5, 25.0, 33.33], n) + np.round(rng.random(n), 2) * (rng.random(n) < 0.5)
+    bets = {
+        "back_stake": np.where(free_bet, 0.0, stake),
+        "back_odds": np.round(rng.uniform(1.01, 15.0, n), 2),
+        "lay_odds": np.round(rng.uniform(1.01, 15.0, n), 2),
+        "lay_cms": rng.choice([0.0, 0.02, 0.05], n),
+        "free_bet": free_bet,
+        "free_sr": free_bet & (rng.random(n) < 0.5),
+        "free_bet_val": np.where(free_bet, stake, 0.0),
+        "result": rng.choice(RESULTS, n),
+    }
+    # Half-penny ties: 0.25 at 1.5 gives a bookie P&L of exactly 0.125
+    bets["back_stake"][:4], bets["back_odds"][:4], bets["free_bet"][:4] = 0.25, 1.5, False
+    bets["free_sr"][:4], bets["free_bet_val"][:4] = False, 0.0
+    # NaN inputs (e.g. a bet saved without lay odds)
+    bets["lay_odds"][4], bets["back_odds"][5], bets["back_stake"][6] = np.nan, np.nan, np.nan
+    return bets
+
+
+def scalar_figures(i: int, bets: dict) -> dict:
+    calculator = MatchedBetCalculator(
+        back_stake=float(bets["back_stake"][i]),
+        back_odds=float(bets["back_odds"][i]),
+        back_cms=0.0,
+        lay_odds=float(bets["lay_odds"][i]),
+        lay_cms=float(bets["lay_cms"][i]),
+        free_sr=bool(bets["free_sr"][i]),
+        free_bet=bool(bets["free_bet"][i]),
+        free_bet_val=float(bets["free_bet_val"][i])
+    )
+    lay_stake = calculator.get_required_lay_stake()
+    breakdown = calculator.get_bookie_exchange_breakdown()
+    settled = {"back": breakdown["back_wins"]["total"], "lay": breakdown["lay_wins"]["total"]}
+    return {
+        "lay_stake": lay_stake,
+        "liability": calculator.get_lay_liability(lay_stake),
+        **{f"{outcome}_{part}": value for outcome, parts in breakdown.items() for part, value in parts.items()},
+        "settled_profit": settled.get(bets["result"][i], 0.0),
+    }
+
+
+def same(a: float, b: float) -> bool:
+    return (math.isnan(a) and math.isnan(b)) or a == b
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_calculate_batch_matches_the_scalar_calculator_row_for_row(seed):
+    bets = random_bets(5000, seed)
+    batch = calculate_batch(**bets)
+    mismatches = []
+    for i in range(len(bets["back_odds"])):
+        expected = scalar_figures(i, bets)
+        for figure, value in expected.items():
+            if not same(float(batch[figure][i]), float(value)):
+                mismatches.append((i, figure, float(batch[figure][i]), value))
+    assert not mismatches, mismatches[:10]
+
+
+def test_calculate_batch_rounds_half_penny_ties_like_round():
+    # 0.25 staked at 1.5 wins 0.125 at the bookie; round() gives 0.12
+    batch = calculate_batch(back_stake=0.25, back_odds=1.5, lay_odds=1.5, lay_cms=0.0)
+    assert batch["back_wins_bookie_pl"] == round(0.25 * 1.5 - 0.25, 2)
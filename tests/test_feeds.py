@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+from data.feeds import FeedAdapter
+
+
+def test_an_adapter_without_stream_fails_when_constructed():
+    class Incomplete(FeedAdapter):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete("incomplete")
+
+
+def test_run_queues_normalised_prices_from_stream():
+    class OneMessage(FeedAdapter):
+        async def stream(self):
+            yield [{"event": "A vs B", "selection": "A", "odds": 2.5}, {"event": "A vs B"}]
+            await asyncio.Event().wait()
+
+    async def first_batch():
+        queue = asyncio.Queue()
+        task = asyncio.create_task(OneMessage("book", venue="Bet365", side="back").run(queue))
+        try:
+            return await asyncio.wait_for(queue.get(), timeout=1)
+        finally:
+            task.cancel()
+
+    prices = asyncio.run(first_batch())
+    assert [(p.venue, p.side, p.odds) for p in prices] == [("Bet365", "back", 2.5)]
@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+from data.engine import MatchedBetCalculator, _round2, calculate_batch
+from data.ladder import (
+    LadderTable,
+    MAX_ODDS,
+    MIN_ODDS,
+    TICKS,
+    TICKS_CENTS,
+    neighbours,
+    snap,
+    tick_index,
+    ticks_between,
+)
+
+# (boundary, tick below, tick above): the increment widens above each band's upper bound
+BOUNDARIES = [
+    (2.0, 1.99, 2.02),
+    (3.0, 2.98, 3.05),
+    (4.0, 3.95, 4.1),
+    (6.0, 5.9, 6.2),
+    (10.0, 9.8, 10.5),
+    (20.0, 19.5, 21.0),
+    (30.0, 29.0, 32.0),
+    (50.0, 48.0, 55.0),
+    (100.0, 95.0, 110.0),
+]
+
+
+def test_the_ladder_has_350_ticks_from_1_01_to_1000():
+    assert len(TICKS) == len(TICKS_CENTS) == 350
+    assert (MIN_ODDS, MAX_ODDS) == (1.01, 1000.0)
+    assert np.all(np.diff(TICKS_CENTS) > 0)
+    np.testing.assert_array_equal(tick_index(TICKS), np.arange(350))
+    assert ticks_between(MIN_ODDS, MAX_ODDS) == 349
+
+
+@pytest.mark.parametrize("boundary, below, above", BOUNDARIES)
+def test_neighbours_step_across_band_boundaries(boundary, below, above):
+    np.testing.assert_array_equal(neighbours(boundary, k=1), [below, boundary, above])
+    assert ticks_between(below, above) == 2
+
+
+@pytest.mark.parametrize("boundary, below, above", BOUNDARIES)
+def test_snap_at_band_boundaries(boundary, below, above):
+    for direction in ("nearest", "down", "up"):
+        assert snap(boundary, direction) == boundary
+    # Just inside the wider band above the boundary
+    just_above = boundary + (above - boundary) / 4
+    assert snap(just_above) == boundary
+    assert snap(just_above, "down") == boundary
+    assert snap(just_above, "up") == above
+    assert snap(boundary + (above - boundary) * 3 / 4) == above
+    # Just inside the narrower band below it
+    just_below = boundary - (boundary - below) / 4
+    assert snap(just_below) == boundary
+    assert snap(just_below, "down") == below
+    assert snap(just_below, "up") == boundary
+
+
+def test_snap_and_neighbours_at_the_ends_of_the_ladder():
+    assert snap(1.0) == MIN_ODDS
+    assert snap(5000.0) == MAX_ODDS
+    assert np.isnan(neighbours(MIN_ODDS, k=1)[0])
+    assert np.isnan(neighbours(MAX_ODDS, k=1)[-1])
+
+
+@pytest.mark.parametrize("mode", ["qualifying", "free_snr", "free_sr"])
+def test_table_matches_calculate_batch(mode):
+    stake = 10.0
+    table = LadderTable.build(mode=mode, stake=stake)
+    back, lay, cms = np.meshgrid(TICKS, TICKS, table.commissions, indexing="ij")
+    free_bet = mode != "qualifying"
+    expected = calculate_batch(
+        back_stake=0.0 if free_bet else stake,
+        back_odds=back,
+        lay_odds=lay,
+        lay_cms=cms,
+        free_bet=free_bet,
+        free_sr=mode == "free_sr",
+        free_bet_val=stake if free_bet else 0.0
+    )
+    figures = table.evaluate(back, lay, cms)
+    assert figures["on_table"].all()
+    np.testing.assert_array_equal(figures["lay_stake"], expected["lay_stake"])
+    np.testing.assert_array_equal(figures["liability"], expected["liability"])
+    # calculate_batch() rounds the totals; the table keeps them unrounded
+    np.testing.assert_array_equal(_round2(figures["back_wins_total"]), expected["back_wins_total"])
+    np.testing.assert_array_equal(_round2(figures["lay_wins_total"]), expected["lay_wins_total"])
+
+
+def test_table_matches_the_scalar_calculator():
+    table = LadderTable.build(stake=25.0)
+    for back_odds, lay_odds, lay_cms in [(2.0, 2.02, 0.02), (3.05, 3.0, 0.0), (10.5, 11.0, 0.05)]:
+        calculator = MatchedBetCalculator(
+            back_stake=25.0, back_odds=back_odds, back_cms=0.0, lay_odds=lay_odds, lay_cms=lay_cms,
+            free_sr=False, free_bet=False, free_bet_val=0.0
+        )
+        figures = table.evaluate(back_odds, lay_odds, lay_cms)
+        breakdown = calculator.get_bookie_exchange_breakdown()
+        lay_stake = calculator.get_required_lay_stake()
+        assert figures["lay_stake"] == pytest.approx(lay_stake)
+        assert figures["liability"] == pytest.approx(calculator.get_lay_liability(lay_stake))
+        assert _round2(figures["back_wins_total"]) == breakdown["back_wins"]["total"]
+        assert _round2(figures["lay_wins_total"]) == breakdown["lay_wins"]["total"]
+
+
+def test_pairs_off_the_table_are_nan():
+    table = LadderTable.build(lay_odds=[2.0, 3.0])
+    figures = table.evaluate([2.0, 2.001, 2.0], [2.0, 2.0, 2.5], 0.02)
+    np.testing.assert_array_equal(figures["on_table"], [True, False, False])
+    assert np.isnan(figures["lay_stake"][1:]).all()
+
+
+def test_save_and_load_round_trip(tmp_path):
+    table = LadderTable.build(mode="free_sr", stake=5.0, back_odds=TICKS[:50], lay_odds=TICKS[:50])
+    path = tmp_path / "table.npz"
+    table.save(str(path))
+    loaded = LadderTable.load(str(path))
+    assert (loaded.mode, loaded.stake) == ("free_sr", 5.0)
+    for field, values in table.figures.items():
+        np.testing.assert_array_equal(loaded.figures[field], values)
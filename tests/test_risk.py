@@ -0,0 +1,33 @@
+import pytest
+
+from data.risk import portfolio_arrays, simulate_pnl
+from data.service import OPEN_BET_COLUMNS
+
+
+def open_bet(bet_id, event, back_odds=3.0, lay_odds=3.1):
+    values = {
+        "id": bet_id, "event": event, "bet_type": "Qualifying Bet", "back_stake": 10.0, "back_odds": back_odds,
+        "lay_odds": lay_odds, "lay_stake": 9.7, "lay_commission": 0.02, "free_sr": False, "updated_at": None,
+    }
+    return tuple(values[column] for column in OPEN_BET_COLUMNS)
+
+
+@pytest.mark.parametrize("selection_correlation", [-0.1, 1.0, 1.5])
+def test_simulate_pnl_rejects_correlation_outside_0_to_1(selection_correlation):
+    portfolio = portfolio_arrays([open_bet(1, "A v B")])
+    with pytest.raises(ValueError):
+        simulate_pnl(portfolio, sims=10, selection_correlation=selection_correlation)
+
+
+def test_simulate_pnl_accepts_zero_correlation():
+    portfolio = portfolio_arrays([open_bet(1, "A v B"), open_bet(2, "A v B")])
+    assert simulate_pnl(portfolio, sims=1000, selection_correlation=0.0).shape == (1000,)
+
+
+def test_only_bets_on_the_same_selection_share_the_factor():
+    same = portfolio_arrays([open_bet(1, "A v B - A"), open_bet(2, "A v B - A")])
+    different = portfolio_arrays([open_bet(1, "A v B - A"), open_bet(2, "A v B - B")])
+    # Identical bets: independent outcomes give a variance of 2x one bet's, shared ones more
+    single = simulate_pnl(portfolio_arrays([open_bet(1, "A v B - A")]), sims=50_000, selection_correlation=0.5).var()
+    assert simulate_pnl(same, sims=50_000, selection_correlation=0.5).var() > 2.5 * single
+    assert simulate_pnl(different, sims=50_000, selection_correlation=0.5).var() == pytest.approx(2 * single, rel=0.05)
@@ -0,0 +1,26 @@
+from data import service
+from data.write_behind import WriteBehindQueue
+
+BET = {
+    "bookmaker": "Bet365", "event": "Man Utd vs Chelsea", "bet_type": "Qualifying Bet",
+    "back_stake": 10.0, "back_odds": 3.0, "exchange": "Smarkets", "lay_odds": 3.1,
+}
+
+
+def test_pending_counts_a_users_bets_by_session_user_id(tmp_path, monkeypatch):
+    # Database unreachable: bets stay journaled
+    monkeypatch.setattr(service, "insert_keyed_bets", lambda batch: None)
+    queue = WriteBehindQueue(str(tmp_path / "bets.jsonl"), flush_interval=60)
+    queue.start()
+    try:
+        queue.submit({**BET, "user_id": "7"})
+        queue.submit({**BET, "user_id": 8})
+
+        # st.session_state["user_id"] is a string
+        assert queue.pending("7") == 1
+        assert queue.pending(7) == 1
+        assert queue.pending("8") == 1
+        assert queue.pending("9") == 0
+        assert queue.pending() == 2
+    finally:
+        queue.stop(timeout=1)